@@ -0,0 +1,251 @@
+"""Load test the example server's /emoji and /feedback routes against a stub LRS.
+
+    # start the stub LRS and the Flask example, then drive 200 requests/s for 30 seconds
+    python benchmarks/loadtest.py --spawn flask --rate 200 --duration 30 --lrs-latency 0.05 --lrs-error-rate 0.01
+
+    # or drive an app you started yourself, pointed at the stub LRS this prints
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --rate 200
+
+Requests are scheduled at a fixed rate whether or not earlier ones have finished, so a slow server
+shows up as latency instead of a lower request rate. `latency` is measured from the scheduled start
+and includes any wait for a free load generator worker, `service` only covers the request itself.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from stub_lrs import StubLRS, percentiles
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+QUESTION = {
+    'id': 'urn:uuid:question',
+    'type': 'RatingScaleQuestion',
+    'questionPosed': 'How do you feel about this graph?',
+    'scale': {
+        'type': 'MultiselectScale',
+        'itemLabel': ['😁', '😀', '😐', '😕', '😞'],
+        'itemValues': ['beaming face with smiling eyes', 'grinning face', 'neutral face',
+            'confused face', 'disappointed face']
+    }
+}
+
+OBJECT = {'id': 'urn:uuid:3a02e4fc-24c1-11e9-ab14-d663bd873d11', 'type': 'DigitalResource'}
+
+SPAWN_COMMANDS = {
+    'flask': [sys.executable, '-c', 'import sys; sys.path.insert(0, sys.argv[1]); import server; '
+        'server.app.run(host="127.0.0.1", port=int(sys.argv[2]), threaded=True)'],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi_server:app', '--log-level', 'warning', '--app-dir'],
+}
+
+
+def emoji_payload(rng):
+    return {
+        'object': OBJECT,
+        'eventTime': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime()),
+        'question': QUESTION,
+        'selections': [rng.choice(QUESTION['scale']['itemValues'])]
+    }
+
+
+def feedback_payload(rng):
+    return {
+        'object': OBJECT,
+        'eventTime': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime()),
+        'questionText': QUESTION['questionPosed'],
+        'feedback': 'Load test comment {}'.format(rng.randint(0, 1000000))
+    }
+
+
+class LoadGenerator(object):
+    def __init__(self, url, rate, duration, workers, comment_ratio, timeout=10.0, seed=None):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.rate = rate
+        self.duration = duration
+        self.workers = workers
+        self.comment_ratio = comment_ratio
+        self.timeout = timeout
+        self.seed = seed
+        self.results = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def run(self):
+        self._ticket = itertools.count()
+        self._start = time.perf_counter() + 0.1
+        self._end = self._start + self.duration
+        threads = [threading.Thread(target=self._worker, args=(i,)) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - self._start
+        return self.report()
+
+    def _worker(self, number):
+        rng = random.Random(None if self.seed is None else self.seed + number)
+        connection = None
+        while True:
+            scheduled = self._start + next(self._ticket) / float(self.rate)
+            if scheduled >= self._end:
+                break
+            wait = scheduled - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+
+            route = '/feedback' if rng.random() < self.comment_ratio else '/emoji'
+            payload = feedback_payload(rng) if route == '/feedback' else emoji_payload(rng)
+            body = json.dumps(payload).encode('utf-8')
+            if connection is None:
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            sent = time.perf_counter()
+            try:
+                connection.request('POST', self.prefix + route, body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                status = str(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                connection.close()
+                connection = None
+            done = time.perf_counter()
+            with self._lock:
+                self.results[route].append((done - scheduled, done - sent, status))
+                self.statuses[route][status] += 1
+        if connection is not None:
+            connection.close()
+
+    def report(self):
+        report = {}
+        for route, samples in sorted(self.results.items()):
+            errors = sum(1 for _, _, status in samples if not status.startswith('2'))
+            report[route] = {
+                'requests': len(samples),
+                'errors': errors,
+                'statuses': dict(self.statuses[route]),
+                'throughput': (len(samples) - errors) / self.elapsed if self.elapsed else 0.0,
+                'latency': percentiles([latency for latency, _, _ in samples]),
+                'service': percentiles([service for _, service, _ in samples]),
+            }
+        return report
+
+
+def spawn_app(kind, port, caliper_host, directory):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.join(ROOT, 'src'), env.get('PYTHONPATH')]))
+    env['EMOJI_FEEDBACK_CALIPER_HOST'] = caliper_host
+    env['EMOJI_FEEDBACK_CALIPER_API_KEY'] = 'loadtest'
+    example = os.path.join(ROOT, 'example')
+    if kind == 'flask':
+        command = SPAWN_COMMANDS['flask'] + [example, str(port)]
+    else:
+        command = SPAWN_COMMANDS['asgi'] + [example, '--port', str(port)]
+    # the examples write their vote snapshot to the working directory
+    process = subprocess.Popen(command, env=env, cwd=directory)
+
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit('the {} example exited with status {}'.format(kind, process.returncode))
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            connection.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit('the {} example did not start on port {}'.format(kind, port))
+
+
+def format_ms(value):
+    return '{:8.1f}'.format(value * 1000) if value is not None else '       -'
+
+
+def print_report(app, upstream, elapsed):
+    print('{:<12} {:>8} {:>7} {:>9} {:>8} {:>8} {:>8}  {}'.format(
+        'endpoint', 'requests', 'errors', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'statuses'))
+    for route, stats in app.items():
+        for name, key in ((route, 'latency'), (route + ' svc', 'service')):
+            latency = stats[key]
+            print('{:<12} {:>8} {:>7} {:>9.1f} {} {} {}  {}'.format(name, stats['requests'], stats['errors'],
+                stats['throughput'], format_ms(latency['p50']), format_ms(latency['p95']),
+                format_ms(latency['p99']), json.dumps(stats['statuses']) if key == 'latency' else ''))
+    if upstream is not None:
+        latency = upstream['latency']
+        print('{:<12} {:>8} {:>7} {:>9.1f} {} {} {}  {}'.format('caliper', upstream['requests'], upstream['errors'],
+            upstream['requests'] / elapsed if elapsed else 0.0, format_ms(latency['p50']),
+            format_ms(latency['p95']), format_ms(latency['p99']), json.dumps(upstream['statuses'])))
+        print('caliper received {} events in {} bytes'.format(upstream['events'], upstream['bytes']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the emoji feedback example server')
+    parser.add_argument('--url', default=None, help='app to drive, defaults to the spawned app or :5000')
+    parser.add_argument('--spawn', choices=['flask', 'asgi'], default=None, help='start an example server')
+    parser.add_argument('--port', type=int, default=5050, help='port for the spawned example server')
+    parser.add_argument('--rate', type=float, default=50, help='requests per second across both routes')
+    parser.add_argument('--duration', type=float, default=10, help='seconds')
+    parser.add_argument('--workers', type=int, default=32, help='concurrent load generator connections')
+    parser.add_argument('--comment-ratio', type=float, default=0.2, help='fraction of requests to /feedback')
+    parser.add_argument('--drain', type=float, default=2.0, help='seconds to wait for batched delivery afterwards')
+    parser.add_argument('--no-lrs', action='store_true', help='do not start the stub LRS')
+    parser.add_argument('--lrs-port', type=int, default=5001)
+    parser.add_argument('--lrs-latency', type=float, default=0.0)
+    parser.add_argument('--lrs-jitter', type=float, default=0.0)
+    parser.add_argument('--lrs-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--json', default=None, help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    stub = None
+    process = None
+    directory = tempfile.mkdtemp()
+    try:
+        if not args.no_lrs:
+            stub = StubLRS(port=args.lrs_port, latency=args.lrs_latency, jitter=args.lrs_jitter,
+                error_rate=args.lrs_error_rate, seed=args.seed).__enter__()
+            print('stub LRS listening on {}'.format(stub.url))
+        if args.spawn:
+            if stub is None:
+                raise SystemExit('--spawn needs the stub LRS')
+            process = spawn_app(args.spawn, args.port, stub.url, directory)
+        url = args.url or 'http://127.0.0.1:{}'.format(args.port if args.spawn else 5000)
+
+        if stub:
+            stub.reset()
+        generator = LoadGenerator(url, args.rate, args.duration, args.workers, args.comment_ratio, seed=args.seed)
+        app = generator.run()
+        if stub and args.drain:
+            time.sleep(args.drain)
+        upstream = stub.stats() if stub else None
+
+        print_report(app, upstream, generator.elapsed)
+        if args.json:
+            with open(args.json, 'w') as fh:
+                json.dump({'app': app, 'caliper': upstream, 'elapsed': generator.elapsed, 'args': vars(args)},
+                    fh, indent=2)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(10)
+        if stub is not None:
+            stub.__exit__()
+
+
+if __name__ == '__main__':
+    main()
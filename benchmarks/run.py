@@ -0,0 +1,230 @@
+"""Benchmarks for event generation, envelope construction, serialization and send throughput.
+
+    python benchmarks/run.py                 # run and compare against benchmarks/baseline.json
+    python benchmarks/run.py --save          # store the results as the new baseline
+    python benchmarks/run.py --check         # exit 1 if any case regressed past --tolerance
+    python benchmarks/run.py --filter send   # only run cases whose name contains 'send'
+
+Results are microseconds per operation, the best of several repeats. Baselines are only comparable
+on the same machine, so re-save them when the hardware changes.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+
+from emoji_feedback import BatchingEmitter, EmojiFeedbackSensor, EventSerializer, SessionTransport
+from tests.stub_server import StubCaliperServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+EVENT_TIME = '2019-01-01T00:00:00.000Z'
+OBJECT = {'id': 'urn:uuid:3a02e4fc-24c1-11e9-ab14-d663bd873d11', 'type': 'DigitalResource'}
+
+SMALL_QUESTION = {
+    'id': 'urn:uuid:question',
+    'type': 'RatingScaleQuestion',
+    'questionPosed': 'How do you feel about this graph? 😀',
+    'scale': {
+        'type': 'MultiselectScale',
+        'itemLabel': ['😁', '😀', '😐', '😕', '😞'],
+        'itemValues': ['beaming face with smiling eyes', 'grinning face', 'neutral face',
+            'confused face', 'disappointed face']
+    }
+}
+
+LARGE_QUESTION = dict(SMALL_QUESTION, id='urn:uuid:large-question', scale=dict(SMALL_QUESTION['scale'],
+    itemLabel=['label {}'.format(i) for i in range(200)],
+    itemValues=['value {}'.format(i) for i in range(200)]))
+
+SHORT_COMMENT = 'Alright'
+LONG_COMMENT = 'This graph was hard to follow. ' * 100
+
+
+class _Response(object):
+    status_code = 200
+    text = ''
+
+    def raise_for_status(self):
+        pass
+
+
+class EncodingTransport(object):
+    # does the JSON encoding requests would do, without any network
+    def post(self, url, body, headers):
+        if not isinstance(body, (bytes, bytearray)):
+            json.dumps(body).encode('utf-8')
+        return _Response()
+
+
+def measure(fn, number, repeat=5):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def sensor(**kwargs):
+    return EmojiFeedbackSensor(caliper_host='http://127.0.0.1:9/', caliper_api_key='123', **kwargs)
+
+
+def emoji_kwargs(question):
+    return {'eventTime': EVENT_TIME, 'object': OBJECT, 'question': question, 'selections': ['grinning face']}
+
+
+def comment_kwargs(comment):
+    return {'eventTime': EVENT_TIME, 'object': OBJECT, 'questionText': 'How do you feel about this graph?',
+        'commentText': comment}
+
+
+def bench_generate_emoji(question):
+    feedback_sensor = sensor()
+    kwargs = emoji_kwargs(question)
+    return measure(lambda: feedback_sensor.generate_emoji_feedback_event(**kwargs), 20000)
+
+
+def bench_generate_comment(comment):
+    feedback_sensor = sensor()
+    kwargs = comment_kwargs(comment)
+    return measure(lambda: feedback_sensor.generate_comment_feedback_event(**kwargs), 20000)
+
+
+def bench_emit_event(question, **sensor_kwargs):
+    # envelope construction and encoding for one event, as _emit_event does without an emitter
+    feedback_sensor = sensor(transport=EncodingTransport(), **sensor_kwargs)
+    event = feedback_sensor.generate_emoji_feedback_event(**emoji_kwargs(question))
+    return measure(lambda: feedback_sensor._emit_event(event), 5000)
+
+
+def bench_serialize_envelope(question, serializer):
+    feedback_sensor = sensor()
+    events = [feedback_sensor.generate_emoji_feedback_event(**emoji_kwargs(json.loads(json.dumps(question))))
+        for _ in range(100)]
+    envelope = feedback_sensor._build_envelope(events)
+    if serializer:
+        encode = EventSerializer().envelope
+        return measure(lambda: encode(envelope), 100)
+    return measure(lambda: json.dumps(envelope).encode('utf-8'), 100)
+
+
+def bench_send(question, batched):
+    # end-to-end per event cost against a local Caliper endpoint over keep-alive connections
+    events = 200
+    with StubCaliperServer() as stub:
+        emitter = BatchingEmitter(max_events=100, max_delay=0.05) if batched else None
+        feedback_sensor = EmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+            transport=SessionTransport(), emitter=emitter)
+        kwargs = emoji_kwargs(question)
+
+        def send():
+            for _ in range(events):
+                feedback_sensor.send_emoji_feedback(**kwargs)
+            feedback_sensor.flush(timeout=30)
+            with stub.lock:
+                del stub.requests[:]
+
+        result = measure(send, 1, repeat=3) / events
+        feedback_sensor.close(timeout=5)
+        return result
+
+
+COLD_START = '''
+import sys, time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import emoji_feedback
+imported = time.perf_counter()
+kwargs = {'eventTime': '2019-01-01T00:00:00.000Z', 'object': 'urn:uuid:object', 'questionText': 'q', 'commentText': 'c'}
+if sys.argv[3] == 'serverless':
+    from emoji_feedback import serverless
+    serverless.get_sensor(caliper_host=sys.argv[2], caliper_api_key='123').send_comment_feedback(**kwargs)
+    serverless.flush()
+else:
+    emoji_feedback.EmojiFeedbackSensor(caliper_host=sys.argv[2], caliper_api_key='123').send_comment_feedback(**kwargs)
+done = time.perf_counter()
+print((imported - start) * 1e6, (done - start) * 1e6)
+'''
+
+
+def bench_cold_start(mode, first_event):
+    # a fresh interpreter per run, from the package import up to the first event delivered
+    results = []
+    with StubCaliperServer() as stub:
+        for _ in range(5):
+            output = subprocess.check_output([sys.executable, '-c', COLD_START, os.path.join(ROOT, 'src'),
+                stub.url, mode])
+            results.append(float(output.split()[1 if first_event else 0]))
+    return min(results)
+
+
+CASES = [
+    ('generate_emoji_small', lambda: bench_generate_emoji(SMALL_QUESTION)),
+    ('generate_emoji_large_scale', lambda: bench_generate_emoji(LARGE_QUESTION)),
+    ('generate_comment_short', lambda: bench_generate_comment(SHORT_COMMENT)),
+    ('generate_comment_long', lambda: bench_generate_comment(LONG_COMMENT)),
+    ('emit_event_small', lambda: bench_emit_event(SMALL_QUESTION)),
+    ('emit_event_large_scale', lambda: bench_emit_event(LARGE_QUESTION)),
+    ('emit_event_large_scale_serializer', lambda: bench_emit_event(LARGE_QUESTION, serializer=EventSerializer())),
+    ('serialize_envelope_json_dumps', lambda: bench_serialize_envelope(SMALL_QUESTION, False)),
+    ('serialize_envelope_serializer', lambda: bench_serialize_envelope(SMALL_QUESTION, True)),
+    ('serialize_envelope_large_json_dumps', lambda: bench_serialize_envelope(LARGE_QUESTION, False)),
+    ('serialize_envelope_large_serializer', lambda: bench_serialize_envelope(LARGE_QUESTION, True)),
+    ('send_per_event_small', lambda: bench_send(SMALL_QUESTION, False)),
+    ('send_per_event_small_batched', lambda: bench_send(SMALL_QUESTION, True)),
+    ('send_per_event_large_scale_batched', lambda: bench_send(LARGE_QUESTION, True)),
+    ('cold_import_package', lambda: bench_cold_start('default', False)),
+    ('cold_first_event', lambda: bench_cold_start('default', True)),
+    ('cold_first_event_serverless', lambda: bench_cold_start('serverless', True)),
+]
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Emoji feedback benchmarks')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--check', action='store_true', help='exit 1 if a case regressed past --tolerance')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown, 0.25 is 25%%')
+    parser.add_argument('--filter', default='')
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+    print('{:<38} {:>12} {:>12} {:>8}'.format('case', 'us/op', 'baseline', 'ratio'))
+    for name, case in CASES:
+        if args.filter not in name:
+            continue
+        results[name] = round(case(), 3)
+        previous = baseline.get(name)
+        ratio = results[name] / previous if previous else None
+        if ratio is not None and ratio > 1 + args.tolerance:
+            regressions.append(name)
+        print('{:<38} {:>12.3f} {:>12} {:>8}'.format(name, results[name],
+            '{:.3f}'.format(previous) if previous else '-',
+            '{:.2f}'.format(ratio) if ratio is not None else '-'))
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, 'w') as fh:
+            json.dump(baseline, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        print('saved baseline to {}'.format(args.baseline))
+
+    if regressions:
+        print('regressed: {}'.format(', '.join(regressions)))
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Stub Caliper LRS with configurable latency and error rate, for load tests.
+
+    python benchmarks/stub_lrs.py --port 5001 --latency 0.05 --jitter 0.02 --error-rate 0.01
+
+Point a sensor at http://127.0.0.1:5001/caliper. GET /stats returns what it has received so far
+and POST /reset clears it.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+def percentiles(values, points=(50, 95, 99)):
+    # nearest-rank percentiles of a list of numbers
+    if not values:
+        return dict(('p{}'.format(point), None) for point in points)
+    ordered = sorted(values)
+    return dict(('p{}'.format(point), ordered[min(len(ordered) - 1, max(0, int(round(point / 100.0 * len(ordered))) - 1))])
+        for point in points)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class StubLRS(object):
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+            seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                if self.path == '/reset':
+                    stub.reset()
+                    return self._respond(200, {'ok': True})
+                started = time.perf_counter()
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status = stub._status()
+                delay = stub.latency + stub._uniform(stub.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+                stub._record(status, stub._count_events(body, self.headers.get('Content-Encoding')), len(body),
+                    time.perf_counter() - started)
+                self._respond(status, {'ok': status < 400})
+
+            def do_GET(self):
+                if self.path == '/stats':
+                    return self._respond(200, stub.stats())
+                self._respond(404, {'ok': False})
+
+            def _respond(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _ThreadingHTTPServer((host, port), Handler)
+        self.url = 'http://{}:{}/caliper'.format(host, self.server.server_address[1])
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def _status(self):
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+        return self.error_status if failed else 200
+
+    def _uniform(self, width):
+        if not width:
+            return 0.0
+        with self._lock:
+            return self._random.uniform(0, width)
+
+    @staticmethod
+    def _count_events(body, encoding):
+        try:
+            if encoding == 'gzip':
+                body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            elif encoding == 'deflate':
+                body = zlib.decompress(body)
+            return len(json.loads(body.decode('utf-8')).get('data', []))
+        except (ValueError, zlib.error, AttributeError):
+            return 0
+
+    def _record(self, status, events, size, seconds):
+        with self._lock:
+            self._statuses[status] += 1
+            self._events += events
+            self._bytes += size
+            self._latencies.append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._statuses = Counter()
+            self._events = 0
+            self._bytes = 0
+            self._latencies = []
+            self._started = time.time()
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            elapsed = time.time() - self._started
+            stats = {
+                'requests': len(latencies),
+                'events': self._events,
+                'bytes': self._bytes,
+                'statuses': dict((str(status), count) for status, count in self._statuses.items()),
+                'errors': sum(count for status, count in self._statuses.items() if status >= 400),
+                'requests_per_second': len(latencies) / elapsed if elapsed else 0.0,
+            }
+        stats['latency'] = percentiles(latencies)
+        return stats
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stub Caliper LRS for load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many more seconds, uniformly')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with an error')
+    parser.add_argument('--error-status', type=int, default=503)
+    args = parser.parse_args(argv)
+
+    with StubLRS(args.host, args.port, args.latency, args.jitter, args.error_rate, args.error_status) as stub:
+        print('stub LRS listening on {}'.format(stub.url))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import json
+import os
+import sys
+import logging
+from datetime import datetime
+from urllib.parse import parse_qs
+from emoji_feedback import (AsyncEmojiFeedbackSensor, FeedbackValidator, Metrics, QuestionRegistry,
+    QueueFullError, ValidationError, VoteAggregator)
+
+aggregator = VoteAggregator(windows=(60, 300, 3600), snapshot_path='votes.json')
+metrics = Metrics()
+validator = FeedbackValidator()
+
+# questions are loaded once at startup so clients can post a bare question id, questions that are
+# not registered are still accepted as sent
+questions_path = os.environ.get('EMOJI_FEEDBACK_QUESTIONS',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions.json'))
+questions = QuestionRegistry.from_file(questions_path, validator=validator, strict=False)
+
+# one long-lived sensor delivers events in the background for every request
+feedback_sensor = AsyncEmojiFeedbackSensor(max_concurrency=10, max_queue=10000, max_batch_events=100,
+    aggregator=aggregator, metrics=metrics, validator=validator)
+
+# faking actor, edApp, and session
+actor = {
+    'id': 'urn:uuid:1a02e4fc-24c1-11e9-ab14-d663bd873d93',
+    'type': 'Person',
+    'name': 'First Last',
+    'dateCreated': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+}
+
+edApp = {
+    'id': "urn:uuid:3a02e4fc-24c1-11e9-ab14-d663bd873d93",
+    'type': 'SoftwareApplication'
+}
+
+session = {
+    'id': "urn:uuid:4a02e4fc-24c1-11e9-ab14-d663bd873d93",
+    'type': 'Session'
+}
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+    (b'access-control-allow-headers', b'Content-Type'),
+]
+
+SHUTDOWN_TIMEOUT = 10
+MAX_BODY_BYTES = 64 * 1024
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+async def respond(send, status, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers + CORS_HEADERS})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def read_json(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_BYTES:
+            raise RequestTooLarge()
+        more_body = message.get('more_body', False)
+    return json.loads(body.decode('utf-8'))
+
+
+def emoji(req_data):
+  feedback_sensor.enqueue_emoji_feedback(
+    eventTime=req_data['eventTime'],
+    actor=actor,
+    object=req_data['object'],
+    edApp=edApp,
+    session=session,
+    question=questions.resolve(req_data['question']),
+    selections=req_data['selections']
+  )
+
+
+def feedback(req_data):
+  feedback_sensor.enqueue_comment_feedback(
+    eventTime=req_data['eventTime'],
+    actor=actor,
+    object=req_data['object'],
+    edApp=edApp,
+    session=session,
+    questionText=req_data['questionText'],
+    commentText=req_data['feedback']
+  )
+
+
+ROUTES = {
+    '/emoji': emoji,
+    '/feedback': feedback,
+}
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # drain queued events before the process exits
+            drained = await feedback_sensor.flush(SHUTDOWN_TIMEOUT)
+            if not drained:
+                logging.warning('%d feedback events not delivered', feedback_sensor.queue_depth())
+            await feedback_sensor.close(0)
+            aggregator.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    path = scope['path']
+    method = scope['method']
+    if method == 'OPTIONS':
+        return await respond(send, 204)
+    if path == '/' and method == 'GET':
+        return await respond(send, 200, 'Hello, World!')
+    if path == '/metrics' and method == 'GET':
+        body = metrics.prometheus({'queue_depth': feedback_sensor.queue_depth()}).encode('utf-8')
+        headers = [(b'content-type', b'text/plain; version=0.0.4'), (b'content-length', str(len(body)).encode())]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        return await send({'type': 'http.response.body', 'body': body})
+    if path == '/votes' and method == 'GET':
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        if 'object' not in query or 'question' not in query:
+            return await respond(send, 200, {'votes': aggregator.all_votes()})
+        return await respond(send, 200, aggregator.votes(query['object'][0], query['question'][0]))
+
+    handler = ROUTES.get(path)
+    if handler is None:
+        return await respond(send, 404, {'success': False})
+    if method != 'POST':
+        return await respond(send, 405, {'success': False})
+
+    try:
+        handler(await read_json(receive))
+    except RequestTooLarge:
+        return await respond(send, 413, {'success': False})
+    except QueueFullError:
+        # shed load rather than wait on the LRS
+        logging.warning('Feedback delivery queue is full')
+        return await respond(send, 503, {'success': False})
+    except ValidationError as e:
+        return await respond(send, 400, {'success': False, 'error': str(e)})
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return await respond(send, 400, {'success': False})
+    except Exception:
+        logging.exception('Could not queue feedback event')
+        return await respond(send, 500, {'success': False})
+
+    return await respond(send, 202, {'success': True})
+
+
+if __name__ == "__main__":
+    import uvicorn
+    logging.basicConfig(stream=sys.stderr, level=logging.DEBUG)
+    uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -1,11 +1,28 @@
-from flask import Flask, request, jsonify, abort
+import os
+from flask import Flask, Response, request, jsonify, abort
 from flask_cors import CORS
 from datetime import datetime
-from emoji_feedback import EmojiFeedbackSensor
+from emoji_feedback import (EmojiFeedbackSensor, FeedbackValidator, Metrics, QuestionRegistry, ValidationError,
+  VoteAggregator)
 
 app = Flask(__name__)
 CORS(app)
 
+# live vote counts shared by every request
+aggregator = VoteAggregator(windows=(60, 300, 3600), snapshot_path='votes.json')
+
+# one metrics registry collects from the sensor of every request
+metrics = Metrics()
+
+# question scales are compiled once and reused to check every submission
+validator = FeedbackValidator()
+
+# questions are loaded once at startup so clients can post a bare question id, questions that are
+# not registered are still accepted as sent
+questions_path = os.environ.get('EMOJI_FEEDBACK_QUESTIONS',
+  os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions.json'))
+questions = QuestionRegistry.from_file(questions_path, validator=validator, strict=False)
+
 # faking actor, edApp, and session
 actor = {
     'id': 'urn:uuid:1a02e4fc-24c1-11e9-ab14-d663bd873d93',
@@ -24,6 +41,10 @@ session = {
     'type': 'Session'
 }
 
+@app.errorhandler(ValidationError)
+def invalid_feedback(error):
+  return jsonify(success=False, error=str(error)), 400
+
 @app.route('/')
 def hello():
     return 'Hello, World!'
@@ -34,9 +55,10 @@ def emoji():
   object = req_data.get('object')
   eventTime = req_data.get('eventTime')
   selections = req_data.get('selections')
-  question = req_data.get('question')
+  question = questions.resolve(req_data.get('question'))
 
-  feedback_sensor = EmojiFeedbackSensor(debug=True)
+  feedback_sensor = EmojiFeedbackSensor(debug=True, aggregator=aggregator, metrics=metrics,
+    validator=validator)
   feedback_sensor.send_emoji_feedback(
     eventTime=eventTime,
     actor=actor,
@@ -58,7 +80,7 @@ def feedback():
   feedback = req_data.get('feedback')
   questionText = req_data.get('questionText')
 
-  feedback_sensor = EmojiFeedbackSensor(debug=True)
+  feedback_sensor = EmojiFeedbackSensor(debug=True, metrics=metrics, validator=validator)
   feedback_sensor.send_comment_feedback(
     eventTime=eventTime,
     actor=actor,
@@ -72,9 +94,18 @@ def feedback():
   resp = jsonify(success=True)
   return resp
 
-# @app.route('/votes', methods=['GET'])
-# def votes():
-#   return jsonify({'votes': 2715})
+@app.route('/votes', methods=['GET'])
+def votes():
+  object = request.args.get('object')
+  question = request.args.get('question')
+  if object is None or question is None:
+    return jsonify(votes=aggregator.all_votes())
+
+  return jsonify(aggregator.votes(object, question))
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+  return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == "__main__":
     import sys
@@ -19,6 +19,12 @@ setuptools.setup(
     keywords=['caliper', 'emoji', 'feedback', 'ubc'],
     package_dir={'': 'src'},
     packages=setuptools.find_packages('src'),
+    entry_points={
+        'console_scripts': [
+            'emoji-feedback-agent=emoji_feedback.agent:main',
+            'emoji-feedback-replay=emoji_feedback.replay:main',
+        ],
+    },
     install_requires=[
         'requests>=v2.19.1'
     ],
@@ -1 +1,65 @@
-from .emoji_feedback_sensor import EmojiFeedbackSensor
\ No newline at end of file
+import sys
+
+# names are imported from their module on first use, so `import emoji_feedback` stays cheap for
+# short-lived processes that only need the sensor and never load requests or asyncio before a send
+_EXPORTS = {
+    'EmojiFeedbackSensor': 'emoji_feedback_sensor',
+    'PostTransport': 'transport',
+    'SessionTransport': 'transport',
+    'ConnectionTransport': 'transport',
+    'BatchingEmitter': 'emitter',
+    'AsyncEmojiFeedbackSensor': 'async_sensor',
+    'AsyncTransport': 'async_transport',
+    'Spool': 'spool',
+    'EventSerializer': 'serialization',
+    'EnvelopeCompactor': 'compaction',
+    'compact_envelope': 'compaction',
+    'Compression': 'compression',
+    'DeterministicIdProvider': 'ids',
+    'FastIdProvider': 'ids',
+    'Comment': 'model',
+    'FeedbackEvent': 'model',
+    'Rating': 'model',
+    'AgentEmitter': 'agent',
+    'ForwardingAgent': 'agent',
+    'VoteAggregator': 'aggregation',
+    'DuplicateFilter': 'dedup',
+    'AdmissionControl': 'admission',
+    'TokenBucket': 'admission',
+    'CircuitOpenError': 'errors',
+    'QueueFullError': 'errors',
+    'ValidationError': 'errors',
+    'CircuitBreaker': 'resilience',
+    'RetryPolicy': 'resilience',
+    'Metrics': 'metrics',
+    'FeedbackValidator': 'validation',
+    'QuestionRegistry': 'registry',
+    'Destination': 'fanout',
+    'FileSink': 'sink',
+    'Replayer': 'replay',
+    'BufferedEmitter': 'serverless',
+    'DegradationPolicy': 'degradation',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    from importlib import import_module
+    value = getattr(import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if sys.version_info < (3, 7):
+    # module __getattr__ (PEP 562) is ignored before 3.7, so every name is imported up front there
+    for _name in _EXPORTS:
+        __getattr__(_name)
+    del _name
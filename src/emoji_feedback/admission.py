@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .model import entity_id
+
+
+class TokenBucket(object):
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst=None, now=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.tokens = self.burst
+        self.updated = time.monotonic() if now is None else now
+
+    def allow(self, now=None):
+        now = time.monotonic() if now is None else now
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class AdmissionControl(object):
+    # global and per-actor token buckets, checked before an event is built
+    def __init__(self, rate=None, burst=None, per_actor_rate=None, per_actor_burst=None, max_actors=10000):
+        self.per_actor_rate = per_actor_rate
+        self.per_actor_burst = per_actor_burst
+        self.max_actors = max_actors
+        self.admitted = 0
+        self.rejected_global = 0
+        self.rejected_actor = 0
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self._actors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def admit(self, actor, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # without an actor only the global bucket applies
+            if self.per_actor_rate and actor is not None:
+                actor_id = entity_id(actor)
+                bucket = self._actors.get(actor_id)
+                if bucket is None:
+                    bucket = TokenBucket(self.per_actor_rate, self.per_actor_burst, now)
+                    self._actors[actor_id] = bucket
+                    if len(self._actors) > self.max_actors:
+                        self._actors.popitem(last=False)
+                else:
+                    self._actors.move_to_end(actor_id)
+                if not bucket.allow(now):
+                    self.rejected_actor += 1
+                    return False
+
+            if self._bucket and not self._bucket.allow(now):
+                self.rejected_global += 1
+                return False
+
+            self.admitted += 1
+            return True
+
+    def stats(self):
+        return {
+            'admitted': self.admitted,
+            'rejected_global': self.rejected_global,
+            'rejected_actor': self.rejected_actor
+        }
@@ -0,0 +1,166 @@
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import stat
+import threading
+from os import environ
+
+from .emitter import BatchingEmitter
+from .emoji_feedback_sensor import EmojiFeedbackSensor
+from .model import event_json
+from .resilience import RetryPolicy
+from .spool import Spool
+from .transport import SessionTransport
+
+logger = logging.getLogger(__name__)
+
+MAX_DATAGRAM = 65507
+
+
+def _socket_for(address):
+    if isinstance(address, (tuple, list)):
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    return socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+
+def parse_address(value):
+    # 'host:port' for localhost UDP, anything else is a unix socket path
+    host, sep, port = value.rpartition(':')
+    if sep and port.isdigit() and '/' not in value:
+        return (host or '127.0.0.1', int(port))
+    return value
+
+
+class AgentEmitter(object):
+    # hands events to a local forwarding agent, one datagram per event
+    remote = True
+
+    def __init__(self, address):
+        self.address = parse_address(address) if isinstance(address, str) else tuple(address)
+        self.sent = 0
+        self.dropped = 0
+        self._socket = _socket_for(self.address)
+        # never block the web worker when the agent falls behind
+        self._socket.setblocking(False)
+
+    def start(self, send, size=None, spill=None, dropped=None):
+        pass
+
+    def emit(self, event):
+        data = event_json(event)
+        if len(data) > MAX_DATAGRAM:
+            raise Exception('Emoji Feedback Error: event is too large to forward to the agent')
+        try:
+            self._socket.sendto(data, self.address)
+            self.sent += 1
+        except OSError as e:
+            self.dropped += 1
+            logger.warning('Emoji Feedback Error: could not forward event to agent: %s', e)
+
+    def queue_depth(self):
+        return 0
+
+    def flush(self, timeout=None):
+        return True
+
+    def close(self, timeout=None):
+        self._socket.close()
+
+
+class ForwardingAgent(object):
+    # receives events from app workers and sends them upstream through one batching sensor
+    def __init__(self, address, sensor):
+        self.address = parse_address(address) if isinstance(address, str) else tuple(address)
+        self.sensor = sensor
+        self.received = 0
+        self._stopped = threading.Event()
+        if not isinstance(self.address, tuple) and os.path.lexists(self.address):
+            # never delete anything at the listen path but a socket left by an earlier agent
+            if not _is_socket(self.address):
+                raise Exception('Emoji Feedback Error: {} exists and is not a socket'.format(self.address))
+            os.remove(self.address)
+        self._socket = _socket_for(self.address)
+        self._socket.bind(self.address)
+        self._socket.settimeout(0.5)
+        self.address = self._socket.getsockname()
+
+    def serve_forever(self):
+        while not self._stopped.is_set():
+            try:
+                data = self._socket.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._stopped.is_set():
+                    break
+                raise
+            try:
+                self.sensor._emit_event(json.loads(data.decode('utf-8')))
+                self.received += 1
+            except Exception:
+                logger.exception('Emoji Feedback Error: could not forward event')
+
+    def shutdown(self, timeout=None):
+        self._stopped.set()
+        self.sensor.close(timeout)
+        self._socket.close()
+        if not isinstance(self.address, tuple) and _is_socket(self.address):
+            os.remove(self.address)
+
+
+def _is_socket(path):
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except OSError:
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local forwarding agent for emoji feedback Caliper events')
+    parser.add_argument('--listen', default=environ.get('EMOJI_FEEDBACK_AGENT_ADDRESS', '/tmp/emoji-feedback.sock'),
+        help='unix socket path or host:port for UDP')
+    parser.add_argument('--caliper-host', default=None)
+    parser.add_argument('--caliper-api-key', default=None)
+    parser.add_argument('--max-events', type=int, default=100)
+    parser.add_argument('--max-bytes', type=int, default=512 * 1024)
+    parser.add_argument('--max-delay', type=float, default=0.5)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--max-attempts', type=int, default=3,
+        help='attempts per batch before it is given up, or left in the spool')
+    parser.add_argument('--spool-dir', default=None, help='keep undelivered events on disk and retry them')
+    parser.add_argument('--debug', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    sensor = EmojiFeedbackSensor(
+        caliper_host=args.caliper_host,
+        caliper_api_key=args.caliper_api_key,
+        debug=args.debug,
+        transport=SessionTransport(pool_maxsize=args.pool_size),
+        emitter=BatchingEmitter(max_events=args.max_events, max_bytes=args.max_bytes, max_delay=args.max_delay),
+        spool=Spool(args.spool_dir) if args.spool_dir else None,
+        retry=RetryPolicy(max_attempts=args.max_attempts)
+    )
+    try:
+        sensor._check_config()
+        agent = ForwardingAgent(args.listen, sensor)
+    except Exception as e:
+        sensor.close(0)
+        parser.exit(1, '{}\n'.format(e))
+
+    def stop(signum, frame):
+        agent._stopped.set()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info('Forwarding emoji feedback events from %s to %s', agent.address, sensor.caliper_host)
+    agent.serve_forever()
+    agent.shutdown(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .model import entity_id
+
+
+class _Votes(object):
+    __slots__ = ('total', 'buckets')
+
+    def __init__(self):
+        self.total = {}
+        # (bucket start, counts) pairs, oldest first
+        self.buckets = None
+
+
+class VoteAggregator(object):
+    # live selection counts per object and question, all-time and over sliding windows
+    def __init__(self, windows=(60, 300, 3600), resolution=10, max_keys=10000, max_values=100,
+            snapshot_path=None, snapshot_interval=60):
+        self.windows = tuple(windows)
+        self.resolution = resolution
+        self.max_keys = max_keys
+        self.max_values = max_values
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._max_buckets = max(self.windows) // resolution + 1 if self.windows else 0
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        if snapshot_path:
+            if os.path.exists(snapshot_path):
+                self.load(snapshot_path)
+            self._thread = threading.Thread(target=self._snapshot_loop, name='emoji-feedback-votes-snapshot')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _votes_for(self, key):
+        votes = self._keys.get(key)
+        if votes is None:
+            votes = _Votes()
+            votes.buckets = deque((), self._max_buckets or None)
+            self._keys[key] = votes
+            # least recently voted keys are forgotten first
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(key)
+        return votes
+
+    def record(self, object, question, selections, now=None):
+        now = time.time() if now is None else now
+        start = int(now // self.resolution) * self.resolution
+        key = (entity_id(object), entity_id(question))
+        with self._lock:
+            votes = self._votes_for(key)
+            if self._max_buckets:
+                if not votes.buckets or votes.buckets[-1][0] != start:
+                    votes.buckets.append((start, {}))
+                counts = votes.buckets[-1][1]
+            for selection in selections or []:
+                if selection not in votes.total and len(votes.total) >= self.max_values:
+                    continue
+                votes.total[selection] = votes.total.get(selection, 0) + 1
+                if self._max_buckets:
+                    counts[selection] = counts.get(selection, 0) + 1
+
+    def _summary(self, votes, now):
+        windows = {}
+        for window in self.windows:
+            counts = {}
+            oldest = now - window
+            for start, bucket in votes.buckets:
+                if start + self.resolution <= oldest:
+                    continue
+                for selection, count in bucket.items():
+                    counts[selection] = counts.get(selection, 0) + count
+            windows[str(window)] = counts
+        return {'total': dict(votes.total), 'windows': windows}
+
+    def votes(self, object, question, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            votes = self._keys.get((entity_id(object), entity_id(question)))
+            if votes is None:
+                return {'total': {}, 'windows': dict((str(window), {}) for window in self.windows)}
+            return self._summary(votes, now)
+
+    def all_votes(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return [dict(object=key[0], question=key[1], **self._summary(votes, now))
+                for key, votes in self._keys.items()]
+
+    def snapshot(self, path=None):
+        path = path if path else self.snapshot_path
+        with self._lock:
+            data = [{
+                'object': key[0],
+                'question': key[1],
+                'total': votes.total,
+                'buckets': list(votes.buckets)
+            } for key, votes in self._keys.items()]
+            encoded = json.dumps(data)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            fh.write(encoded)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        with open(path, 'r') as fh:
+            data = json.load(fh)
+        with self._lock:
+            for item in data:
+                votes = self._votes_for((item['object'], item['question']))
+                votes.total = item['total']
+                votes.buckets = deque(((start, counts) for start, counts in item['buckets']),
+                    self._max_buckets or None)
+
+    def _snapshot_loop(self):
+        while not self._stopped.wait(self.snapshot_interval):
+            self.snapshot()
+
+    def close(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self.snapshot()
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+
+from .emoji_feedback_sensor import EmojiFeedbackSensor, ANONYMOUS_ACTOR, ANONYMOUS_EDAPP, ANONYMOUS_SESSION
+from .async_transport import AsyncTransport
+from .errors import QueueFullError
+from .resilience import deliver_with_policy_async
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncEmojiFeedbackSensor(EmojiFeedbackSensor):
+    def __init__(self, caliper_host=None, caliper_api_key=None, debug=False, transport=None,
+            max_concurrency=10, max_queue=10000, max_batch_events=100, aggregator=None,
+            dedup=None, admission=None, retry=None, breaker=None, fallback=None, metrics=None,
+            validator=None, destinations=None, sink=None, degradation=None):
+        super().__init__(caliper_host, caliper_api_key, debug,
+            transport=transport if transport else AsyncTransport(pool_maxsize=max_concurrency),
+            aggregator=aggregator, dedup=dedup, admission=admission, retry=retry, breaker=breaker,
+            fallback=fallback, metrics=metrics, validator=validator, destinations=destinations,
+            sink=sink, degradation=degradation)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_batch_events = max_batch_events
+        self._semaphore = None
+        self._queue = None
+        self._workers = []
+
+    async def send_emoji_feedback(self, eventTime, object, question, selections,
+            edApp=ANONYMOUS_EDAPP, session=ANONYMOUS_SESSION, actor=ANONYMOUS_ACTOR,
+            **kwargs):
+        prepared = self._prepare_emoji(eventTime, object, question, selections, edApp, session, actor, kwargs)
+        if prepared is not None:
+            await self._emit_or_forget_async(*prepared)
+            self._record_vote(object, question, selections)
+
+    async def send_comment_feedback(self, eventTime, object, questionText, commentText,
+            edApp=ANONYMOUS_EDAPP, session=ANONYMOUS_SESSION, actor=ANONYMOUS_ACTOR,
+            **kwargs):
+        prepared = self._prepare_comment(eventTime, object, questionText, commentText, edApp, session, actor,
+            kwargs)
+        if prepared is not None:
+            await self._emit_or_forget_async(*prepared)
+
+    def enqueue_emoji_feedback(self, eventTime, object, question, selections,
+            edApp=ANONYMOUS_EDAPP, session=ANONYMOUS_SESSION, actor=ANONYMOUS_ACTOR,
+            **kwargs):
+        prepared = self._prepare_emoji(eventTime, object, question, selections, edApp, session, actor, kwargs)
+        if prepared is not None:
+            self._enqueue_or_forget(*prepared)
+            self._record_vote(object, question, selections)
+
+    def enqueue_comment_feedback(self, eventTime, object, questionText, commentText,
+            edApp=ANONYMOUS_EDAPP, session=ANONYMOUS_SESSION, actor=ANONYMOUS_ACTOR,
+            **kwargs):
+        prepared = self._prepare_comment(eventTime, object, questionText, commentText, edApp, session, actor,
+            kwargs)
+        if prepared is not None:
+            self._enqueue_or_forget(*prepared)
+
+    async def _emit_or_forget_async(self, event, key):
+        try:
+            await self._emit_event(event)
+        except Exception:
+            if key is not None:
+                self.dedup.forget(key)
+            raise
+
+    def _enqueue_or_forget(self, event, key):
+        try:
+            self._enqueue_event(event)
+        except Exception:
+            if key is not None:
+                self.dedup.forget(key)
+            raise
+
+    def _enqueue_event(self, event):
+        # must be called from the event loop, delivery happens in background worker tasks
+        self._check_config()
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue)
+            self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.max_concurrency)]
+        try:
+            self._queue.put_nowait((event, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise QueueFullError()
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue else 0
+
+    def _queue_depth(self):
+        return self.queue_depth()
+
+    async def _worker(self):
+        while True:
+            entries = [await self._queue.get()]
+            while len(entries) < self.max_batch_events and not self._queue.empty():
+                entries.append(self._queue.get_nowait())
+            if self._metrics:
+                now = time.perf_counter()
+                for _, enqueued_at in entries:
+                    self._metrics.observe('queue_wait_seconds', now - enqueued_at)
+            events = [event for event, _ in entries]
+            try:
+                await self._send_events(events)
+            except Exception:
+                logger.exception('Emoji Feedback Error: failed to send %d events', len(events))
+            finally:
+                for _ in events:
+                    self._queue.task_done()
+
+    async def send_many(self, records, max_events=100, max_bytes=512 * 1024):
+        self._check_config()
+
+        sent = 0
+        pending = set()
+        try:
+            for envelope in self.generate_envelopes(records, max_events, max_bytes):
+                # keep at most max_concurrency envelopes built and in flight
+                if len(pending) >= self.max_concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                pending.add(asyncio.ensure_future(self._send_envelope(envelope)))
+                sent += len(envelope['data'])
+            if pending:
+                await asyncio.gather(*pending)
+                pending = set()
+        finally:
+            for task in pending:
+                task.cancel()
+        return sent
+
+    async def _emit_event(self, event):
+        self._check_config()
+        await self._send_events([ event ])
+
+    async def _send_events(self, events):
+        return await self._send_envelope(self._build_envelope(events))
+
+    async def _send_envelope(self, envelope):
+        if self.sink:
+            return self._write_sink(envelope)
+        if self.destinations:
+            # destinations deliver from their own threads, queueing never blocks the loop
+            return self._fan_out(envelope)
+        if self._metrics is None:
+            return await self._deliver(envelope)
+        try:
+            response = await self._deliver(envelope)
+        except Exception:
+            self._count_events(envelope['data'], 'failed')
+            raise
+        self._count_events(envelope['data'], 'diverted' if response is None else 'sent')
+        return response
+
+    async def _deliver(self, envelope):
+        if self.retry is None and self.breaker is None:
+            return await self._post_envelope(envelope)
+        return await deliver_with_policy_async(lambda: self._post_envelope(envelope), self.retry, self.breaker,
+            on_open=lambda: self._divert(envelope))
+
+    async def _post_envelope(self, envelope):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        metrics = self._metrics
+        if metrics:
+            start = time.perf_counter()
+            body = self._encoder.envelope(envelope)
+            metrics.observe('serialize_seconds', time.perf_counter() - start)
+            metrics.inc('bytes_sent_total', value=len(body))
+        else:
+            body = envelope
+
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                response = await self.transport.post(
+                    self.caliper_host,
+                    body,
+                    {
+                        'Authorization': 'Bearer '+str(self.caliper_api_key),
+                        'Content-Type': 'application/json'
+                    }
+                )
+                response.raise_for_status()
+            except Exception:
+                self._record_round_trip(time.perf_counter() - start, 'error')
+                raise
+        self._record_round_trip(time.perf_counter() - start, 'success')
+
+        if self.debug:
+            print(response.text)
+
+        return response
+
+    async def flush(self, timeout=None):
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        if self.destinations or self.sink:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, super().flush, timeout)
+        return True
+
+    async def close(self, timeout=None):
+        await self.flush(timeout)
+        for destination in self.destinations:
+            destination.close(timeout)
+        if self.sink:
+            self.sink.close()
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        self._queue = None
+        await self.transport.close()
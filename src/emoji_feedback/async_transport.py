@@ -0,0 +1,132 @@
+import asyncio
+import json
+import ssl
+from urllib.parse import urlsplit
+
+from .compression import REJECTED_STATUSES
+from .transport import Response
+
+
+# responses are the same as the threaded transports return
+AsyncResponse = Response
+
+
+class AsyncTransport(object):
+    # minimal HTTP/1.1 client on asyncio streams with a pool of keep-alive connections
+    def __init__(self, pool_maxsize=10, connect_timeout=3.05, read_timeout=10, ssl_context=None,
+            compression=None):
+        self.pool_maxsize = pool_maxsize
+        self.compression = compression
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.ssl_context = ssl_context
+        self._idle = {}
+
+    async def post(self, url, body, headers):
+        if not self.compression:
+            return await self._post(url, body, headers)
+
+        body, encoded, encoded_headers = self.compression.encode(body, headers)
+        if encoded is None:
+            return await self._post(url, body, headers)
+
+        response = await self._post(url, encoded, encoded_headers)
+        if response.status_code not in REJECTED_STATUSES:
+            return response
+
+        plain_response = await self._post(url, body, headers)
+        self.compression.rejected(response, plain_response)
+        return plain_response
+
+    async def _post(self, url, body, headers):
+        parts = urlsplit(url)
+        secure = parts.scheme == 'https'
+        port = parts.port or (443 if secure else 80)
+        key = (parts.hostname, port, secure)
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        if not isinstance(body, (bytes, bytearray)):
+            body = json.dumps(body).encode('utf-8')
+
+        host_header = parts.hostname if parts.port is None else '{}:{}'.format(parts.hostname, parts.port)
+        lines = ['POST {} HTTP/1.1'.format(path), 'Host: ' + host_header,
+            'Content-Length: {}'.format(len(body)), 'Connection: keep-alive']
+        lines.extend('{}: {}'.format(name, value) for name, value in headers.items())
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + bytes(body)
+
+        idle = self._idle.get(key)
+        if idle:
+            reader, writer = idle.pop()
+            try:
+                return await self._round_trip(key, reader, writer, request)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # the server closed the idle connection, retry on a fresh one
+                pass
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=self._ssl(secure)),
+            self.connect_timeout
+        )
+        return await self._round_trip(key, reader, writer, request)
+
+    def _ssl(self, secure):
+        if not secure:
+            return None
+        if self.ssl_context is None:
+            self.ssl_context = ssl.create_default_context()
+        return self.ssl_context
+
+    async def _round_trip(self, key, reader, writer, request):
+        try:
+            writer.write(request)
+            await writer.drain()
+            response, keep_alive = await asyncio.wait_for(self._read_response(reader), self.read_timeout)
+        except BaseException:
+            writer.close()
+            raise
+
+        idle = self._idle.setdefault(key, [])
+        if keep_alive and len(idle) < self.pool_maxsize:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+        return response
+
+    async def _read_response(self, reader):
+        status_line = await reader.readuntil(b'\r\n')
+        version, status, reason = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+        headers = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        status = int(status)
+        keep_alive = headers.get('connection', '').lower() != 'close' and version != 'HTTP/1.0'
+        if status < 200 or status in (204, 304):
+            # never have a body, whatever the headers say
+            content = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readuntil(b'\r\n')
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            content = b''.join(chunks)
+        elif 'content-length' in headers:
+            content = await reader.readexactly(int(headers['content-length']))
+        else:
+            content = await reader.read()
+            keep_alive = False
+
+        return AsyncResponse(status, reason, headers, content), keep_alive
+
+    async def close(self):
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle = {}
@@ -0,0 +1,60 @@
+import json
+import threading
+
+from .model import as_dict
+from .serialization import EVENT_ENTITY_KEYS, GENERATED_ENTITY_KEYS
+
+
+def _size(value):
+    return len(json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+
+def _compact(mapping, entity_keys, seen):
+    compacted = None
+    saved = 0
+    for key, value in mapping.items():
+        replacement = value
+        if key in entity_keys and isinstance(value, dict) and value.get('id'):
+            if value['id'] in seen:
+                replacement = value['id']
+                saved += _size(value) - _size(value['id'])
+            else:
+                seen.add(value['id'])
+        elif key == 'generated' and isinstance(value, dict):
+            replacement, generated_saved = _compact(value, GENERATED_ENTITY_KEYS, seen)
+            saved += generated_saved
+
+        if replacement is not value:
+            # copy on write so the caller's events are left untouched
+            if compacted is None:
+                compacted = dict(mapping)
+            compacted[key] = replacement
+    return (compacted if compacted is not None else mapping), saved
+
+
+def compact_envelope(envelope):
+    # keeps the first full copy of each entity and swaps later copies for their id IRI
+    seen = set()
+    saved = 0
+    data = []
+    for event in envelope['data']:
+        event, event_saved = _compact(as_dict(event), EVENT_ENTITY_KEYS, seen)
+        data.append(event)
+        saved += event_saved
+    compacted = dict(envelope)
+    compacted['data'] = data
+    return compacted, saved
+
+
+class EnvelopeCompactor(object):
+    def __init__(self):
+        self.bytes_saved = 0
+        self.envelopes = 0
+        self._lock = threading.Lock()
+
+    def compact(self, envelope):
+        compacted, saved = compact_envelope(envelope)
+        with self._lock:
+            self.bytes_saved += saved
+            self.envelopes += 1
+        return compacted
@@ -0,0 +1,43 @@
+import json
+import zlib
+
+WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS
+}
+
+# statuses an endpoint may answer with when it does not accept Content-Encoding
+REJECTED_STATUSES = (400, 415)
+
+
+class Compression(object):
+    def __init__(self, encoding='gzip', threshold=1024, level=6):
+        if encoding not in WBITS:
+            raise Exception('Emoji Feedback Error: unsupported content encoding {}'.format(encoding))
+        self.encoding = encoding
+        self.threshold = threshold
+        self.level = level
+        self.enabled = True
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def encode(self, body, headers):
+        # returns the plain bytes and, when worth compressing, the encoded bytes and headers
+        if not isinstance(body, (bytes, bytearray)):
+            body = json.dumps(body).encode('utf-8')
+        if not self.enabled or len(body) < self.threshold:
+            return body, None, None
+
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, WBITS[self.encoding])
+        encoded = compressor.compress(memoryview(body)) + compressor.flush()
+        self.bytes_in += len(body)
+        self.bytes_out += len(encoded)
+
+        encoded_headers = dict(headers)
+        encoded_headers['Content-Encoding'] = self.encoding
+        return body, encoded, encoded_headers
+
+    def rejected(self, encoded_response, plain_response):
+        # stop compressing once the endpoint has shown it only takes plain bodies
+        if encoded_response.status_code == 415 or plain_response.status_code < 400:
+            self.enabled = False
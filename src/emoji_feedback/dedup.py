@@ -0,0 +1,47 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .model import entity_id
+
+
+class DuplicateFilter(object):
+    # drops repeat submissions of the same feedback seen within the last `window` seconds
+    def __init__(self, window=2.0, max_entries=10000):
+        self.window = window
+        self.max_entries = max_entries
+        self.suppressed = 0
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def emoji_key(actor, object, question, selections):
+        return ('Ranked', entity_id(actor), entity_id(object), entity_id(question), tuple(selections or ()))
+
+    @staticmethod
+    def comment_key(actor, object, questionText, commentText):
+        return ('Commented', entity_id(actor), entity_id(object), questionText, commentText)
+
+    def is_duplicate(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # entries are in insertion order, so expired ones are always at the front
+            while self._seen:
+                oldest_key, seen_at = next(iter(self._seen.items()))
+                if now - seen_at < self.window:
+                    break
+                del self._seen[oldest_key]
+
+            if key in self._seen:
+                self.suppressed += 1
+                return True
+
+            self._seen[key] = now
+            if len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return False
+
+    def forget(self, key):
+        # lets a retry through when the first submission could not be delivered
+        with self._lock:
+            self._seen.pop(key, None)
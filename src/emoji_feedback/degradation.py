@@ -0,0 +1,80 @@
+import random
+import threading
+
+FULL = 'full'
+DEGRADED = 'degraded'
+
+
+class DegradationPolicy(object):
+    # switches to slimmer events, and optionally samples them, while the delivery queue or the Caliper
+    # host round trip is over its threshold. recovers once both fall below recover_ratio of their thresholds
+    def __init__(self, max_queue_depth=None, max_latency=None, recover_ratio=0.5, trim=True,
+            keep_fields=('id', 'type'), drop_extensions=True, sample_rates=None, latency_weight=0.2,
+            random=random.random):
+        self.max_queue_depth = max_queue_depth
+        self.max_latency = max_latency
+        self.recover_ratio = recover_ratio
+        self.trim = trim
+        self.keep_fields = tuple(keep_fields)
+        self.drop_extensions = drop_extensions
+        # fraction of each action kept while degraded, e.g. {'Commented': 0.25}
+        self.sample_rates = dict(sample_rates) if sample_rates else {}
+        self.latency_weight = latency_weight
+        self.mode = FULL
+        self.latency = None
+        self.transitions = 0
+        self.sampled_out = 0
+        self._random = random
+        self._lock = threading.Lock()
+
+    def observe_latency(self, seconds):
+        # exponentially weighted, so one slow response does not flip the mode
+        with self._lock:
+            if self.latency is None:
+                self.latency = seconds
+            else:
+                self.latency += self.latency_weight * (seconds - self.latency)
+
+    def update(self, queue_depth):
+        depth_ratio = queue_depth / float(self.max_queue_depth) if self.max_queue_depth else 0.0
+        latency_ratio = (self.latency or 0.0) / self.max_latency if self.max_latency else 0.0
+        pressure = max(depth_ratio, latency_ratio)
+        mode = self.mode
+        if mode == FULL and pressure >= 1:
+            mode = DEGRADED
+        elif mode == DEGRADED and pressure < self.recover_ratio:
+            mode = FULL
+        if mode != self.mode:
+            with self._lock:
+                self.mode = mode
+                self.transitions += 1
+        return mode
+
+    def sample_rate(self, action):
+        return self.sample_rates.get(action, 1.0) if self.mode == DEGRADED else 1.0
+
+    def sample(self, action):
+        # True to keep the event
+        rate = self.sample_rate(action)
+        if rate >= 1 or self._random() < rate:
+            return True
+        with self._lock:
+            self.sampled_out += 1
+        return False
+
+    def trim_entity(self, entity):
+        if not self.trim or entity.__class__ is not dict:
+            return entity
+        return dict((key, entity[key]) for key in self.keep_fields if key in entity)
+
+    def tag(self, action):
+        # recorded on every event so analysis can tell slimmed and sampled events apart, and reweight them
+        return {'emojiFeedbackMode': self.mode, 'sampleRate': self.sample_rate(action)}
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'latency': self.latency,
+            'transitions': self.transitions,
+            'sampled_out': self.sampled_out
+        }
@@ -0,0 +1,222 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from .errors import QueueFullError
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest', 'spill')
+
+
+class BatchingEmitter(object):
+    # queues events and sends them from a worker thread, many per envelope
+    remote = False
+
+    def __init__(self, max_events=100, max_bytes=512 * 1024, max_delay=0.5,
+            max_queue=None, overflow='block', block_timeout=1.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise Exception('Emoji Feedback Error: unknown overflow policy {}'.format(overflow))
+
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.spilled = 0
+        self.blocked = 0
+        self.block_timeouts = 0
+        # set by the sensor to record how long events wait in the queue
+        self.metrics = None
+        # entries are [event, size, enqueued_at, queued], sizes are measured by the worker
+        self._queue = deque()
+        self._unsized = deque()
+        self._queued_bytes = 0
+        self._in_flight = 0
+        self._flush_requests = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._send = None
+        self._size = None
+        self._spill = None
+        self._dropped = None
+        self._thread = None
+
+    def start(self, send, size=None, spill=None, dropped=None):
+        if self.overflow == 'spill' and spill is None:
+            raise Exception('Emoji Feedback Error: spill overflow policy needs a spool')
+        self._send = send
+        self._size = size if size else lambda event: len(json.dumps(event).encode('utf-8'))
+        self._spill = spill
+        self._dropped = dropped
+        self._thread = threading.Thread(target=self._run, name='emoji-feedback-emitter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def emit(self, event):
+        discarded = None
+        with self._cond:
+            if self._closed:
+                raise Exception('Emoji Feedback Error: emitter is closed')
+            if self.max_queue and len(self._queue) >= self.max_queue:
+                discarded = self._make_room(event)
+            if discarded is not event:
+                entry = [event, None, time.time(), True]
+                self._queue.append(entry)
+                self._unsized.append(entry)
+                # the worker measures new events, and checks max_bytes, once woken
+                if len(self._unsized) == 1 or len(self._queue) >= self.max_events:
+                    self._cond.notify_all()
+
+        # hand discarded events back to the spool outside the lock
+        if discarded is not None:
+            if self.overflow == 'spill':
+                self._spill(discarded)
+            elif self._dropped:
+                self._dropped(discarded)
+
+    def _make_room(self, event):
+        # returns the event pushed out of the queue, if any
+        if self.overflow == 'drop_oldest':
+            oldest = self._dequeue()
+            self.dropped_oldest += 1
+            return oldest
+
+        if self.overflow == 'drop_newest':
+            self.dropped_newest += 1
+            return event
+
+        if self.overflow == 'spill':
+            self.spilled += 1
+            return event
+
+        self.blocked += 1
+        deadline = time.time() + self.block_timeout
+        while len(self._queue) >= self.max_queue and not self._closed:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                self.block_timeouts += 1
+                raise QueueFullError()
+            self._cond.wait(remaining)
+        if self._closed:
+            raise Exception('Emoji Feedback Error: emitter is closed')
+        return None
+
+    def queue_depth(self):
+        return len(self._queue)
+
+    def stats(self):
+        return {
+            'queue_depth': len(self._queue),
+            'dropped_oldest': self.dropped_oldest,
+            'dropped_newest': self.dropped_newest,
+            'spilled': self.spilled,
+            'blocked': self.blocked,
+            'block_timeouts': self.block_timeouts
+        }
+
+    def _dequeue(self):
+        entry = self._queue.popleft()
+        entry[3] = False
+        if entry[1] is not None:
+            self._queued_bytes -= entry[1]
+        return entry[0]
+
+    def _measure(self):
+        # size newly queued events on the worker thread, outside the lock
+        with self._cond:
+            entries = [entry for entry in self._unsized if entry[3]]
+            self._unsized.clear()
+        if not entries:
+            return
+        sizes = [self._measure_event(entry[0]) for entry in entries]
+        with self._cond:
+            for entry, size in zip(entries, sizes):
+                entry[1] = size
+                if entry[3]:
+                    self._queued_bytes += size
+
+    def _measure_event(self, event):
+        try:
+            return self._size(event)
+        except Exception:
+            # an event that can not be measured fails when its batch is sent
+            logger.exception('Emoji Feedback Error: failed to measure event')
+            return 0
+
+    def _next_batch(self):
+        while True:
+            self._measure()
+            with self._cond:
+                if self._unsized:
+                    continue
+                if self._queue:
+                    deadline = self._queue[0][2] + self.max_delay
+                    full = len(self._queue) >= self.max_events or self._queued_bytes >= self.max_bytes
+                    remaining = deadline - time.time()
+                    if full or remaining <= 0 or self._closed or self._flush_requests:
+                        return self._take_batch()
+                    self._cond.wait(remaining)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _take_batch(self):
+        batch = []
+        batch_bytes = 0
+        now = time.time()
+        while self._queue and len(batch) < self.max_events:
+            size, enqueued_at = self._queue[0][1], self._queue[0][2]
+            if batch and batch_bytes + size > self.max_bytes:
+                break
+            batch.append(self._dequeue())
+            batch_bytes += size
+            if self.metrics:
+                self.metrics.observe('queue_wait_seconds', now - enqueued_at)
+        self._in_flight += 1
+        # wake producers blocked on a full queue
+        self._cond.notify_all()
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._send(batch)
+            except Exception:
+                logger.exception('Emoji Feedback Error: failed to send %d events', len(batch))
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            # the worker skips the max_delay wait while any flush is waiting
+            self._flush_requests += 1
+            self._cond.notify_all()
+            try:
+                while self._queue or self._in_flight:
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._flush_requests -= 1
+
+    def close(self, timeout=None):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
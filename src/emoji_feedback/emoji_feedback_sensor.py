@@ -1,8 +1,19 @@
-import uuid
-import requests
-from datetime import datetime
+import json
+import logging
+import threading
+import time
 from os import environ
 
+from .errors import CircuitOpenError
+from .ids import FastIdProvider
+from .degradation import DEGRADED
+from .metrics import COMMENTED, RANKED, action_labels
+from .model import CALIPER_CONTEXT, Comment, FeedbackEvent, Rating, default_serializer, entity_id
+from .resilience import deliver_with_policy
+from .transport import PostTransport
+
+logger = logging.getLogger(__name__)
+
 ANONYMOUS_ACTOR = {
     'id': 'http://purl.imsglobal.org/caliper/Person',
     'type': 'Person'
@@ -18,20 +29,76 @@ ANONYMOUS_SESSION = {
     'type': 'Session'
 }
 
+def _is_anonymous(actor):
+    # the default actor stands for every learner, so submissions can't be told apart by it
+    return entity_id(actor) == ANONYMOUS_ACTOR['id']
+
 class EmojiFeedbackSensor(object):
     SENSOR_ID = "https://emojifeedback.learninganalytics.ubc.ca/"
     CALIPER_VERSION = "http://purl.imsglobal.org/ctx/caliper/v1p2"
 
-    def __init__(self, caliper_host=None, caliper_api_key=None, debug=False):
+    def __init__(self, caliper_host=None, caliper_api_key=None, debug=False, transport=None,
+            emitter=None, spool=None, serializer=None, compactor=None, id_provider=None,
+            use_event_model=False, aggregator=None, dedup=None, admission=None, retry=None,
+            breaker=None, fallback=None, metrics=None, validator=None, destinations=None,
+            sink=None, degradation=None):
         self.caliper_host = caliper_host if caliper_host else environ.get('EMOJI_FEEDBACK_CALIPER_HOST', None)
         self.caliper_api_key = caliper_api_key if caliper_api_key else environ.get('EMOJI_FEEDBACK_CALIPER_API_KEY', None)
         self.debug = debug
+        self.transport = transport if transport else PostTransport()
+        self.emitter = emitter
+        self.spool = spool
+        self.serializer = serializer
+        # FeedbackEvent objects are encoded from their attributes rather than converted to dicts,
+        # and envelopes are encoded up front when metrics need their size or destinations share them
+        self._encoder = serializer if serializer else (
+            default_serializer() if use_event_model or metrics or destinations else None)
+        self.compactor = compactor
+        self.id_provider = id_provider if id_provider else FastIdProvider()
+        self.use_event_model = use_event_model
+        self.aggregator = aggregator
+        self.dedup = dedup
+        self.admission = admission
+        self.retry = retry
+        self.breaker = breaker
+        self.fallback = fallback
+        self._metrics = metrics
+        self.validator = validator
+        self.destinations = list(destinations) if destinations else []
+        self.sink = sink
+        self.degradation = degradation
+        self._spool_backlog = False
+        self._replay_lock = threading.Lock()
+        self._replay_thread = None
+        if metrics:
+            for destination in self.destinations:
+                destination.metrics = metrics
+        if self.emitter:
+            if metrics and not self.emitter.remote:
+                self.emitter.metrics = metrics
+            self.emitter.start(self._send_events, self._event_size,
+                self._spill_event if self.spool else None,
+                self._drop_event if self.spool else None)
+        if self.spool and self.spool.pending_count() and self.caliper_host and self.caliper_api_key:
+            self.replay_spool()
+
+    def build_emoji_feedback_event(self, eventTime, object, question, selections,
+            edApp=ANONYMOUS_EDAPP, session=ANONYMOUS_SESSION, actor=ANONYMOUS_ACTOR,
+            **kwargs):
+        start = time.perf_counter() if self._metrics else None
+        generated = Rating(self.id_provider.new_id(), actor, object, question, selections, eventTime)
+        event = FeedbackEvent(self.id_provider.new_id(), 'Ranked', actor, object, edApp, session,
+            generated, eventTime, kwargs)
+        if start is not None:
+            self._metrics.observe('generate_seconds', time.perf_counter() - start, RANKED)
+        return event
 
     def generate_emoji_feedback_event(self, eventTime, object, question, selections,
             edApp=ANONYMOUS_EDAPP, session=ANONYMOUS_SESSION, actor=ANONYMOUS_ACTOR,
             **kwargs):
+        start = time.perf_counter() if self._metrics else None
         generated = {
-            'id': 'urn:uuid:' + str(uuid.uuid4()),
+            'id': self.id_provider.new_id(),
             'type': 'Rating',
             'rater': actor,
             'rated': object,
@@ -40,8 +107,8 @@ class EmojiFeedbackSensor(object):
             'dateCreated': eventTime
         }
         event = {
-            'id': 'urn:uuid:' + str(uuid.uuid4()),
-            '@context': 'http://purl.imsglobal.org/ctx/caliper/v1p2',
+            'id': self.id_provider.new_id(),
+            '@context': CALIPER_CONTEXT,
             'type': 'FeedbackEvent',
             'actor': actor,
             'action': 'Ranked',
@@ -54,20 +121,63 @@ class EmojiFeedbackSensor(object):
         }
         event.update(kwargs)
 
+        if start is not None:
+            self._metrics.observe('generate_seconds', time.perf_counter() - start, RANKED)
         return event
 
     def send_emoji_feedback(self, eventTime, object, question, selections,
             edApp=ANONYMOUS_EDAPP, session=ANONYMOUS_SESSION, actor=ANONYMOUS_ACTOR,
             **kwargs):
-        event = self.generate_emoji_feedback_event(eventTime, object, question, selections,
-            edApp, session, actor, **kwargs)
-        self._emit_event(event)
+        prepared = self._prepare_emoji(eventTime, object, question, selections, edApp, session, actor, kwargs)
+        if prepared is not None:
+            self._emit_or_forget(*prepared)
+            self._record_vote(object, question, selections)
+
+    def _prepare_emoji(self, eventTime, object, question, selections, edApp, session, actor, kwargs):
+        # validates, deduplicates, admits and degrades a submission, then builds its event.
+        # returns (event, dedup key), or None when the submission is not to be sent
+        if self.validator:
+            self.validator.validate_emoji(eventTime, object, question, selections, edApp, session, actor)
+        key = self._dedup_emoji_key(actor, object, question, selections)
+        if not self._accept(actor, key):
+            return None
+        if self.degradation:
+            degraded = self._degrade('Ranked', (actor, object, edApp, session, question), kwargs)
+            if degraded is None:
+                # sampled out upstream, live vote counts still include it
+                self._record_vote(object, question, selections)
+                return None
+            (actor, object, edApp, session, question), kwargs = degraded
+        if self.use_event_model:
+            event = self.build_emoji_feedback_event(eventTime, object, question, selections,
+                edApp, session, actor, **kwargs)
+        else:
+            event = self.generate_emoji_feedback_event(eventTime, object, question, selections,
+                edApp, session, actor, **kwargs)
+        return event, key
+
+    def _record_vote(self, object, question, selections):
+        # only once the event is sent or queued, a failed send is retried by the client and counted then
+        if self.aggregator:
+            self.aggregator.record(object, question, selections)
+
+    def build_comment_feedback_event(self, eventTime, object, questionText, commentText,
+            edApp=ANONYMOUS_EDAPP, session=ANONYMOUS_SESSION, actor=ANONYMOUS_ACTOR,
+            **kwargs):
+        start = time.perf_counter() if self._metrics else None
+        generated = Comment(self.id_provider.new_id(), actor, object, commentText, eventTime, questionText)
+        event = FeedbackEvent(self.id_provider.new_id(), 'Commented', actor, object, edApp, session,
+            generated, eventTime, kwargs)
+        if start is not None:
+            self._metrics.observe('generate_seconds', time.perf_counter() - start, COMMENTED)
+        return event
 
     def generate_comment_feedback_event(self, eventTime, object, questionText, commentText,
             edApp=ANONYMOUS_EDAPP, session=ANONYMOUS_SESSION, actor=ANONYMOUS_ACTOR,
             **kwargs):
+        start = time.perf_counter() if self._metrics else None
         generated = {
-            'id': 'urn:uuid:' + str(uuid.uuid4()),
+            'id': self.id_provider.new_id(),
             'type': 'Comment',
             'commenter': actor,
             'commentedOn': object,
@@ -78,8 +188,8 @@ class EmojiFeedbackSensor(object):
             }
         }
         event = {
-            'id': 'urn:uuid:' + str(uuid.uuid4()),
-            '@context': 'http://purl.imsglobal.org/ctx/caliper/v1p2',
+            'id': self.id_provider.new_id(),
+            '@context': CALIPER_CONTEXT,
             'type': 'FeedbackEvent',
             'actor': actor,
             'action': 'Commented',
@@ -92,39 +202,372 @@ class EmojiFeedbackSensor(object):
         }
         event.update(kwargs)
 
+        if start is not None:
+            self._metrics.observe('generate_seconds', time.perf_counter() - start, COMMENTED)
         return event
 
     def send_comment_feedback(self, eventTime, object, questionText, commentText,
             edApp=ANONYMOUS_EDAPP, session=ANONYMOUS_SESSION, actor=ANONYMOUS_ACTOR,
             **kwargs):
-        event = self.generate_comment_feedback_event(eventTime, object, questionText, commentText,
-            edApp, session, actor, **kwargs)
-        self._emit_event(event)
+        prepared = self._prepare_comment(eventTime, object, questionText, commentText, edApp, session, actor,
+            kwargs)
+        if prepared is not None:
+            self._emit_or_forget(*prepared)
+
+    def _prepare_comment(self, eventTime, object, questionText, commentText, edApp, session, actor, kwargs):
+        if self.validator:
+            self.validator.validate_comment(eventTime, object, questionText, commentText, edApp, session, actor)
+        key = self._dedup_comment_key(actor, object, questionText, commentText)
+        if not self._accept(actor, key):
+            return None
+        if self.degradation:
+            degraded = self._degrade('Commented', (actor, object, edApp, session), kwargs)
+            if degraded is None:
+                return None
+            (actor, object, edApp, session), kwargs = degraded
+        if self.use_event_model:
+            event = self.build_comment_feedback_event(eventTime, object, questionText, commentText,
+                edApp, session, actor, **kwargs)
+        else:
+            event = self.generate_comment_feedback_event(eventTime, object, questionText, commentText,
+                edApp, session, actor, **kwargs)
+        return event, key
+
+    def _dedup_emoji_key(self, actor, object, question, selections):
+        if self.dedup is None or _is_anonymous(actor):
+            return None
+        return self.dedup.emoji_key(actor, object, question, selections)
+
+    def _dedup_comment_key(self, actor, object, questionText, commentText):
+        if self.dedup is None or _is_anonymous(actor):
+            return None
+        return self.dedup.comment_key(actor, object, questionText, commentText)
+
+    def _accept(self, actor, key):
+        if key is not None and self.dedup.is_duplicate(key):
+            return False
+        # the anonymous actor is shared by every learner, it must not get a single per-actor bucket
+        if self.admission is not None and not self.admission.admit(None if _is_anonymous(actor) else actor):
+            # a rejected submission must not suppress a later retry
+            if key is not None:
+                self.dedup.forget(key)
+            return False
+        return True
+
+    def _degrade(self, action, entities, kwargs):
+        # the entities and extra fields to build the event from under the current mode, None to drop it
+        policy = self.degradation
+        if policy.update(self._queue_depth()) == DEGRADED:
+            if not policy.sample(action):
+                if self._metrics:
+                    self._metrics.inc('events_total', (('action', action), ('outcome', 'sampled_out')))
+                return None
+            entities = tuple(policy.trim_entity(entity) for entity in entities)
+            if policy.drop_extensions:
+                kwargs = {}
+        extensions = dict(kwargs.get('extensions') or {})
+        extensions.update(policy.tag(action))
+        return entities, dict(kwargs, extensions=extensions)
+
+    def _queue_depth(self):
+        return self.emitter.queue_depth() if self.emitter else 0
+
+    def _emit_or_forget(self, event, key):
+        try:
+            self._emit_event(event)
+        except Exception:
+            if key is not None:
+                self.dedup.forget(key)
+            raise
+
+    def generate_events(self, records):
+        # records are the keyword arguments of the generate_*_event methods
+        for record in records:
+            if 'commentText' in record:
+                yield self.generate_comment_feedback_event(**record)
+            else:
+                yield self.generate_emoji_feedback_event(**record)
+
+    def generate_envelopes(self, records, max_events=100, max_bytes=512 * 1024):
+        overhead = self._envelope_size(self._build_envelope([]))
+        events = []
+        size = overhead
+        for event in self.generate_events(records):
+            # +2 for the ', ' separator between events
+            event_size = self._event_size(event) + 2
+            if events and (len(events) >= max_events or size + event_size > max_bytes):
+                yield self._build_envelope(events)
+                events = []
+                size = overhead
+            events.append(event)
+            size += event_size
+        if events:
+            yield self._build_envelope(events)
+
+    def send_many(self, records, max_events=100, max_bytes=512 * 1024):
+        self._check_config()
+
+        sent = 0
+        for envelope in self.generate_envelopes(records, max_events, max_bytes):
+            self._send_envelope(envelope)
+            sent += len(envelope['data'])
+        return sent
+
+    def _event_size(self, event):
+        if self._encoder:
+            return len(self._encoder.event(event))
+        return len(json.dumps(event).encode('utf-8'))
+
+    def _envelope_size(self, envelope):
+        if self._encoder:
+            return len(self._encoder.envelope(envelope))
+        return len(json.dumps(envelope).encode('utf-8'))
+
+    def _check_config(self):
+        # each destination carries its own Caliper host and key, a sink needs neither
+        if self.destinations or self.sink:
+            return
 
-    def _emit_event(self, event):
         if not self.caliper_host:
             raise Exception('Emoji Feedback Error: Caliper Host not set')
 
         if not self.caliper_api_key:
             raise Exception('Emoji Feedback Error: Caliper API Key not set')
 
-        sendTime = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-        envelope = {
+    def _emit_event(self, event):
+        # a remote emitter hands events to a local agent that holds the Caliper config
+        if not (self.emitter and self.emitter.remote):
+            self._check_config()
+
+        if self.spool:
+            self.spool.append(event)
+
+        if self.emitter:
+            self.emitter.emit(event)
+        elif self.spool:
+            # the event is safe on disk and will be replayed once the Caliper host recovers
+            try:
+                self._send_events([ event ])
+            except Exception:
+                logger.exception('Emoji Feedback Error: failed to send event, kept in spool')
+        else:
+            self._send_events([ event ])
+
+    def _build_envelope(self, events):
+        sendTime = self.id_provider.send_time()
+        return {
             'sensor': EmojiFeedbackSensor.SENSOR_ID,
             'sendTime': sendTime,
             'dataVersion': EmojiFeedbackSensor.CALIPER_VERSION,
-            'data': [ event ]
+            'data': events
         }
 
-        response = requests.post(
-            self.caliper_host,
-            json=envelope,
-            headers={
-                'Authorization': 'Bearer '+str(self.caliper_api_key),
-                'Content-Type': 'application/json'
-            }
-        )
-        response.raise_for_status()
+    def _send_events(self, events):
+        if not self.spool:
+            return self._send_envelope(self._build_envelope(events))
+        if self.destinations:
+            # only queued here, the events leave the spool once every destination is done with them
+            return self._fan_out(self._build_envelope(events), self._settle_spool(events))
+
+        try:
+            response = self._send_envelope(self._build_envelope(events))
+        except Exception:
+            self.spool.release(events)
+            self._spool_backlog = True
+            raise
+        self.spool.ack(events)
+        if self._spool_backlog:
+            self.replay_spool()
+        return response
+
+    def _settle_spool(self, events):
+        def settle(delivered):
+            if not delivered:
+                self.spool.release(events)
+                self._spool_backlog = True
+                return
+            self.spool.ack(events)
+            if self._spool_backlog:
+                self.replay_spool()
+        return settle
+
+    def _spill_event(self, event):
+        # already written to the spool by _emit_event, let the next replay pick it up
+        self.spool.release([ event ])
+        self._spool_backlog = True
+
+    def _drop_event(self, event):
+        self.spool.ack([ event ])
+
+    def replay_spool(self, batch_size=100):
+        # replays in a background thread so web workers never wait on a retry
+        with self._replay_lock:
+            if self._replay_thread and self._replay_thread.is_alive():
+                return self._replay_thread
+            self._spool_backlog = False
+            self._replay_thread = threading.Thread(target=self._replay_spool, args=(batch_size,),
+                name='emoji-feedback-spool-replay')
+            self._replay_thread.daemon = True
+            self._replay_thread.start()
+            return self._replay_thread
+
+    def _replay_spool(self, batch_size):
+        for events in self.spool.replay_batches(batch_size):
+            if self.destinations:
+                self._fan_out(self._build_envelope(events), self._settle_spool(events))
+                continue
+            try:
+                self._send_envelope(self._build_envelope(events))
+            except Exception:
+                self.spool.release(events)
+                self._spool_backlog = True
+                logger.warning('Emoji Feedback Error: spool replay failed, %d events pending',
+                    self.spool.pending_count())
+                return
+            self.spool.ack(events)
+
+    def _send_envelope(self, envelope):
+        if self.sink:
+            return self._write_sink(envelope)
+        if self.destinations:
+            return self._fan_out(envelope)
+        if self._metrics is None:
+            return self._deliver(envelope)
+        try:
+            response = self._deliver(envelope)
+        except Exception:
+            self._count_events(envelope['data'], 'failed')
+            raise
+        self._count_events(envelope['data'], 'diverted' if response is None else 'sent')
+        return response
+
+    def _fan_out(self, envelope, on_complete=None):
+        # encoded once, the same bytes are queued for every destination and sent from their own threads.
+        # on_complete(delivered) is called once every destination has a final outcome
+        if self.compactor:
+            envelope = self.compactor.compact(envelope)
+        metrics = self._metrics
+        if metrics:
+            start = time.perf_counter()
+        body = self._encoder.envelope(envelope)
+        if metrics:
+            metrics.observe('serialize_seconds', time.perf_counter() - start)
+            self._count_events(envelope['data'], 'queued')
+        countdown = None
+        if on_complete:
+            from .fanout import Countdown
+            countdown = Countdown(len(self.destinations), on_complete)
+        for destination in self.destinations:
+            destination.put(body, envelope['data'], countdown)
+        return None
+
+    def _write_sink(self, envelope):
+        # events are appended to local files and replayed into the Caliper host in bulk later
+        self.sink.write(envelope['data'])
+        if self._metrics:
+            self._count_events(envelope['data'], 'written')
+        return None
+
+    def _count_events(self, events, outcome):
+        counts = {}
+        for event in events:
+            labels = action_labels(event)
+            counts[labels] = counts.get(labels, 0) + 1
+        for labels, count in counts.items():
+            self._metrics.inc('events_total', labels + (('outcome', outcome),), count)
+
+    def _deliver(self, envelope):
+        if self.retry is None and self.breaker is None:
+            return self._post_envelope(envelope)
+        return deliver_with_policy(lambda: self._post_envelope(envelope), self.retry, self.breaker,
+            on_open=lambda: self._divert(envelope))
+
+    def _divert(self, envelope):
+        # fail fast while the circuit is open, the fallback sink takes the events if there is one
+        if self.fallback is None:
+            raise CircuitOpenError()
+        self.fallback.write(envelope['data'])
+        return None
+
+    def _post_envelope(self, envelope):
+        if self.compactor:
+            envelope = self.compactor.compact(envelope)
+        metrics = self._metrics
+        if metrics:
+            start = time.perf_counter()
+            body = self._encoder.envelope(envelope)
+            metrics.observe('serialize_seconds', time.perf_counter() - start)
+            metrics.inc('bytes_sent_total', value=len(body))
+        else:
+            body = self._encoder.envelope(envelope) if self._encoder else envelope
+
+        start = time.perf_counter()
+        try:
+            response = self.transport.post(
+                self.caliper_host,
+                body,
+                {
+                    'Authorization': 'Bearer '+str(self.caliper_api_key),
+                    'Content-Type': 'application/json'
+                }
+            )
+            response.raise_for_status()
+        except Exception:
+            self._record_round_trip(time.perf_counter() - start, 'error')
+            raise
+        self._record_round_trip(time.perf_counter() - start, 'success')
 
         if self.debug:
-            print(response.text)
\ No newline at end of file
+            print(response.text)
+
+        return response
+
+    def _record_round_trip(self, seconds, outcome):
+        if self._metrics:
+            self._metrics.observe('http_seconds', seconds, (('outcome', outcome),))
+        if self.degradation:
+            self.degradation.observe_latency(seconds)
+
+    def metrics(self):
+        # counters and histograms recorded so far, plus the current queue and spool depth
+        if self._metrics is None:
+            return {}
+        snapshot = self._metrics.snapshot()
+        snapshot['gauges'] = self._gauges()
+        return snapshot
+
+    def _gauges(self):
+        gauges = {
+            'queue_depth': self._queue_depth(),
+            'spool_pending': self.spool.pending_count() if self.spool else 0
+        }
+        if self.degradation:
+            gauges['degraded'] = int(self.degradation.mode == DEGRADED)
+        return gauges
+
+    def destination_stats(self):
+        return dict((destination.name, destination.stats()) for destination in self.destinations)
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        flushed = self.emitter.flush(timeout) if self.emitter else True
+        for destination in self.destinations:
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            flushed = destination.flush(remaining) and flushed
+        if self.sink:
+            self.sink.flush()
+        return flushed
+
+    def close(self, timeout=None):
+        if self.emitter:
+            self.emitter.flush(timeout)
+            self.emitter.close(timeout)
+        for destination in self.destinations:
+            destination.flush(timeout)
+            destination.close(timeout)
+        if self.sink:
+            self.sink.close()
+        if self._replay_thread:
+            self._replay_thread.join(timeout)
+        if self.spool:
+            self.spool.close()
@@ -0,0 +1,23 @@
+class QueueFullError(Exception):
+    # raised when an event can not be queued for delivery, callers may shed load on it
+    def __init__(self, message='Emoji Feedback Error: event queue is full'):
+        super(QueueFullError, self).__init__(message)
+
+
+class CircuitOpenError(Exception):
+    # raised instead of calling the Caliper host while the circuit breaker is open
+    def __init__(self, message='Emoji Feedback Error: circuit breaker is open'):
+        super(CircuitOpenError, self).__init__(message)
+
+
+class HTTPStatusError(Exception):
+    # an error status from the Caliper host, the response is kept for retry decisions
+    def __init__(self, message, response=None):
+        super(HTTPStatusError, self).__init__(message)
+        self.response = response
+
+
+class ValidationError(Exception):
+    # malformed or oversized feedback, rejected before an event is built
+    def __init__(self, message):
+        super(ValidationError, self).__init__('Emoji Feedback Error: ' + message)
@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from .errors import CircuitOpenError
+from .resilience import deliver_with_policy
+from .transport import SessionTransport
+
+logger = logging.getLogger(__name__)
+
+
+class Countdown(object):
+    # shared by the destinations an envelope was queued to, calls back once each has a final outcome.
+    # delivered is True only if every destination sent the events or diverted them to its fallback
+    __slots__ = ('remaining', 'delivered', 'callback', '_lock')
+
+    def __init__(self, count, callback):
+        self.remaining = count
+        self.delivered = True
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def done(self, delivered):
+        with self._lock:
+            self.remaining -= 1
+            self.delivered = self.delivered and delivered
+            if self.remaining:
+                return
+        self.callback(self.delivered)
+
+
+class Destination(object):
+    # one Caliper endpoint with its own credentials, queue and delivery thread, so a slow or failing
+    # destination never holds up the others
+    def __init__(self, caliper_host, caliper_api_key, name=None, transport=None, max_queue=1000,
+            retry=None, breaker=None, fallback=None):
+        if not caliper_host:
+            raise Exception('Emoji Feedback Error: Caliper Host not set')
+        if not caliper_api_key:
+            raise Exception('Emoji Feedback Error: Caliper API Key not set')
+
+        self.caliper_host = caliper_host
+        self.caliper_api_key = caliper_api_key
+        self.name = name if name else caliper_host
+        self.transport = transport if transport else SessionTransport()
+        self.max_queue = max_queue
+        self.retry = retry
+        self.breaker = breaker
+        self.fallback = fallback
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.diverted = 0
+        # set by the sensor to record delivery per destination
+        self.metrics = None
+        self._headers = {
+            'Authorization': 'Bearer ' + str(caliper_api_key),
+            'Content-Type': 'application/json'
+        }
+        # entries are (encoded envelope, events, countdown), shared with every other destination
+        self._queue = deque()
+        self._in_flight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def put(self, body, events, countdown=None):
+        # never blocks the caller, a full queue drops the envelope for this destination only
+        with self._cond:
+            if self._closed:
+                raise Exception('Emoji Feedback Error: destination {} is closed'.format(self.name))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                    name='emoji-feedback-destination-{}'.format(self.name))
+                self._thread.daemon = True
+                self._thread.start()
+            if len(self._queue) < self.max_queue:
+                self._queue.append((body, events, countdown))
+                self._cond.notify_all()
+                return True
+            self.dropped += len(events)
+        logger.warning('Emoji Feedback Error: queue for %s is full, dropped %d events', self.name, len(events))
+        self._record('dropped', events)
+        diverted = self._divert(events)
+        if countdown is not None:
+            countdown.done(diverted)
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                body, events, countdown = self._queue.popleft()
+                self._in_flight += 1
+
+            try:
+                self._deliver(body)
+                outcome = 'sent'
+            except CircuitOpenError:
+                outcome = 'diverted' if self._divert(events) else 'failed'
+            except Exception:
+                logger.exception('Emoji Feedback Error: failed to send %d events to %s', len(events), self.name)
+                outcome = 'diverted' if self._divert(events) else 'failed'
+            self._record(outcome, events)
+            if countdown is not None:
+                try:
+                    countdown.done(outcome != 'failed')
+                except Exception:
+                    logger.exception('Emoji Feedback Error: delivery callback for %s failed', self.name)
+
+            with self._cond:
+                if outcome == 'sent':
+                    self.sent += len(events)
+                elif outcome == 'diverted':
+                    self.diverted += len(events)
+                else:
+                    self.failed += len(events)
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def _deliver(self, body):
+        return deliver_with_policy(lambda: self._post(body), self.retry, self.breaker)
+
+    def _post(self, body):
+        metrics = self.metrics
+        start = time.perf_counter()
+        try:
+            response = self.transport.post(self.caliper_host, body, self._headers)
+            response.raise_for_status()
+        except Exception:
+            if metrics:
+                metrics.observe('destination_http_seconds', time.perf_counter() - start,
+                    (('destination', self.name), ('outcome', 'error')))
+            raise
+        if metrics:
+            metrics.observe('destination_http_seconds', time.perf_counter() - start,
+                (('destination', self.name), ('outcome', 'success')))
+        return response
+
+    def _divert(self, events):
+        # undeliverable events go to the fallback sink if there is one
+        if self.fallback is None:
+            return False
+        try:
+            self.fallback.write(events)
+        except Exception:
+            logger.exception('Emoji Feedback Error: fallback for %s failed', self.name)
+            return False
+        return True
+
+    def _record(self, outcome, events):
+        if self.metrics:
+            self.metrics.inc('destination_events_total', (('destination', self.name), ('outcome', outcome)),
+                len(events))
+
+    def queue_depth(self):
+        return len(self._queue)
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout=None):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        self.transport.close()
+
+    def stats(self):
+        return {
+            'queue_depth': len(self._queue),
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'diverted': self.diverted
+        }
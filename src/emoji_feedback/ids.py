@@ -0,0 +1,68 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+
+def _format_uuid4(raw):
+    raw = bytearray(raw)
+    raw[6] = (raw[6] & 0x0f) | 0x40
+    raw[8] = (raw[8] & 0x3f) | 0x80
+    h = raw.hex()
+    return 'urn:uuid:' + h[:8] + '-' + h[8:12] + '-' + h[12:16] + '-' + h[16:20] + '-' + h[20:]
+
+
+def _format_time(ms):
+    seconds, millis = divmod(ms, 1000)
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds)) + '.%03dZ' % millis
+
+
+class FastIdProvider(object):
+    # draws uuid4s from a bulk os.urandom buffer and reuses sendTime within a millisecond
+    def __init__(self, buffer_size=256):
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._buffer = b''
+        self._offset = 0
+        self._pid = None
+        self._last = (None, None)
+
+    def new_id(self):
+        with self._lock:
+            # refill after a fork so pre-fork workers never share random bytes
+            if self._offset >= len(self._buffer) or self._pid != os.getpid():
+                self._buffer = os.urandom(16 * self.buffer_size)
+                self._offset = 0
+                self._pid = os.getpid()
+            raw = self._buffer[self._offset:self._offset + 16]
+            self._offset += 16
+        return _format_uuid4(raw)
+
+    def send_time(self):
+        ms = int(time.time() * 1000)
+        last_ms, last_time = self._last
+        if ms != last_ms:
+            last_time = _format_time(ms)
+            self._last = (ms, last_time)
+        return last_time
+
+
+class DeterministicIdProvider(object):
+    # reproducible ids and times for tests and benchmarks
+    def __init__(self, seed=0, start=datetime(2019, 1, 1, tzinfo=timezone.utc), step=0.001):
+        self._random = random.Random(seed)
+        self._ms = int(start.timestamp() * 1000)
+        self._step = int(step * 1000)
+        self._lock = threading.Lock()
+
+    def new_id(self):
+        with self._lock:
+            raw = self._random.getrandbits(128).to_bytes(16, 'big')
+        return _format_uuid4(raw)
+
+    def send_time(self):
+        with self._lock:
+            ms = self._ms
+            self._ms += self._step
+        return _format_time(ms)
@@ -0,0 +1,111 @@
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+RANKED = (('action', 'Ranked'),)
+COMMENTED = (('action', 'Commented'),)
+
+_HELP = {
+    'events_total': ('counter', 'Feedback events by action and delivery outcome'),
+    'bytes_sent_total': ('counter', 'Encoded envelope bytes posted to the Caliper host'),
+    'generate_seconds': ('histogram', 'Time to build a feedback event'),
+    'serialize_seconds': ('histogram', 'Time to encode an envelope'),
+    'queue_wait_seconds': ('histogram', 'Time an event waited in the delivery queue'),
+    'http_seconds': ('histogram', 'Caliper host round trip by outcome'),
+    'destination_events_total': ('counter', 'Feedback events by fan-out destination and delivery outcome'),
+    'destination_http_seconds': ('histogram', 'Fan-out destination round trip by outcome'),
+}
+
+
+def action_labels(event):
+    action = event.action if hasattr(event, 'action') else event.get('action')
+    return RANKED if action == 'Ranked' else COMMENTED if action == 'Commented' else (('action', str(action)),)
+
+
+class _Histogram(object):
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics(object):
+    # counters and fixed bucket histograms, cheap enough to leave on, shared by any number of sensors
+    def __init__(self, buckets=LATENCY_BUCKETS, prefix='emoji_feedback_'):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        key = (name, labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict((key, (list(h.counts), h.sum, h.count)) for key, h in self._histograms.items())
+
+        result = {'counters': {}, 'histograms': {}}
+        for (name, labels), value in counters.items():
+            result['counters'].setdefault(name, {})[_label_key(labels)] = value
+        for (name, labels), (counts, total, count) in histograms.items():
+            cumulative = 0
+            buckets = []
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                buckets.append((bound, cumulative))
+            result['histograms'].setdefault(name, {})[_label_key(labels)] = {
+                'buckets': buckets,
+                'sum': total,
+                'count': count
+            }
+        return result
+
+    def prometheus(self, gauges=None):
+        # Prometheus text exposition format 0.0.4
+        snapshot = self.snapshot()
+        lines = []
+        for name in sorted(set(snapshot['counters']) | set(snapshot['histograms'])):
+            metric = self.prefix + name
+            kind, help_text = _HELP.get(name, ('counter' if name in snapshot['counters'] else 'histogram', name))
+            lines.append('# HELP {} {}'.format(metric, help_text))
+            lines.append('# TYPE {} {}'.format(metric, kind))
+            for labels, value in sorted(snapshot['counters'].get(name, {}).items()):
+                lines.append('{}{} {}'.format(metric, _braces(labels), value))
+            for labels, histogram in sorted(snapshot['histograms'].get(name, {}).items()):
+                for bound, count in histogram['buckets']:
+                    le = 'le="{}"'.format(bound)
+                    lines.append('{}_bucket{} {}'.format(metric, _braces(labels + ',' + le if labels else le), count))
+                lines.append('{}_sum{} {}'.format(metric, _braces(labels), histogram['sum']))
+                lines.append('{}_count{} {}'.format(metric, _braces(labels), histogram['count']))
+        for name, value in sorted((gauges or {}).items()):
+            metric = self.prefix + name
+            lines.append('# TYPE {} gauge'.format(metric))
+            lines.append('{} {}'.format(metric, value))
+        return '\n'.join(lines) + '\n'
+
+
+def _label_key(labels):
+    return ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in labels)
+
+
+def _braces(labels):
+    return '{' + labels + '}' if labels else ''
@@ -0,0 +1,137 @@
+import json
+
+CALIPER_CONTEXT = 'http://purl.imsglobal.org/ctx/caliper/v1p2'
+
+_serializer = None
+
+
+class Rating(object):
+    __slots__ = ('id', 'rater', 'rated', 'question', 'selections', 'dateCreated')
+
+    def __init__(self, id, rater, rated, question, selections, dateCreated):
+        self.id = id
+        self.rater = rater
+        self.rated = rated
+        self.question = question
+        self.selections = selections
+        self.dateCreated = dateCreated
+
+    def items(self):
+        yield 'id', self.id
+        yield 'type', 'Rating'
+        yield 'rater', self.rater
+        yield 'rated', self.rated
+        yield 'question', self.question
+        yield 'selections', self.selections
+        yield 'dateCreated', self.dateCreated
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+class Comment(object):
+    __slots__ = ('id', 'commenter', 'commentedOn', 'value', 'dateCreated', 'questionText')
+
+    def __init__(self, id, commenter, commentedOn, value, dateCreated, questionText):
+        self.id = id
+        self.commenter = commenter
+        self.commentedOn = commentedOn
+        self.value = value
+        self.dateCreated = dateCreated
+        self.questionText = questionText
+
+    def items(self):
+        yield 'id', self.id
+        yield 'type', 'Comment'
+        yield 'commenter', self.commenter
+        yield 'commentedOn', self.commentedOn
+        yield 'value', self.value
+        yield 'dateCreated', self.dateCreated
+        yield 'extensions', {'question': self.questionText}
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+_EVENT_KEYS = frozenset(['id', '@context', 'type', 'actor', 'action', 'profile', 'object',
+    'edApp', 'session', 'generated', 'eventTime'])
+
+
+class FeedbackEvent(object):
+    __slots__ = ('id', 'action', 'actor', 'object', 'edApp', 'session', 'generated', 'eventTime', 'extra')
+
+    def __init__(self, id, action, actor, object, edApp, session, generated, eventTime, extra=None):
+        self.id = id
+        self.action = action
+        self.actor = actor
+        self.object = object
+        self.edApp = edApp
+        self.session = session
+        self.generated = generated
+        self.eventTime = eventTime
+        # extra keyword arguments are merged over the event like dict.update
+        self.extra = extra if extra else None
+
+    def _items(self):
+        yield 'id', self.id
+        yield '@context', CALIPER_CONTEXT
+        yield 'type', 'FeedbackEvent'
+        yield 'actor', self.actor
+        yield 'action', self.action
+        yield 'profile', 'FeedbackProfile'
+        yield 'object', self.object
+        yield 'edApp', self.edApp
+        yield 'session', self.session
+        yield 'generated', self.generated
+        yield 'eventTime', self.eventTime
+
+    def items(self):
+        extra = self.extra
+        for key, value in self._items():
+            if extra and key in extra:
+                value = extra[key]
+            yield key, value
+        if extra:
+            for key, value in extra.items():
+                if key not in _EVENT_KEYS:
+                    yield key, value
+
+    def to_dict(self):
+        event = dict(self.items())
+        if isinstance(event['generated'], (Rating, Comment)):
+            event['generated'] = event['generated'].to_dict()
+        return event
+
+    def to_json(self, serializer=None):
+        # encodes straight from the attributes, without building the event dict
+        return (serializer or default_serializer()).event(self)
+
+
+def default_serializer():
+    # shared by events and sensors that are not given a serializer, imported late to avoid a cycle
+    global _serializer
+    if _serializer is None:
+        from .serialization import EventSerializer
+        _serializer = EventSerializer()
+    return _serializer
+
+
+def as_dict(event):
+    return event.to_dict() if isinstance(event, FeedbackEvent) else event
+
+
+def event_json(event):
+    if isinstance(event, FeedbackEvent):
+        return event.to_json()
+    return json.dumps(event, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def event_id(event):
+    return event.id if isinstance(event, FeedbackEvent) else event['id']
+
+
+def entity_id(value):
+    # entities may be passed as a dict or as their id IRI
+    if isinstance(value, dict):
+        return value.get('id')
+    return value
@@ -0,0 +1,85 @@
+import json
+import threading
+
+from .errors import ValidationError
+
+
+class QuestionRegistry(object):
+    # pre-built question entities indexed by id, so clients can send a bare id instead of the whole
+    # question and scale. every request resolving a question gets the same dict, which the validator
+    # and serializer caches then match by identity
+    def __init__(self, questions=(), validator=None, strict=True):
+        self.validator = validator
+        # unknown ids are rejected unless strict is off, then they are passed through as sent
+        self.strict = strict
+        self.hits = 0
+        self.misses = 0
+        self._questions = {}
+        self._lock = threading.Lock()
+        for question in questions:
+            self.register(question)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        registry = cls(**kwargs)
+        registry.load(path)
+        return registry
+
+    def load(self, path):
+        # a JSON list of question entities, or an object with them under "questions"
+        with open(path, 'r') as fh:
+            data = json.load(fh)
+        if data.__class__ is dict:
+            data = data.get('questions', ())
+        for question in data:
+            self.register(question)
+
+    def register(self, question):
+        if question.__class__ is not dict or question.get('id').__class__ is not str:
+            raise ValidationError('question must be an entity with an id')
+        question = dict(question)
+        if self.validator is not None:
+            # checks the scale and warms the validator's cache with this exact dict
+            self.validator.compile(question)
+        with self._lock:
+            self._questions[question['id']] = question
+        return question
+
+    def unregister(self, question_id):
+        with self._lock:
+            return self._questions.pop(question_id, None)
+
+    def get(self, question_id):
+        return self._questions.get(question_id)
+
+    def resolve(self, question):
+        # expands an id, or an entity with a registered id, to the registered entity. a client sent
+        # scale is never trusted over the registered one
+        if question.__class__ is str:
+            question_id = question
+        elif question.__class__ is dict and question.get('id').__class__ is str:
+            question_id = question['id']
+        else:
+            raise ValidationError('question must be an entity with an id')
+
+        registered = self._questions.get(question_id)
+        if registered is not None:
+            self.hits += 1
+            return registered
+        self.misses += 1
+        if self.strict:
+            raise ValidationError('{!r} is not a registered question'.format(question_id[:200]))
+        return question
+
+    def __contains__(self, question_id):
+        return question_id in self._questions
+
+    def __len__(self):
+        return len(self._questions)
+
+    def stats(self):
+        return {
+            'questions': len(self._questions),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,204 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+
+from .emoji_feedback_sensor import EmojiFeedbackSensor
+from .ids import FastIdProvider
+from .resilience import RetryPolicy, deliver_with_policy
+from .sink import ACTIVE_SUFFIX
+from .transport import SessionTransport
+
+logger = logging.getLogger(__name__)
+
+
+def read_lines(path):
+    # streams the event lines of a sink file, stopping at a partial last line left by a crash
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as fh:
+        try:
+            for line in fh:
+                if not line.endswith(b'\n'):
+                    return
+                if line.strip():
+                    yield line[:-1]
+        except (EOFError, zlib.error):
+            logger.warning('Emoji Feedback Error: %s is truncated', path)
+
+
+def read_events(path):
+    for line in read_lines(path):
+        yield json.loads(line.decode('utf-8'))
+
+
+def sink_files(paths):
+    # whole sink files in the order they were written, directories are expanded
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in os.listdir(path)
+                if ('.ndjson' in name) and not name.endswith(ACTIVE_SUFFIX))
+        else:
+            files.append(path)
+    return sorted(files, key=os.path.basename)
+
+
+class Replayer(object):
+    # posts sink files to a Caliper host in large envelopes from parallel workers. the checkpoint
+    # records how many lines of each file are delivered, so an interrupted replay resumes where it stopped
+    def __init__(self, caliper_host, caliper_api_key, checkpoint_path=None, batch_size=1000,
+            max_bytes=4 * 1024 * 1024, workers=4, transport=None, retry=None, delete=False):
+        if not caliper_host:
+            raise Exception('Emoji Feedback Error: Caliper Host not set')
+        if not caliper_api_key:
+            raise Exception('Emoji Feedback Error: Caliper API Key not set')
+
+        self.caliper_host = caliper_host
+        self.caliper_api_key = caliper_api_key
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.transport = transport if transport else SessionTransport(pool_maxsize=workers)
+        self.retry = retry
+        self.delete = delete
+        self.sent = 0
+        self._id_provider = FastIdProvider()
+        self._headers = {
+            'Authorization': 'Bearer ' + str(caliper_api_key),
+            'Content-Type': 'application/json'
+        }
+        self._checkpoint = self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as fh:
+                return json.load(fh)
+        return {'lines': {}, 'complete': []}
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w') as fh:
+            json.dump(self._checkpoint, fh)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def replay(self, paths):
+        # returns the number of events sent, raises on the first batch that could not be delivered
+        with ThreadPoolExecutor(self.workers) as executor:
+            for path in sink_files(paths):
+                self._replay_file(executor, path)
+        return self.sent
+
+    def _replay_file(self, executor, path):
+        name = os.path.basename(path)
+        if name in self._checkpoint['complete']:
+            return
+        done = self._checkpoint['lines'].get(name, 0)
+
+        # futures settle in submission order, so the checkpoint only moves past delivered lines
+        window = deque()
+        try:
+            for lines, end in self._batches(path, done):
+                while len(window) >= self.workers * 2:
+                    self._settle(window.popleft(), name)
+                window.append((executor.submit(self._post, lines), end, len(lines)))
+            while window:
+                self._settle(window.popleft(), name)
+        except BaseException:
+            for future, _, _ in window:
+                future.cancel()
+            raise
+
+        self._checkpoint['lines'].pop(name, None)
+        self._checkpoint['complete'].append(name)
+        self._save_checkpoint()
+        if self.delete:
+            os.remove(path)
+
+    def _settle(self, entry, name):
+        future, end, count = entry
+        future.result()
+        self.sent += count
+        self._checkpoint['lines'][name] = end
+        self._save_checkpoint()
+
+    def _batches(self, path, skip):
+        lines = []
+        size = 0
+        number = 0
+        for number, line in enumerate(read_lines(path), 1):
+            if number <= skip:
+                continue
+            if lines and (len(lines) >= self.batch_size or size + len(line) + 1 > self.max_bytes):
+                yield lines, number - 1
+                lines = []
+                size = 0
+            lines.append(line)
+            size += len(line) + 1
+        if lines:
+            yield lines, number
+
+    def _envelope(self, lines):
+        # the lines are already encoded events, so the envelope is spliced rather than re-encoded
+        return b''.join((b'{"sensor":', json.dumps(EmojiFeedbackSensor.SENSOR_ID).encode('ascii'),
+            b',"sendTime":', json.dumps(self._id_provider.send_time()).encode('ascii'),
+            b',"dataVersion":', json.dumps(EmojiFeedbackSensor.CALIPER_VERSION).encode('ascii'),
+            b',"data":[', b','.join(lines), b']}'))
+
+    def _post(self, lines):
+        body = self._envelope(lines)
+        return deliver_with_policy(lambda: self._send(body), self.retry)
+
+    def _send(self, body):
+        response = self.transport.post(self.caliper_host, body, self._headers)
+        response.raise_for_status()
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay emoji feedback sink files into a Caliper host')
+    parser.add_argument('paths', nargs='+', help='sink files or directories of them')
+    parser.add_argument('--caliper-host', default=environ.get('EMOJI_FEEDBACK_CALIPER_HOST', None))
+    parser.add_argument('--caliper-api-key', default=environ.get('EMOJI_FEEDBACK_CALIPER_API_KEY', None))
+    parser.add_argument('--checkpoint', default=None, help='file recording progress, to resume an interrupted replay')
+    parser.add_argument('--batch-size', type=int, default=1000, help='events per envelope')
+    parser.add_argument('--max-bytes', type=int, default=4 * 1024 * 1024, help='bytes per envelope')
+    parser.add_argument('--workers', type=int, default=4, help='envelopes in flight at once')
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--delete', action='store_true', help='remove files once they are replayed')
+    parser.add_argument('--debug', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    try:
+        replayer = Replayer(args.caliper_host, args.caliper_api_key, checkpoint_path=args.checkpoint,
+            batch_size=args.batch_size, max_bytes=args.max_bytes, workers=args.workers,
+            retry=RetryPolicy(max_attempts=args.max_attempts), delete=args.delete)
+    except Exception as e:
+        parser.exit(1, '{}\n'.format(e))
+
+    start = time.time()
+    try:
+        sent = replayer.replay(args.paths)
+    except Exception as e:
+        logger.error('Replay stopped after %d events: %s', replayer.sent, e)
+        parser.exit(1)
+    finally:
+        replayer.close()
+    logger.info('Replayed %d events in %.1f seconds', sent, time.time() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+
+from .errors import CircuitOpenError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def is_retryable(error):
+    # connection errors and timeouts carry no response, 4xx other than 429 will not succeed on retry
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status is None or status >= 500 or status == 429
+
+
+def record_outcome(breaker, error=None):
+    # a 4xx means the host is up, only outages count towards opening the circuit
+    if breaker is None:
+        return
+    if error is not None and is_retryable(error):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def deliver_with_policy(post, retry=None, breaker=None, sleep=None, on_open=None):
+    # calls post() until it succeeds or the retry policy gives up. while the circuit is open the result of
+    # on_open() is returned instead, or CircuitOpenError raised without it
+    if sleep is None:
+        sleep = time.sleep
+    if retry:
+        retry.record_request()
+    attempt = 0
+    while True:
+        if breaker and not breaker.allow():
+            if on_open is None:
+                raise CircuitOpenError()
+            return on_open()
+        try:
+            response = post()
+        except Exception as e:
+            record_outcome(breaker, e)
+            attempt += 1
+            if retry is None or not retry.allow_retry(attempt, e):
+                raise
+            sleep(retry.backoff(attempt))
+            continue
+        record_outcome(breaker)
+        return response
+
+
+async def deliver_with_policy_async(post, retry=None, breaker=None, sleep=None, on_open=None):
+    # deliver_with_policy for a coroutine post(), waiting between attempts without blocking the loop
+    if sleep is None:
+        from asyncio import sleep
+    if retry:
+        retry.record_request()
+    attempt = 0
+    while True:
+        if breaker and not breaker.allow():
+            if on_open is None:
+                raise CircuitOpenError()
+            return on_open()
+        try:
+            response = await post()
+        except Exception as e:
+            record_outcome(breaker, e)
+            attempt += 1
+            if retry is None or not retry.allow_retry(attempt, e):
+                raise
+            await sleep(retry.backoff(attempt))
+            continue
+        record_outcome(breaker)
+        return response
+
+
+class RetryPolicy(object):
+    # exponential backoff with full jitter, bounded by a budget of retries per request sent
+    def __init__(self, max_attempts=3, base_delay=0.1, max_delay=5.0, budget_ratio=0.2, budget_min=10,
+            random=random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_min = budget_min
+        self.retries = 0
+        self.budget_exhausted = 0
+        self._random = random
+        self._tokens = float(budget_min)
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt):
+        # attempt counts from 1 for the first retry
+        return self._random() * min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+
+    def record_request(self):
+        # every request earns a fraction of a retry, capped so a long healthy run can't bank a retry storm
+        with self._lock:
+            self._tokens = min(self._tokens + self.budget_ratio, self.budget_min)
+
+    def allow_retry(self, attempt, error):
+        if attempt >= self.max_attempts or not is_retryable(error):
+            return False
+        with self._lock:
+            if self._tokens < 1:
+                self.budget_exhausted += 1
+                return False
+            self._tokens -= 1
+            self.retries += 1
+            return True
+
+    def stats(self):
+        return {
+            'retries': self.retries,
+            'budget_exhausted': self.budget_exhausted,
+            'budget': self._tokens
+        }
+
+
+class CircuitBreaker(object):
+    # opens after consecutive failures, then lets probes through once reset_timeout has passed
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, half_open_probes=1, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.opened = 0
+        self.rejected = 0
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self.rejected += 1
+                    return False
+                self._probes += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened += 1
+                self.state = OPEN
+                self._opened_at = self._clock()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'opened': self.opened,
+            'rejected': self.rejected
+        }
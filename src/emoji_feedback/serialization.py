@@ -0,0 +1,182 @@
+import json
+from copy import deepcopy
+from json.encoder import encode_basestring_ascii
+
+from .emoji_feedback_sensor import ANONYMOUS_ACTOR, ANONYMOUS_EDAPP, ANONYMOUS_SESSION
+from .model import _EVENT_KEYS, CALIPER_CONTEXT, FeedbackEvent, Rating
+
+EVENT_ENTITY_KEYS = frozenset(['actor', 'object', 'edApp', 'session'])
+GENERATED_ENTITY_KEYS = frozenset(['rater', 'rated', 'question', 'commenter', 'commentedOn'])
+
+_RATING_KEYS = frozenset(['id', 'type', 'rater', 'rated', 'question', 'selections', 'dateCreated'])
+_COMMENT_KEYS = frozenset(['id', 'type', 'commenter', 'commentedOn', 'value', 'dateCreated', 'extensions'])
+
+_EVENT_HEAD = '{"id":'
+_EVENT_ACTOR = ',"@context":' + encode_basestring_ascii(CALIPER_CONTEXT) + ',"type":"FeedbackEvent","actor":'
+_RANKED_OBJECT = ',"action":"Ranked","profile":"FeedbackProfile","object":'
+_COMMENTED_OBJECT = ',"action":"Commented","profile":"FeedbackProfile","object":'
+_EVENT_EDAPP = ',"edApp":'
+_EVENT_SESSION = ',"session":'
+_RATING_HEAD = ',"generated":{"id":'
+_RATING_RATER = ',"type":"Rating","rater":'
+_RATING_RATED = ',"rated":'
+_RATING_QUESTION = ',"question":'
+_RATING_SELECTIONS = ',"selections":'
+_COMMENT_COMMENTER = ',"type":"Comment","commenter":'
+_COMMENT_COMMENTED_ON = ',"commentedOn":'
+_COMMENT_VALUE = ',"value":'
+_COMMENT_QUESTION = ',"extensions":{"question":'
+_GENERATED_DATE = ',"dateCreated":'
+_EVENT_TIME = '},"eventTime":'
+_EVENT_TIME_AFTER_EXTENSIONS = '}},"eventTime":'
+_EVENT_EXTENSIONS = ',"extensions":'
+_EXTENDED_EVENT_KEYS = _EVENT_KEYS | frozenset(['extensions'])
+
+
+class EventSerializer(object):
+    # caches the encoded JSON of entities by their id and splices events from pre-encoded pieces,
+    # output is ASCII escaped so joining never widens the string
+    def __init__(self, max_entities=1024):
+        self.max_entities = max_entities
+        self.hits = 0
+        self.misses = 0
+        self._entities = {}
+        self._dumps = json.JSONEncoder(separators=(',', ':'), ensure_ascii=True).encode
+        for entity in (ANONYMOUS_ACTOR, ANONYMOUS_EDAPP, ANONYMOUS_SESSION):
+            self._entity(entity)
+
+    def _entity(self, value):
+        if value.__class__ is str:
+            return encode_basestring_ascii(value)
+        if value.__class__ is not dict:
+            return self._dumps(value)
+        entity_id = value.get('id')
+        if entity_id is None or entity_id.__class__ is not str:
+            return self._dumps(value)
+
+        cached = self._entities.get(entity_id)
+        # entities parsed from each request are equal but not identical, compare before re-encoding.
+        # the cache holds a copy, so an entity changed in place after it was encoded is encoded again
+        if cached is not None and cached[0] == value:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        encoded = self._dumps(value)
+        if cached is None and len(self._entities) >= self.max_entities:
+            try:
+                del self._entities[next(iter(self._entities))]
+            except (KeyError, RuntimeError, StopIteration):
+                pass
+        self._entities[entity_id] = (deepcopy(value), encoded)
+        return encoded
+
+    def entity(self, value):
+        return self._entity(value).encode('ascii')
+
+    def _text(self, value):
+        return encode_basestring_ascii(value) if value.__class__ is str else self._dumps(value)
+
+    def _tail(self, extensions):
+        # event level extensions, such as the degradation tag, follow eventTime as dict.update leaves them
+        if extensions is None:
+            return '}'
+        return _EVENT_EXTENSIONS + self._dumps(extensions) + '}'
+
+    def _rating(self, event_id, actor, object, edApp, session, eventTime, rating_id, rater, rated,
+            question, selections, dateCreated, extensions=None):
+        entity = self._entity
+        return ''.join((_EVENT_HEAD, self._text(event_id), _EVENT_ACTOR, entity(actor),
+            _RANKED_OBJECT, entity(object), _EVENT_EDAPP, entity(edApp), _EVENT_SESSION, entity(session),
+            _RATING_HEAD, self._text(rating_id), _RATING_RATER, entity(rater), _RATING_RATED, entity(rated),
+            _RATING_QUESTION, entity(question), _RATING_SELECTIONS, self._dumps(selections),
+            _GENERATED_DATE, self._text(dateCreated), _EVENT_TIME, self._text(eventTime), self._tail(extensions)))
+
+    def _comment(self, event_id, actor, object, edApp, session, eventTime, comment_id, commenter,
+            commentedOn, value, dateCreated, questionText, extensions=None):
+        entity = self._entity
+        return ''.join((_EVENT_HEAD, self._text(event_id), _EVENT_ACTOR, entity(actor),
+            _COMMENTED_OBJECT, entity(object), _EVENT_EDAPP, entity(edApp), _EVENT_SESSION, entity(session),
+            _RATING_HEAD, self._text(comment_id), _COMMENT_COMMENTER, entity(commenter),
+            _COMMENT_COMMENTED_ON, entity(commentedOn), _COMMENT_VALUE, self._text(value),
+            _GENERATED_DATE, self._text(dateCreated), _COMMENT_QUESTION, self._text(questionText),
+            _EVENT_TIME_AFTER_EXTENSIONS, self._text(eventTime), self._tail(extensions)))
+
+    def _model(self, event, extensions=None):
+        generated = event.generated
+        if generated.__class__ is Rating:
+            return self._rating(event.id, event.actor, event.object, event.edApp, event.session,
+                event.eventTime, generated.id, generated.rater, generated.rated, generated.question,
+                generated.selections, generated.dateCreated, extensions)
+        return self._comment(event.id, event.actor, event.object, event.edApp, event.session,
+            event.eventTime, generated.id, generated.commenter, generated.commentedOn, generated.value,
+            generated.dateCreated, generated.questionText, extensions)
+
+    def _standard(self, event):
+        # events exactly as generate_*_feedback_event builds them, optionally with extensions, can use a
+        # fixed template
+        keys = event.keys()
+        if keys == _EVENT_KEYS:
+            extensions = None
+        elif keys == _EXTENDED_EVENT_KEYS and event['extensions'] is not None:
+            extensions = event['extensions']
+        else:
+            return None
+        if (event['type'] != 'FeedbackEvent' or event['@context'] != CALIPER_CONTEXT
+                or event['profile'] != 'FeedbackProfile'):
+            return None
+        generated = event['generated']
+        if generated.__class__ is not dict:
+            return None
+        action = event['action']
+        if action == 'Ranked' and generated.keys() == _RATING_KEYS and generated['type'] == 'Rating':
+            return self._rating(event['id'], event['actor'], event['object'], event['edApp'],
+                event['session'], event['eventTime'], generated['id'], generated['rater'],
+                generated['rated'], generated['question'], generated['selections'], generated['dateCreated'],
+                extensions)
+        if action == 'Commented' and generated.keys() == _COMMENT_KEYS and generated['type'] == 'Comment':
+            generated_extensions = generated['extensions']
+            if generated_extensions.__class__ is dict and generated_extensions.keys() == {'question'}:
+                return self._comment(event['id'], event['actor'], event['object'], event['edApp'],
+                    event['session'], event['eventTime'], generated['id'], generated['commenter'],
+                    generated['commentedOn'], generated['value'], generated['dateCreated'],
+                    generated_extensions['question'], extensions)
+        return None
+
+    def _object(self, items, entity_keys):
+        parts = []
+        for key, value in items:
+            if key in entity_keys:
+                encoded = self._entity(value)
+            elif key == 'generated' and hasattr(value, 'items'):
+                encoded = self._object(value.items(), GENERATED_ENTITY_KEYS)
+            else:
+                encoded = self._dumps(value)
+            parts.append(encode_basestring_ascii(key) + ':' + encoded)
+        return '{' + ','.join(parts) + '}'
+
+    def _event(self, event):
+        if event.__class__ is FeedbackEvent:
+            extra = event.extra
+            if extra is None:
+                return self._model(event)
+            if extra.keys() == {'extensions'} and extra['extensions'] is not None:
+                return self._model(event, extra['extensions'])
+            return self._object(event.items(), EVENT_ENTITY_KEYS)
+        encoded = self._standard(event)
+        if encoded is None:
+            encoded = self._object(event.items(), EVENT_ENTITY_KEYS)
+        return encoded
+
+    def event(self, event):
+        return self._event(event).encode('ascii')
+
+    def envelope(self, envelope):
+        parts = []
+        for key, value in envelope.items():
+            if key == 'data':
+                encoded = '[' + ','.join([self._event(event) for event in value]) + ']'
+            else:
+                encoded = self._dumps(value)
+            parts.append(encode_basestring_ascii(key) + ':' + encoded)
+        return ('{' + ','.join(parts) + '}').encode('ascii')
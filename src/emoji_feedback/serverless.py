@@ -0,0 +1,104 @@
+import logging
+import threading
+
+from .emoji_feedback_sensor import EmojiFeedbackSensor
+from .transport import ConnectionTransport
+
+logger = logging.getLogger(__name__)
+
+_sensor = None
+_lock = threading.Lock()
+
+
+class BufferedEmitter(object):
+    # holds events in memory and sends them from the calling thread on flush, or each time another
+    # max_events are waiting. there is no worker thread to be frozen mid-send when a function invocation
+    # returns. only an explicit flush raises, a send never fails because delivery did
+    remote = False
+
+    def __init__(self, max_events=100, max_buffered=10000):
+        self.max_events = max_events
+        # the oldest events are dropped beyond this while the Caliper host is down
+        self.max_buffered = max_buffered
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.metrics = None
+        self._events = []
+        self._since_flush = 0
+        self._lock = threading.Lock()
+        self._send = None
+        self._on_dropped = None
+
+    def start(self, send, size=None, spill=None, dropped=None):
+        self._send = send
+        self._on_dropped = dropped
+
+    def emit(self, event):
+        with self._lock:
+            self._events.append(event)
+            dropped = None
+            if self.max_buffered and len(self._events) > self.max_buffered:
+                dropped = self._events.pop(0)
+                self.dropped += 1
+            # after a failed flush the buffer stays full, so only try again every max_events events
+            self._since_flush += 1
+            full = self._since_flush >= self.max_events
+        if dropped is not None:
+            logger.warning('Emoji Feedback Error: event buffer is full, dropped the oldest event')
+            if self._on_dropped:
+                self._on_dropped(dropped)
+        if full:
+            try:
+                self.flush()
+            except Exception:
+                logger.warning('Emoji Feedback Error: failed to send buffered events, %d kept for the next flush',
+                    len(self._events), exc_info=True)
+
+    def flush(self, timeout=None):
+        # sends everything buffered, events that fail stay buffered for the next flush
+        with self._lock:
+            events = self._events
+            self._events = []
+            self._since_flush = 0
+        for start in range(0, len(events), self.max_events):
+            try:
+                self._send(events[start:start + self.max_events])
+            except Exception:
+                with self._lock:
+                    self._events[:0] = events[start:]
+                    self.failed_flushes += 1
+                raise
+        return True
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+
+    def queue_depth(self):
+        return len(self._events)
+
+    def stats(self):
+        return {
+            'queue_depth': len(self._events),
+            'dropped': self.dropped,
+            'failed_flushes': self.failed_flushes
+        }
+
+
+def get_sensor(**kwargs):
+    # one sensor per process, so warm invocations reuse its resolved configuration and open connection.
+    # keyword arguments only apply to the call that creates it
+    global _sensor
+    if _sensor is None:
+        with _lock:
+            if _sensor is None:
+                kwargs.setdefault('transport', ConnectionTransport())
+                kwargs.setdefault('emitter', BufferedEmitter())
+                _sensor = EmojiFeedbackSensor(**kwargs)
+    return _sensor
+
+
+def flush(timeout=None):
+    # call before the handler returns, buffered events are not sent until then
+    if _sensor is None:
+        return True
+    return _sensor.flush(timeout)
@@ -0,0 +1,135 @@
+import fcntl
+import gzip
+import os
+import threading
+import time
+
+from .model import default_serializer
+
+ACTIVE_SUFFIX = '.part'
+
+
+class FileSink(object):
+    # appends events as newline-delimited JSON to size or time rotated files, for bulk ingest later.
+    # the file being written ends in .part and is renamed once rotated, so readers only see whole files
+    def __init__(self, directory, prefix='events', max_bytes=64 * 1024 * 1024, max_age=3600, compress=False,
+            buffer_size=256 * 1024, serializer=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self.events = 0
+        self.files = 0
+        self._encode = (serializer if serializer else default_serializer()).event
+        self._lock = threading.Lock()
+        self._raw = None
+        self._file = None
+        self._path = None
+        self._size = 0
+        self._opened_at = 0
+        self._sequence = 0
+        self._timer = None
+        # pids are reused after a container restart, the token keeps file names unique across runs
+        self._token = os.urandom(4).hex()
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _recover(self):
+        # the writer of an active file holds a lock on it, a file that can be locked was left by a process
+        # that has since died and is complete up to its last whole line
+        for name in os.listdir(self.directory):
+            if not (name.startswith(self.prefix + '-') and name.endswith(ACTIVE_SUFFIX)):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                fh = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            with fh:
+                try:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+                if os.path.exists(path):
+                    os.rename(path, path[:-len(ACTIVE_SUFFIX)])
+
+    def _open(self, now):
+        self._sequence += 1
+        name = '{}-{}-{}-{}-{:06d}.ndjson{}'.format(self.prefix,
+            time.strftime('%Y%m%dT%H%M%S', time.gmtime(now)), os.getpid(), self._token, self._sequence,
+            '.gz' if self.compress else '')
+        self._path = os.path.join(self.directory, name + ACTIVE_SUFFIX)
+        self._raw = open(self._path, 'ab', buffering=self.buffer_size)
+        fcntl.flock(self._raw.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._file = gzip.GzipFile(fileobj=self._raw, mode='ab') if self.compress else self._raw
+        self._size = 0
+        self._opened_at = now
+        if self.max_age:
+            # a quiet sink still rotates, so the last events before a lull can be replayed
+            self._timer = threading.Timer(self.max_age, self._expire, (self._path,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _expire(self, path):
+        with self._lock:
+            if self._path == path:
+                self._close_file()
+
+    def _close_file(self):
+        if self._file is None:
+            return None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is not self._raw:
+            self._file.close()
+        self._raw.flush()
+        # renamed while still locked, so recovery in another process never races the rename
+        path = self._path[:-len(ACTIVE_SUFFIX)]
+        os.rename(self._path, path)
+        self._raw.close()
+        self._raw = self._file = self._path = None
+        self.files += 1
+        return path
+
+    def write(self, events):
+        # buffered, the events reach the OS on flush, rotation or once the buffer fills
+        data = b''.join([self._encode(event) + b'\n' for event in events])
+        now = time.time()
+        with self._lock:
+            if self._file is not None and self.max_age and now - self._opened_at >= self.max_age:
+                self._close_file()
+            if self._file is None:
+                self._open(now)
+            self._file.write(data)
+            self._size += len(data)
+            self.events += len(events)
+            if self._size >= self.max_bytes:
+                self._close_file()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None and self.max_age and time.time() - self._opened_at >= self.max_age:
+                self._close_file()
+            if self._file is not None:
+                self._file.flush()
+                if self._file is not self._raw:
+                    self._raw.flush()
+
+    def rotate(self):
+        # closes the current file so it can be replayed, returns its path
+        with self._lock:
+            return self._close_file()
+
+    def close(self):
+        self.rotate()
+
+    def stats(self):
+        return {
+            'events': self.events,
+            'files': self.files,
+            'current_bytes': self._size if self._file is not None else 0
+        }
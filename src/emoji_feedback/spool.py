@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+import time
+
+from .model import event_id, event_json
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+
+class _Segment(object):
+    def __init__(self, number, path):
+        self.number = number
+        self.path = path
+        self.ack_path = path[:-len('.log')] + '.ack'
+        self.size = 0
+        self.records = 0
+        self.acked = set()
+        self.unacked = set()
+        self.ack_file = None
+
+
+class Spool(object):
+    # append-only, segment rotated store of events that have not been acknowledged yet
+    def __init__(self, directory, segment_max_bytes=4 * 1024 * 1024, max_total_bytes=256 * 1024 * 1024,
+            fsync='interval', fsync_interval=1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise Exception('Emoji Feedback Error: unknown fsync policy {}'.format(fsync))
+
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.dropped = 0
+        self.corrupt = 0
+
+        self._lock = threading.Lock()
+        self._segments = []
+        self._index = {}
+        self._inflight = set()
+        self._total_bytes = 0
+        self._last_fsync = time.time()
+        self._file = None
+        self._next_number = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self._open_segment()
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, '{:020d}.log'.format(number))
+
+    def _load(self):
+        numbers = sorted(int(name[:-len('.log')]) for name in os.listdir(self.directory)
+            if name.endswith('.log') and name[:-len('.log')].isdigit())
+        if numbers:
+            self._next_number = numbers[-1] + 1
+        for number in numbers:
+            segment = _Segment(number, self._segment_path(number))
+            if os.path.exists(segment.ack_path):
+                with open(segment.ack_path, 'r') as fh:
+                    segment.acked = set(int(line) for line in fh if line.strip())
+            with open(segment.path, 'rb') as fh:
+                for line_number, line in enumerate(fh):
+                    if not line.endswith(b'\n'):
+                        # partial write from a crash
+                        break
+                    segment.records += 1
+                    segment.size += len(line)
+                    if line_number not in segment.acked:
+                        try:
+                            event_id = json.loads(line.decode('utf-8'))['id']
+                        except (ValueError, KeyError, TypeError):
+                            self._quarantine(segment, line_number, line)
+                            continue
+                        segment.unacked.add(event_id)
+                        self._index[event_id] = (segment, line_number)
+            if segment.unacked:
+                self._segments.append(segment)
+                self._total_bytes += segment.size
+            else:
+                self._remove_files(segment)
+
+    def _quarantine(self, segment, line_number, line):
+        # undecodable records are moved aside and acknowledged so they are never replayed
+        self.corrupt += 1
+        with open(os.path.join(self.directory, 'quarantine.ndjson'), 'ab') as fh:
+            fh.write(line)
+        segment.acked.add(line_number)
+        with open(segment.ack_path, 'a') as fh:
+            fh.write('{}\n'.format(line_number))
+
+    def _open_segment(self):
+        segment = _Segment(self._next_number, self._segment_path(self._next_number))
+        self._next_number += 1
+        self._file = open(segment.path, 'ab')
+        self._segments.append(segment)
+        return segment
+
+    def _remove_files(self, segment):
+        if segment.ack_file:
+            segment.ack_file.close()
+            segment.ack_file = None
+        for path in (segment.path, segment.ack_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _sync(self, fh):
+        fh.flush()
+        if self.fsync == 'always' or (self.fsync == 'interval'
+                and time.time() - self._last_fsync >= self.fsync_interval):
+            os.fsync(fh.fileno())
+            self._last_fsync = time.time()
+
+    def append(self, event):
+        line = event_json(event) + b'\n'
+        with self._lock:
+            active = self._segments[-1]
+            if active.records and active.size + len(line) > self.segment_max_bytes:
+                self._file.close()
+                if not active.unacked:
+                    self._segments.remove(active)
+                    self._total_bytes -= active.size
+                    self._remove_files(active)
+                active = self._open_segment()
+            self._file.write(line)
+            self._sync(self._file)
+
+            self._index[event_id(event)] = (active, active.records)
+            self._inflight.add(event_id(event))
+            active.unacked.add(event_id(event))
+            active.records += 1
+            active.size += len(line)
+            self._total_bytes += len(line)
+
+            # drop the oldest segments once over the disk budget
+            while self._total_bytes > self.max_total_bytes and len(self._segments) > 1:
+                self._drop_segment(self._segments[0])
+
+    def _drop_segment(self, segment):
+        for event_id in segment.unacked:
+            self._index.pop(event_id, None)
+            self._inflight.discard(event_id)
+        self.dropped += len(segment.unacked)
+        self._segments.remove(segment)
+        self._total_bytes -= segment.size
+        self._remove_files(segment)
+
+    def ack(self, events):
+        with self._lock:
+            touched = set()
+            for event in events:
+                self._inflight.discard(event_id(event))
+                location = self._index.pop(event_id(event), None)
+                if location is None:
+                    continue
+                segment, line_number = location
+                segment.unacked.discard(event_id(event))
+                segment.acked.add(line_number)
+                if segment.ack_file is None:
+                    segment.ack_file = open(segment.ack_path, 'a')
+                segment.ack_file.write('{}\n'.format(line_number))
+                touched.add(segment)
+
+            for segment in touched:
+                if not segment.unacked and segment is not self._segments[-1]:
+                    self._segments.remove(segment)
+                    self._total_bytes -= segment.size
+                    self._remove_files(segment)
+                else:
+                    self._sync(segment.ack_file)
+
+    def release(self, events):
+        # events that failed to send become available to replay again
+        with self._lock:
+            for event in events:
+                self._inflight.discard(event_id(event))
+
+    def pending_count(self):
+        return len(self._index)
+
+    def replay_batches(self, batch_size=100):
+        # yields unacknowledged events in spool order, claiming them while they are sent
+        with self._lock:
+            segments = [segment for segment in self._segments if segment.unacked]
+            self._file.flush()
+
+        batch = []
+        for segment in segments:
+            if not os.path.exists(segment.path):
+                continue
+            with open(segment.path, 'rb') as fh:
+                for line_number, line in enumerate(fh):
+                    if not line.endswith(b'\n'):
+                        break
+                    if line_number in segment.acked:
+                        continue
+                    event = json.loads(line.decode('utf-8'))
+                    with self._lock:
+                        if (event['id'] in self._inflight
+                                or self._index.get(event['id']) != (segment, line_number)):
+                            continue
+                        self._inflight.add(event['id'])
+                    batch.append(event)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+        if batch:
+            yield batch
+
+    def close(self):
+        with self._lock:
+            self._file.flush()
+            if self.fsync != 'never':
+                os.fsync(self._file.fileno())
+            self._file.close()
+            for segment in self._segments:
+                if segment.ack_file:
+                    segment.ack_file.close()
+                    segment.ack_file = None
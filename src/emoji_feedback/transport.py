@@ -0,0 +1,190 @@
+import json
+from threading import Lock
+from urllib.parse import urlsplit
+
+from .compression import REJECTED_STATUSES
+from .errors import HTTPStatusError
+
+# requests and http.client are imported on the first post, not when the sensor is created
+
+
+class Response(object):
+    def __init__(self, status_code, reason, headers, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def raise_for_status(self):
+        if 400 <= self.status_code:
+            raise HTTPStatusError('Emoji Feedback Error: Caliper Host responded with {} {}'.format(
+                self.status_code, self.reason), self)
+
+
+class _Transport(object):
+    compression = None
+
+    def post(self, url, body, headers):
+        if not self.compression:
+            return self._post(url, body, headers)
+
+        body, encoded, encoded_headers = self.compression.encode(body, headers)
+        if encoded is None:
+            return self._post(url, body, headers)
+
+        response = self._post(url, encoded, encoded_headers)
+        if response.status_code not in REJECTED_STATUSES:
+            return response
+
+        plain_response = self._post(url, body, headers)
+        self.compression.rejected(response, plain_response)
+        return plain_response
+
+
+class PostTransport(_Transport):
+    # opens a new connection for every envelope (original behaviour)
+    def __init__(self, timeout=None, compression=None):
+        self.timeout = timeout
+        self.compression = compression
+
+    def _post(self, url, body, headers):
+        import requests
+        kwargs = {'headers': headers}
+        if isinstance(body, (bytes, bytearray)):
+            kwargs['data'] = body
+        else:
+            kwargs['json'] = body
+        if self.timeout is not None:
+            kwargs['timeout'] = self.timeout
+        return requests.post(url, **kwargs)
+
+    def close(self):
+        pass
+
+
+class SessionTransport(_Transport):
+    # keeps a pool of keep-alive connections open to the Caliper host
+    _shared = {}
+    _shared_lock = Lock()
+
+    def __init__(self, pool_connections=1, pool_maxsize=10, connect_timeout=3.05,
+            read_timeout=10, keep_alive=True, max_retries=0, compression=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.compression = compression
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.max_retries = max_retries
+        self._session = None
+        self._session_lock = Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=self.max_retries
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    @classmethod
+    def shared(cls, caliper_host, **kwargs):
+        parts = urlsplit(caliper_host)
+        key = (parts.scheme, parts.netloc)
+        with cls._shared_lock:
+            transport = cls._shared.get(key)
+            if transport is None:
+                transport = cls(**kwargs)
+                cls._shared[key] = transport
+            return transport
+
+    def _post(self, url, body, headers):
+        if isinstance(body, (bytes, bytearray)):
+            return self.session.post(url, data=body, headers=headers, timeout=self.timeout)
+        return self.session.post(url, json=body, headers=headers, timeout=self.timeout)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+class ConnectionTransport(_Transport):
+    # one keep-alive connection per host on the standard library's http.client, much cheaper to import
+    # than requests. sends one envelope at a time, for short-lived processes such as serverless functions
+    def __init__(self, connect_timeout=3.05, read_timeout=10, ssl_context=None, compression=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.ssl_context = ssl_context
+        self.compression = compression
+        self._connections = {}
+        self._lock = Lock()
+
+    def _connect(self, parts):
+        import http.client
+        if parts.scheme == 'https':
+            if self.ssl_context is None:
+                import ssl
+                self.ssl_context = ssl.create_default_context()
+            connection = http.client.HTTPSConnection(parts.hostname, parts.port,
+                timeout=self.connect_timeout, context=self.ssl_context)
+        else:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=self.connect_timeout)
+        connection.connect()
+        connection.sock.settimeout(self.read_timeout)
+        return connection
+
+    def _post(self, url, body, headers):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        if not isinstance(body, (bytes, bytearray)):
+            body = json.dumps(body).encode('utf-8')
+
+        with self._lock:
+            connection = self._connections.pop(key, None)
+            if connection is not None:
+                try:
+                    return self._round_trip(key, connection, path, body, headers)
+                except ConnectionError:
+                    # the server closed the idle connection, or it went stale while the process was frozen
+                    pass
+            return self._round_trip(key, self._connect(parts), path, body, headers)
+
+    def _round_trip(self, key, connection, path, body, headers):
+        try:
+            connection.request('POST', path, body, headers)
+            response = connection.getresponse()
+            content = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._connections[key] = connection
+        return Response(response.status, response.reason,
+            dict((name.lower(), value) for name, value in response.getheaders()), content)
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections.values():
+                connection.close()
+            self._connections = {}
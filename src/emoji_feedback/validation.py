@@ -0,0 +1,121 @@
+import json
+import threading
+
+from .errors import ValidationError
+
+
+class FeedbackValidator(object):
+    # rejects malformed feedback before an event is built, each question's allowed selections are
+    # compiled to a frozenset once and cached by question id
+    def __init__(self, max_comment_length=5000, max_text_length=1000, max_entity_size=16 * 1024,
+            max_selections=None, max_questions=1024):
+        self.max_comment_length = max_comment_length
+        self.max_text_length = max_text_length
+        self.max_entity_size = max_entity_size
+        self.max_selections = max_selections
+        self.max_questions = max_questions
+        self.rejected = 0
+        self.compiled = 0
+        self._questions = {}
+        self._lock = threading.Lock()
+
+    def validate_emoji(self, eventTime, object, question, selections, edApp=None, session=None, actor=None):
+        try:
+            self._check_common(eventTime, object, edApp, session, actor)
+            allowed = self._allowed(question)
+            if selections.__class__ not in (list, tuple) or not selections:
+                raise ValidationError('selections must be a non-empty list')
+            limit = self.max_selections or (len(allowed) if allowed is not None else None)
+            if limit is not None and len(selections) > limit:
+                raise ValidationError('too many selections')
+            for selection in selections:
+                if selection.__class__ is not str:
+                    raise ValidationError('selections must be strings')
+                if allowed is not None and selection not in allowed:
+                    raise ValidationError('{!r} is not a value of the question scale'.format(selection))
+        except ValidationError:
+            self.rejected += 1
+            raise
+
+    def validate_comment(self, eventTime, object, questionText, commentText, edApp=None, session=None,
+            actor=None):
+        try:
+            self._check_common(eventTime, object, edApp, session, actor)
+            self._check_text('questionText', questionText, self.max_text_length)
+            self._check_text('commentText', commentText, self.max_comment_length)
+            if not commentText.strip():
+                raise ValidationError('commentText is empty')
+        except ValidationError:
+            self.rejected += 1
+            raise
+
+    def compile(self, question):
+        # the frozenset of the question's scale itemValues, None if it has no scale to check against
+        return self._allowed(question)
+
+    def _allowed(self, question):
+        if question.__class__ is str:
+            self._check_text('question', question, self.max_text_length)
+            cached = self._questions.get(question)
+            return cached[1] if cached is not None else None
+        if question.__class__ is not dict or question.get('id').__class__ is not str:
+            raise ValidationError('question must be an entity with an id')
+
+        question_id = question['id']
+        cached = self._questions.get(question_id)
+        # questions parsed from each request are equal but not identical, compare before recompiling
+        if cached is not None and (cached[0] is question or cached[0] == question):
+            return cached[1]
+
+        self._check_entity('question', question)
+        scale = question.get('scale')
+        values = scale.get('itemValues') if scale.__class__ is dict else None
+        if values is None:
+            allowed = None
+        elif values.__class__ is list and all(value.__class__ is str for value in values):
+            allowed = frozenset(values)
+        else:
+            raise ValidationError('question scale itemValues must be a list of strings')
+
+        with self._lock:
+            if question_id not in self._questions and len(self._questions) >= self.max_questions:
+                del self._questions[next(iter(self._questions))]
+            self._questions[question_id] = (question, allowed)
+            self.compiled += 1
+        return allowed
+
+    def _check_common(self, eventTime, object, edApp, session, actor):
+        self._check_text('eventTime', eventTime, 64)
+        self._check_entity('object', object)
+        for name, entity in (('edApp', edApp), ('session', session), ('actor', actor)):
+            if entity is not None:
+                self._check_entity(name, entity)
+
+    def _check_text(self, name, value, limit):
+        if value.__class__ is not str or not value:
+            raise ValidationError('{} must be a non-empty string'.format(name))
+        if len(value) > limit:
+            raise ValidationError('{} is longer than {} characters'.format(name, limit))
+
+    def _check_entity(self, name, entity):
+        # entities are an id IRI or a dict with one
+        if entity.__class__ is str:
+            return self._check_text(name, entity, self.max_text_length)
+        if entity.__class__ is not dict or entity.get('id').__class__ is not str:
+            raise ValidationError('{} must be an entity with an id'.format(name))
+        # flat entities of strings are sized without encoding them
+        size = 2
+        for key, value in entity.items():
+            if value.__class__ is not str:
+                size = len(json.dumps(entity))
+                break
+            size += len(key) + len(value) + 6
+        if size > self.max_entity_size:
+            raise ValidationError('{} is larger than {} characters'.format(name, self.max_entity_size))
+
+    def stats(self):
+        return {
+            'questions': len(self._questions),
+            'compiled': self.compiled,
+            'rejected': self.rejected
+        }
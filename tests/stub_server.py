@@ -0,0 +1,81 @@
+import json
+import threading
+import zlib
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubCaliperServer(object):
+    # local Caliper endpoint that records every request it receives
+    def __init__(self, statuses=None, delay=0, reject_encoding=False):
+        self.statuses = list(statuses) if statuses else []
+        self.delay = delay
+        self.reject_encoding = reject_encoding
+        self.requests = []
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body are separate writes, without this keep-alive clients stall on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                with stub.lock:
+                    stub.requests.append({
+                        'path': self.path,
+                        'headers': dict(self.headers),
+                        'body': body,
+                        'client_port': self.client_address[1]
+                    })
+                    if stub.reject_encoding and self.headers.get('Content-Encoding'):
+                        status = 415
+                    else:
+                        status = stub.statuses.pop(0) if stub.statuses else 200
+                if stub.delay:
+                    time.sleep(stub.delay)
+                self.send_response(status)
+                if status in (204, 304):
+                    # no body and no Content-Length, the connection stays open
+                    return self.end_headers()
+                payload = b'{"ok": true}'
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d/caliper' % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def envelopes(self):
+        with self.lock:
+            return [json.loads(self.decode(r).decode('utf-8')) for r in self.requests]
+
+    def decode(self, request):
+        encoding = request['headers'].get('Content-Encoding')
+        if encoding == 'gzip':
+            return zlib.decompress(request['body'], 16 + zlib.MAX_WBITS)
+        if encoding == 'deflate':
+            return zlib.decompress(request['body'])
+        return request['body']
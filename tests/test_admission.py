@@ -0,0 +1,159 @@
+import unittest
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from emoji_feedback import (EmojiFeedbackSensor, AdmissionControl, BatchingEmitter, DuplicateFilter,
+    QueueFullError, Spool, TokenBucket)
+
+class TestTokenBucket(unittest.TestCase):
+    def test_allow(self):
+        bucket = TokenBucket(rate=2, burst=3, now=0)
+        self.assertEqual([bucket.allow(now=0) for _ in range(4)], [True, True, True, False])
+        self.assertTrue(bucket.allow(now=0.5))
+        self.assertFalse(bucket.allow(now=0.5))
+        # never refills past the burst size
+        self.assertEqual([bucket.allow(now=100) for _ in range(4)], [True, True, True, False])
+
+    def test_admission_control(self):
+        admission = AdmissionControl(rate=3, burst=3, per_actor_rate=1, per_actor_burst=2)
+        results = [admission.admit(actor, now=0) for actor in ['a', 'a', 'a', {'id': 'b'}, 'c']]
+        self.assertEqual(results, [True, True, False, True, False])
+        self.assertEqual(admission.stats(), {'admitted': 3, 'rejected_global': 1, 'rejected_actor': 1})
+
+    def test_anonymous_actor(self):
+        admission = AdmissionControl(per_actor_rate=1, per_actor_burst=1)
+        self.assertEqual([admission.admit(None, now=0) for _ in range(3)], [True, True, True])
+
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            admission=admission)
+        with patch('emoji_feedback.EmojiFeedbackSensor._emit_event') as mocked_emit_event:
+            for _ in range(3):
+                feedback_sensor.send_comment_feedback(eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object', questionText='Question', commentText='Alright')
+            self.assertEqual(mocked_emit_event.call_count, 3)
+        self.assertEqual(len(admission._actors), 0)
+
+    def test_max_actors(self):
+        admission = AdmissionControl(per_actor_rate=1, max_actors=2)
+        for actor in ['a', 'b', 'c']:
+            admission.admit(actor, now=0)
+        self.assertEqual(list(admission._actors.keys()), ['b', 'c'])
+
+    def test_rejected_event_does_not_suppress_retry(self):
+        dedup = DuplicateFilter(window=60)
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            dedup=dedup, admission=AdmissionControl(rate=1, burst=1))
+        with patch('emoji_feedback.EmojiFeedbackSensor._emit_event') as mocked_emit_event:
+            feedback_sensor.admission._bucket.tokens = 0
+            feedback_sensor.send_comment_feedback(eventTime='2019-01-01T00:00:00.000Z', actor='urn:uuid:actor',
+                object='urn:uuid:object', questionText='Question', commentText='Alright')
+            self.assertEqual(mocked_emit_event.call_count, 0)
+
+            feedback_sensor.admission._bucket.tokens = 1
+            feedback_sensor.send_comment_feedback(eventTime='2019-01-01T00:00:00.000Z', actor='urn:uuid:actor',
+                object='urn:uuid:object', questionText='Question', commentText='Alright')
+            self.assertEqual(mocked_emit_event.call_count, 1)
+        self.assertEqual(dedup.suppressed, 0)
+
+
+class TestOverflowPolicies(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def send(self, events):
+        self.release.wait(5)
+        self.sent.extend(event['id'] for event in events)
+
+    def start(self, overflow, **kwargs):
+        emitter = BatchingEmitter(max_events=1, max_delay=0, max_queue=2, overflow=overflow, **kwargs)
+        emitter.start(self.send, **({'spill': self.spilled.append} if overflow == 'spill' else {}))
+        # the worker holds the first event while the queue fills
+        emitter.emit({'id': 0})
+        deadline = time.time() + 2
+        while emitter.queue_depth() and time.time() < deadline:
+            time.sleep(0.01)
+        return emitter
+
+    def finish(self, emitter):
+        self.release.set()
+        self.assertTrue(emitter.flush(timeout=2))
+        emitter.close()
+
+    def test_unknown_policy(self):
+        with self.assertRaises(Exception) as cm:
+            BatchingEmitter(overflow='ignore')
+        self.assertEqual('Emoji Feedback Error: unknown overflow policy ignore', str(cm.exception))
+
+    def test_drop_oldest(self):
+        emitter = self.start('drop_oldest')
+        for i in range(1, 5):
+            emitter.emit({'id': i})
+        self.finish(emitter)
+        self.assertEqual(self.sent, [0, 3, 4])
+        self.assertEqual(emitter.stats()['dropped_oldest'], 2)
+
+    def test_drop_newest(self):
+        emitter = self.start('drop_newest')
+        for i in range(1, 5):
+            emitter.emit({'id': i})
+        self.finish(emitter)
+        self.assertEqual(self.sent, [0, 1, 2])
+        self.assertEqual(emitter.stats()['dropped_newest'], 2)
+
+    def test_block(self):
+        emitter = self.start('block', block_timeout=0.1)
+        emitter.emit({'id': 1})
+        emitter.emit({'id': 2})
+        with self.assertRaises(QueueFullError) as cm:
+            emitter.emit({'id': 3})
+        self.assertEqual('Emoji Feedback Error: event queue is full', str(cm.exception))
+
+        # a blocked producer goes through once the worker makes room
+        threading.Timer(0.05, self.release.set).start()
+        emitter.block_timeout = 2
+        emitter.emit({'id': 4})
+        self.finish(emitter)
+        self.assertEqual(self.sent, [0, 1, 2, 4])
+        self.assertEqual(emitter.stats()['blocked'], 2)
+        self.assertEqual(emitter.stats()['block_timeouts'], 1)
+
+    def test_spill(self):
+        self.spilled = []
+        emitter = self.start('spill')
+        for i in range(1, 5):
+            emitter.emit({'id': i})
+        self.finish(emitter)
+        self.assertEqual(self.sent, [0, 1, 2])
+        self.assertEqual(self.spilled, [{'id': 3}, {'id': 4}])
+        self.assertEqual(emitter.stats()['spilled'], 2)
+
+    def test_spill_needs_spool(self):
+        with self.assertRaises(Exception) as cm:
+            EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+                emitter=BatchingEmitter(max_queue=10, overflow='spill'))
+        self.assertEqual('Emoji Feedback Error: spill overflow policy needs a spool', str(cm.exception))
+
+    def test_dropped_events_leave_the_spool(self):
+        directory = tempfile.mkdtemp()
+        try:
+            spool = Spool(directory)
+            emitter = BatchingEmitter(max_events=1, max_delay=0, max_queue=1, overflow='drop_newest')
+            feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+                emitter=emitter, spool=spool)
+            with patch('emoji_feedback.EmojiFeedbackSensor._send_envelope',
+                    side_effect=lambda envelope: self.release.wait(5)):
+                for i in range(3):
+                    feedback_sensor._emit_event({'id': 'urn:uuid:{}'.format(i)})
+                self.release.set()
+                feedback_sensor.close(timeout=2)
+            self.assertGreater(emitter.stats()['dropped_newest'], 0)
+            self.assertEqual(Spool(directory).pending_count(), 0)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,97 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from emoji_feedback import EmojiFeedbackSensor, AgentEmitter, BatchingEmitter, ForwardingAgent
+from emoji_feedback.agent import main, parse_address
+from tests.stub_server import StubCaliperServer
+
+class TestForwardingAgent(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def forward(self, listen, count):
+        with StubCaliperServer() as stub:
+            agent = ForwardingAgent(listen, EmojiFeedbackSensor(
+                caliper_host=stub.url,
+                caliper_api_key='123',
+                emitter=BatchingEmitter(max_events=100, max_delay=5)
+            ))
+            thread = threading.Thread(target=agent.serve_forever)
+            thread.start()
+
+            # app workers need no Caliper config of their own
+            feedback_sensor = EmojiFeedbackSensor(emitter=AgentEmitter(agent.address))
+            for i in range(count):
+                feedback_sensor.send_comment_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object',
+                    questionText='How do you feel about this graph?',
+                    commentText='Comment {}'.format(i)
+                )
+            feedback_sensor.close()
+
+            deadline = time.time() + 2
+            while agent.received < count and time.time() < deadline:
+                time.sleep(0.01)
+            agent.shutdown(timeout=2)
+            thread.join()
+            return stub.envelopes()
+
+    def test_unix_socket(self):
+        envelopes = self.forward(os.path.join(self.directory, 'agent.sock'), 5)
+        self.assertEqual(len(envelopes), 1)
+        self.assertEqual([event['generated']['value'] for event in envelopes[0]['data']],
+            ['Comment {}'.format(i) for i in range(5)])
+
+    def test_udp(self):
+        envelopes = self.forward('127.0.0.1:0', 3)
+        self.assertEqual(sum(len(envelope['data']) for envelope in envelopes), 3)
+
+    def test_agent_down(self):
+        emitter = AgentEmitter(os.path.join(self.directory, 'missing.sock'))
+        feedback_sensor = EmojiFeedbackSensor(emitter=emitter)
+        feedback_sensor._emit_event({'id': 'urn:uuid:1'})
+        self.assertEqual(emitter.dropped, 1)
+        feedback_sensor.close()
+
+    def test_listen_path_not_a_socket(self):
+        path = os.path.join(self.directory, 'agent.sock')
+        with open(path, 'w') as fh:
+            fh.write('keep me')
+        with self.assertRaises(Exception) as cm:
+            ForwardingAgent(path, EmojiFeedbackSensor())
+        self.assertEqual('Emoji Feedback Error: {} exists and is not a socket'.format(path), str(cm.exception))
+        with open(path) as fh:
+            self.assertEqual(fh.read(), 'keep me')
+
+    def test_main_without_config(self):
+        with mock.patch.dict(os.environ, {}, clear=True), \
+                mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            with self.assertRaises(SystemExit) as cm:
+                main(['--listen', os.path.join(self.directory, 'agent.sock')])
+        self.assertEqual(cm.exception.code, 1)
+        self.assertEqual(stderr.getvalue(), 'Emoji Feedback Error: Caliper Host not set\n')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'agent.sock')))
+
+    def test_main_retries(self):
+        with mock.patch('emoji_feedback.agent.ForwardingAgent') as agent_class, \
+                mock.patch('emoji_feedback.agent.signal.signal'):
+            main(['--caliper-host', 'http://127.0.0.1:9/', '--caliper-api-key', '123', '--max-attempts', '5'])
+        sensor = agent_class.call_args[0][1]
+        self.assertEqual(sensor.retry.max_attempts, 5)
+        agent_class.return_value.shutdown.assert_called_once_with(timeout=30)
+        sensor.close(0)
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('127.0.0.1:8125'), ('127.0.0.1', 8125))
+        self.assertEqual(parse_address(':8125'), ('127.0.0.1', 8125))
+        self.assertEqual(parse_address('/run/emoji-feedback.sock'), '/run/emoji-feedback.sock')
@@ -0,0 +1,90 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from emoji_feedback import EmojiFeedbackSensor, VoteAggregator
+
+class TestVoteAggregator(unittest.TestCase):
+    def setUp(self):
+        self.question = {'id': 'urn:uuid:question', 'type': 'RatingScaleQuestion'}
+        self.object = 'urn:uuid:object'
+
+    def test_totals_and_windows(self):
+        aggregator = VoteAggregator(windows=(60, 300), resolution=10)
+        aggregator.record(self.object, self.question, ['grinning face'], now=1000)
+        aggregator.record(self.object, self.question, ['grinning face', 'neutral face'], now=1200)
+        aggregator.record({'id': self.object}, 'urn:uuid:question', ['neutral face'], now=1250)
+
+        self.assertEqual(aggregator.votes(self.object, self.question, now=1255), {
+            'total': {'grinning face': 2, 'neutral face': 2},
+            'windows': {
+                '60': {'grinning face': 1, 'neutral face': 2},
+                '300': {'grinning face': 2, 'neutral face': 2}
+            }
+        })
+        self.assertEqual(aggregator.votes(self.object, self.question, now=1600)['windows'],
+            {'60': {}, '300': {}})
+        self.assertEqual(aggregator.votes('urn:uuid:other', self.question)['total'], {})
+
+    def test_bounded_memory(self):
+        aggregator = VoteAggregator(windows=(60,), resolution=10, max_keys=2, max_values=2)
+        for i in range(3):
+            aggregator.record('urn:uuid:{}'.format(i), self.question, ['a', 'b', 'c'], now=i * 100)
+        self.assertEqual([votes['object'] for votes in aggregator.all_votes(now=300)],
+            ['urn:uuid:1', 'urn:uuid:2'])
+        self.assertEqual(aggregator.votes('urn:uuid:2', self.question, now=200)['total'], {'a': 1, 'b': 1})
+        self.assertEqual(len(aggregator._keys[('urn:uuid:2', 'urn:uuid:question')].buckets), 1)
+
+    def test_snapshot(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'votes.json')
+            aggregator = VoteAggregator(snapshot_path=path, snapshot_interval=3600)
+            aggregator.record(self.object, self.question, ['grinning face'], now=1000)
+            aggregator.close()
+
+            aggregator = VoteAggregator(snapshot_path=path, snapshot_interval=3600)
+            self.assertEqual(aggregator.votes(self.object, self.question, now=1010), {
+                'total': {'grinning face': 1},
+                'windows': {'60': {'grinning face': 1}, '300': {'grinning face': 1},
+                    '3600': {'grinning face': 1}}
+            })
+            aggregator.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_sensor_records_votes(self):
+        aggregator = VoteAggregator()
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            aggregator=aggregator)
+        with patch('emoji_feedback.EmojiFeedbackSensor._emit_event'):
+            feedback_sensor.send_emoji_feedback(
+                eventTime='2019-01-01T00:00:00.000Z',
+                object=self.object,
+                question=self.question,
+                selections=['grinning face']
+            )
+        self.assertEqual(aggregator.votes(self.object, self.question)['total'], {'grinning face': 1})
+
+    def test_failed_send_is_not_counted(self):
+        aggregator = VoteAggregator()
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            aggregator=aggregator)
+        with patch('emoji_feedback.EmojiFeedbackSensor._emit_event', side_effect=[Exception('down'), None]):
+            with self.assertRaises(Exception):
+                feedback_sensor.send_emoji_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object=self.object,
+                    question=self.question,
+                    selections=['grinning face']
+                )
+            # the widget's retry is the only vote counted
+            feedback_sensor.send_emoji_feedback(
+                eventTime='2019-01-01T00:00:00.000Z',
+                object=self.object,
+                question=self.question,
+                selections=['grinning face']
+            )
+        self.assertEqual(aggregator.votes(self.object, self.question)['total'], {'grinning face': 1})
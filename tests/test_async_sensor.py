@@ -0,0 +1,180 @@
+import unittest
+import asyncio
+import time
+
+from emoji_feedback import AsyncEmojiFeedbackSensor, QueueFullError
+from tests.stub_server import StubCaliperServer
+
+class TestAsyncEmojiFeedback(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.eventTime = '2019-01-01T00:00:00.000Z'
+        self.object = 'urn:uuid:3a02e4fc-24c1-11e9-ab14-d663bd873d11'
+        self.question = {
+            'id': 'urn:uuid:question',
+            'type': 'RatingScaleQuestion',
+            'questionPosed': 'How do you feel about this graph?'
+        }
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_send_emoji_feedback(self):
+        with StubCaliperServer() as stub:
+            feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123')
+
+            async def send():
+                for _ in range(3):
+                    await feedback_sensor.send_emoji_feedback(
+                        eventTime=self.eventTime,
+                        object=self.object,
+                        question=self.question,
+                        selections=['grinning face']
+                    )
+                await feedback_sensor.close()
+            self.run_async(send())
+
+            self.assertEqual(len(stub.requests), 3)
+            # keep-alive connection is reused between sends
+            self.assertEqual(len(set(r['client_port'] for r in stub.requests)), 1)
+            self.assertEqual(stub.requests[0]['headers']['Authorization'], 'Bearer 123')
+            event = stub.envelopes()[0]['data'][0]
+            self.assertEqual(event['action'], 'Ranked')
+            self.assertEqual(event['generated']['question'], self.question)
+
+    def test_no_content_response(self):
+        with StubCaliperServer(statuses=[204, 204]) as stub:
+            feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123')
+
+            async def send():
+                for _ in range(2):
+                    await feedback_sensor.send_emoji_feedback(
+                        eventTime=self.eventTime,
+                        object=self.object,
+                        question=self.question,
+                        selections=['grinning face']
+                    )
+                await feedback_sensor.close()
+            start = time.time()
+            self.run_async(send())
+
+            # a 204 has no body to wait for, and the connection is kept for the next send
+            self.assertLess(time.time() - start, 1.0)
+            self.assertEqual(len(stub.requests), 2)
+            self.assertEqual(len(set(r['client_port'] for r in stub.requests)), 1)
+
+    def test_send_comment_feedback_concurrently(self):
+        with StubCaliperServer(delay=0.2) as stub:
+            feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                max_concurrency=5)
+
+            async def send():
+                await asyncio.gather(*[
+                    feedback_sensor.send_comment_feedback(
+                        eventTime=self.eventTime,
+                        object=self.object,
+                        questionText='How do you feel about this graph?',
+                        commentText='Comment {}'.format(i)
+                    )
+                    for i in range(5)
+                ])
+                await feedback_sensor.close()
+
+            start = time.time()
+            self.run_async(send())
+            self.assertLess(time.time() - start, 0.9)
+
+            comments = sorted(envelope['data'][0]['generated']['value'] for envelope in stub.envelopes())
+            self.assertEqual(comments, ['Comment {}'.format(i) for i in range(5)])
+
+    def test_error_response(self):
+        with StubCaliperServer(statuses=[503]) as stub:
+            feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123')
+            with self.assertRaises(Exception) as cm:
+                self.run_async(feedback_sensor.send_comment_feedback(
+                    eventTime=self.eventTime,
+                    object=self.object,
+                    questionText='How do you feel about this graph?',
+                    commentText='Alright'
+                ))
+            self.assertEqual('Emoji Feedback Error: Caliper Host responded with 503 Service Unavailable',
+                str(cm.exception))
+            self.run_async(feedback_sensor.close())
+
+    def test_missing_host(self):
+        feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host=None, caliper_api_key='123')
+        with self.assertRaises(Exception) as cm:
+            self.run_async(feedback_sensor._emit_event({}))
+        self.assertEqual('Emoji Feedback Error: Caliper Host not set', str(cm.exception))
+
+    def test_enqueue_feedback(self):
+        with StubCaliperServer(delay=0.05) as stub:
+            feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                max_concurrency=2, max_batch_events=10)
+
+            async def send():
+                for i in range(20):
+                    feedback_sensor.enqueue_comment_feedback(
+                        eventTime=self.eventTime,
+                        object=self.object,
+                        questionText='How do you feel about this graph?',
+                        commentText='Comment {}'.format(i)
+                    )
+                self.assertGreater(feedback_sensor.queue_depth(), 0)
+                await feedback_sensor.close(timeout=2)
+            self.run_async(send())
+
+            comments = sorted(event['generated']['value'] for envelope in stub.envelopes()
+                for event in envelope['data'])
+            self.assertEqual(comments, sorted('Comment {}'.format(i) for i in range(20)))
+            self.assertLess(len(stub.requests), 20)
+
+    def test_enqueue_queue_full(self):
+        feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host='http://127.0.0.1:9/', caliper_api_key='123',
+            max_concurrency=1, max_queue=1)
+
+        async def send():
+            feedback_sensor.enqueue_emoji_feedback(eventTime=self.eventTime, object=self.object,
+                question=self.question, selections=[])
+            with self.assertRaises(QueueFullError) as cm:
+                feedback_sensor.enqueue_emoji_feedback(eventTime=self.eventTime, object=self.object,
+                    question=self.question, selections=[])
+            self.assertEqual('Emoji Feedback Error: event queue is full', str(cm.exception))
+            await feedback_sensor.close(timeout=2)
+        self.run_async(send())
+
+    def test_send_many(self):
+        with StubCaliperServer() as stub:
+            feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                max_concurrency=2)
+            records = ({
+                'eventTime': self.eventTime,
+                'object': self.object,
+                'questionText': 'How do you feel about this graph?',
+                'commentText': 'Comment {}'.format(i)
+            } for i in range(25))
+
+            async def send():
+                sent = await feedback_sensor.send_many(records, max_events=10)
+                await feedback_sensor.close()
+                return sent
+            self.assertEqual(self.run_async(send()), 25)
+
+            envelopes = stub.envelopes()
+            self.assertEqual(sorted(len(envelope['data']) for envelope in envelopes), [5, 10, 10])
+
+    def test_send_many_error(self):
+        with StubCaliperServer(statuses=[500]) as stub:
+            feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123')
+            records = [{
+                'eventTime': self.eventTime,
+                'object': self.object,
+                'question': self.question,
+                'selections': []
+            }]
+            with self.assertRaises(Exception):
+                self.run_async(feedback_sensor.send_many(records))
+            self.run_async(feedback_sensor.close())
@@ -0,0 +1,86 @@
+import unittest
+import copy
+import json
+
+from emoji_feedback import EmojiFeedbackSensor, EnvelopeCompactor, compact_envelope
+from tests.stub_server import StubCaliperServer
+
+class TestCompaction(unittest.TestCase):
+    def setUp(self):
+        self.feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123')
+        self.actor = {
+            'id': 'urn:uuid:1a02e4fc-24c1-11e9-ab14-d663bd873d93',
+            'type': 'Person',
+            'name': 'First Last'
+        }
+        self.object = {
+            'id': 'urn:uuid:3a02e4fc-24c1-11e9-ab14-d663bd873d11',
+            'type': 'DigitalResource'
+        }
+        self.question = {
+            'id': 'urn:uuid:question',
+            'type': 'RatingScaleQuestion',
+            'questionPosed': 'How do you feel about this graph?'
+        }
+
+    def comment_event(self):
+        return self.feedback_sensor.generate_comment_feedback_event(
+            eventTime='2019-01-01T00:00:00.000Z',
+            actor=self.actor,
+            object=self.object,
+            questionText='How do you feel about this graph?',
+            commentText='Alright'
+        )
+
+    def emoji_event(self):
+        return self.feedback_sensor.generate_emoji_feedback_event(
+            eventTime='2019-01-01T00:00:00.000Z',
+            actor=self.actor,
+            object=self.object,
+            question=self.question,
+            selections=['grinning face']
+        )
+
+    def test_compact_single_event(self):
+        event = self.comment_event()
+        original = copy.deepcopy(event)
+        envelope = self.feedback_sensor._build_envelope([event])
+
+        compacted, saved = compact_envelope(envelope)
+        compacted_event = compacted['data'][0]
+        self.assertEqual(compacted_event['actor'], self.actor)
+        self.assertEqual(compacted_event['object'], self.object)
+        self.assertEqual(compacted_event['generated']['commenter'], self.actor['id'])
+        self.assertEqual(compacted_event['generated']['commentedOn'], self.object['id'])
+
+        # the caller's event is not modified
+        self.assertEqual(event, original)
+        self.assertEqual(saved, len(json.dumps(envelope, separators=(',', ':')))
+            - len(json.dumps(compacted, separators=(',', ':'))))
+
+    def test_compact_batch(self):
+        envelope = self.feedback_sensor._build_envelope([self.emoji_event(), self.emoji_event()])
+        compacted, saved = compact_envelope(envelope)
+        first, second = compacted['data']
+
+        self.assertEqual(first['generated']['question'], self.question)
+        self.assertEqual(first['edApp']['type'], 'SoftwareApplication')
+        self.assertEqual(second['actor'], self.actor['id'])
+        self.assertEqual(second['edApp'], 'http://purl.imsglobal.org/caliper/SoftwareApplication')
+        self.assertEqual(second['generated']['question'], self.question['id'])
+        self.assertGreater(saved, 0)
+
+    def test_sensor_compacts_envelopes(self):
+        with StubCaliperServer() as stub:
+            compactor = EnvelopeCompactor()
+            feedback_sensor = EmojiFeedbackSensor(
+                caliper_host=stub.url,
+                caliper_api_key='123',
+                compactor=compactor
+            )
+            feedback_sensor._send_events([self.comment_event(), self.comment_event()])
+
+            second = stub.envelopes()[0]['data'][1]
+            self.assertEqual(second['actor'], self.actor['id'])
+            self.assertGreater(compactor.bytes_saved, 0)
+            self.assertEqual(compactor.envelopes, 1)
@@ -0,0 +1,60 @@
+import unittest
+import asyncio
+
+from emoji_feedback import AsyncTransport, Compression, PostTransport, SessionTransport
+from tests.stub_server import StubCaliperServer
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.headers = {'Authorization': 'Bearer 123', 'Content-Type': 'application/json'}
+        self.envelope = {'data': [{'value': 'Alright ' * 50}]}
+
+    def test_unsupported_encoding(self):
+        with self.assertRaises(Exception) as cm:
+            Compression(encoding='br')
+        self.assertEqual('Emoji Feedback Error: unsupported content encoding br', str(cm.exception))
+
+    def test_threshold(self):
+        compression = Compression(threshold=200)
+        body, encoded, headers = compression.encode({'data': []}, self.headers)
+        self.assertEqual(body, b'{"data": []}')
+        self.assertIsNone(encoded)
+
+        body, encoded, headers = compression.encode(self.envelope, self.headers)
+        self.assertLess(len(encoded), len(body))
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Encoding', self.headers)
+
+    def test_gzip_and_deflate(self):
+        for encoding in ('gzip', 'deflate'):
+            with StubCaliperServer() as stub:
+                transport = SessionTransport(compression=Compression(encoding=encoding, threshold=100, level=9))
+                transport.post(stub.url, self.envelope, self.headers).raise_for_status()
+                transport.close()
+
+                self.assertEqual(stub.requests[0]['headers']['Content-Encoding'], encoding)
+                self.assertLess(len(stub.requests[0]['body']), 100)
+                self.assertEqual(stub.envelopes(), [self.envelope])
+
+    def test_fallback_when_rejected(self):
+        with StubCaliperServer(reject_encoding=True) as stub:
+            compression = Compression(threshold=100)
+            transport = PostTransport(compression=compression)
+            transport.post(stub.url, self.envelope, self.headers).raise_for_status()
+            transport.post(stub.url, self.envelope, self.headers).raise_for_status()
+
+            self.assertFalse(compression.enabled)
+            self.assertEqual([r['headers'].get('Content-Encoding') for r in stub.requests], ['gzip', None, None])
+            self.assertEqual(stub.envelopes()[1:], [self.envelope, self.envelope])
+
+    def test_async_transport(self):
+        with StubCaliperServer() as stub:
+            transport = AsyncTransport(compression=Compression(threshold=100))
+            loop = asyncio.new_event_loop()
+            response = loop.run_until_complete(transport.post(stub.url, self.envelope, self.headers))
+            loop.run_until_complete(transport.close())
+            loop.close()
+
+            response.raise_for_status()
+            self.assertEqual(stub.requests[0]['headers']['Content-Encoding'], 'gzip')
+            self.assertEqual(stub.envelopes(), [self.envelope])
@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import patch
+
+from emoji_feedback import EmojiFeedbackSensor, DuplicateFilter
+from tests.stub_server import StubCaliperServer
+
+class TestDuplicateFilter(unittest.TestCase):
+    def setUp(self):
+        self.actor = {'id': 'urn:uuid:actor', 'type': 'Person'}
+        self.question = {'id': 'urn:uuid:question', 'type': 'RatingScaleQuestion'}
+
+    def test_window(self):
+        dedup = DuplicateFilter(window=2.0)
+        key = dedup.emoji_key(self.actor, 'urn:uuid:object', self.question, ['grinning face'])
+        self.assertFalse(dedup.is_duplicate(key, now=100.0))
+        self.assertTrue(dedup.is_duplicate(key, now=101.9))
+        self.assertFalse(dedup.is_duplicate(key, now=102.0))
+        self.assertEqual(dedup.suppressed, 1)
+
+        # entities and their ids give the same key
+        self.assertEqual(key, dedup.emoji_key('urn:uuid:actor', {'id': 'urn:uuid:object'},
+            'urn:uuid:question', ['grinning face']))
+        self.assertNotEqual(key, dedup.emoji_key(self.actor, 'urn:uuid:object', self.question, ['neutral face']))
+
+    def test_max_entries(self):
+        dedup = DuplicateFilter(window=60, max_entries=2)
+        for i in range(3):
+            dedup.is_duplicate(('key', i), now=100.0)
+        self.assertEqual(len(dedup._seen), 2)
+        self.assertFalse(dedup.is_duplicate(('key', 0), now=100.0))
+
+    def test_sensor_suppresses_duplicates(self):
+        dedup = DuplicateFilter(window=2.0)
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            dedup=dedup)
+        with patch('emoji_feedback.EmojiFeedbackSensor._emit_event') as mocked_emit_event:
+            for _ in range(3):
+                feedback_sensor.send_emoji_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    actor=self.actor,
+                    object='urn:uuid:object',
+                    question=self.question,
+                    selections=['grinning face']
+                )
+                feedback_sensor.send_comment_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    actor=self.actor,
+                    object='urn:uuid:object',
+                    questionText='How do you feel about this graph?',
+                    commentText='Alright'
+                )
+            self.assertEqual(mocked_emit_event.call_count, 2)
+        self.assertEqual(dedup.suppressed, 4)
+
+    def test_anonymous_actor_is_not_deduplicated(self):
+        dedup = DuplicateFilter(window=2.0)
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            dedup=dedup)
+        with patch('emoji_feedback.EmojiFeedbackSensor._emit_event') as mocked_emit_event:
+            # two learners without an actor pick the same emoji
+            for _ in range(2):
+                feedback_sensor.send_emoji_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object',
+                    question=self.question,
+                    selections=['grinning face']
+                )
+            self.assertEqual(mocked_emit_event.call_count, 2)
+        self.assertEqual(dedup.suppressed, 0)
+
+    def test_retry_after_failed_send(self):
+        dedup = DuplicateFilter(window=2.0)
+        with StubCaliperServer(statuses=[503]) as stub:
+            feedback_sensor = EmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                dedup=dedup)
+            for attempt in range(2):
+                try:
+                    feedback_sensor.send_emoji_feedback(
+                        eventTime='2019-01-01T00:00:00.000Z',
+                        actor=self.actor,
+                        object='urn:uuid:object',
+                        question=self.question,
+                        selections=['grinning face']
+                    )
+                except Exception:
+                    self.assertEqual(attempt, 0)
+            self.assertEqual(len(stub.requests), 2)
+        self.assertEqual(dedup.suppressed, 0)
@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import patch
+
+from emoji_feedback import DegradationPolicy, EmojiFeedbackSensor, Metrics, VoteAggregator
+
+
+class TestDegradationPolicy(unittest.TestCase):
+    def test_queue_depth_with_hysteresis(self):
+        policy = DegradationPolicy(max_queue_depth=100, recover_ratio=0.5)
+        self.assertEqual(policy.update(99), 'full')
+        self.assertEqual(policy.update(100), 'degraded')
+        self.assertEqual(policy.update(60), 'degraded')
+        self.assertEqual(policy.update(49), 'full')
+        self.assertEqual(policy.transitions, 2)
+
+    def test_latency(self):
+        policy = DegradationPolicy(max_latency=1.0, latency_weight=0.5)
+        policy.observe_latency(0.5)
+        self.assertEqual(policy.update(0), 'full')
+        policy.observe_latency(2.0)
+        self.assertEqual(policy.latency, 1.25)
+        self.assertEqual(policy.update(0), 'degraded')
+
+    def test_sampling(self):
+        draws = iter([0.1, 0.3, 0.1])
+        policy = DegradationPolicy(max_queue_depth=1, sample_rates={'Commented': 0.25},
+            random=lambda: next(draws))
+        # nothing is sampled in full mode
+        self.assertTrue(policy.sample('Commented'))
+        policy.update(1)
+        self.assertTrue(policy.sample('Ranked'))
+        self.assertTrue(policy.sample('Commented'))
+        self.assertFalse(policy.sample('Commented'))
+        self.assertEqual(policy.sampled_out, 1)
+        self.assertEqual(policy.tag('Commented'), {'emojiFeedbackMode': 'degraded', 'sampleRate': 0.25})
+
+
+class TestSensorDegradation(unittest.TestCase):
+    def setUp(self):
+        self.actor = {'id': 'urn:uuid:actor', 'type': 'Person', 'name': 'First Last'}
+        self.question = {
+            'id': 'urn:uuid:question',
+            'type': 'RatingScaleQuestion',
+            'questionPosed': 'How do you feel about this graph?',
+            'scale': {'type': 'MultiselectScale', 'itemValues': ['grinning face', 'neutral face']}
+        }
+
+    def send_emoji(self, feedback_sensor):
+        feedback_sensor.send_emoji_feedback(
+            eventTime='2019-01-01T00:00:00.000Z',
+            actor=self.actor,
+            object='urn:uuid:object',
+            question=self.question,
+            selections=['grinning face'],
+            extensions={'page': 'graph'}
+        )
+
+    def test_full_mode_is_tagged(self):
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            degradation=DegradationPolicy(max_queue_depth=100))
+        with patch('emoji_feedback.EmojiFeedbackSensor._emit_event') as mocked_emit_event:
+            self.send_emoji(feedback_sensor)
+        event = mocked_emit_event.call_args[0][0]
+        self.assertEqual(event['generated']['question'], self.question)
+        self.assertEqual(event['extensions'], {'page': 'graph', 'emojiFeedbackMode': 'full', 'sampleRate': 1.0})
+
+    def test_degraded_events_are_trimmed(self):
+        policy = DegradationPolicy(max_latency=0.5)
+        policy.observe_latency(1.0)
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            degradation=policy, metrics=Metrics())
+        with patch('emoji_feedback.EmojiFeedbackSensor._emit_event') as mocked_emit_event:
+            self.send_emoji(feedback_sensor)
+        event = mocked_emit_event.call_args[0][0]
+        self.assertEqual(event['actor'], {'id': 'urn:uuid:actor', 'type': 'Person'})
+        self.assertEqual(event['generated']['question'], {'id': 'urn:uuid:question', 'type': 'RatingScaleQuestion'})
+        self.assertEqual(event['generated']['selections'], ['grinning face'])
+        self.assertEqual(event['extensions'], {'emojiFeedbackMode': 'degraded', 'sampleRate': 1.0})
+        self.assertEqual(feedback_sensor.metrics()['gauges']['degraded'], 1)
+
+    def test_sampled_out_comments(self):
+        policy = DegradationPolicy(max_latency=0.5, sample_rates={'Commented': 0.5}, random=lambda: 0.9)
+        policy.observe_latency(1.0)
+        metrics = Metrics()
+        aggregator = VoteAggregator()
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            degradation=policy, metrics=metrics, aggregator=aggregator)
+        with patch('emoji_feedback.EmojiFeedbackSensor._emit_event') as mocked_emit_event:
+            feedback_sensor.send_comment_feedback(
+                eventTime='2019-01-01T00:00:00.000Z',
+                object='urn:uuid:object',
+                questionText='How do you feel about this graph?',
+                commentText='Alright'
+            )
+            self.assertFalse(mocked_emit_event.called)
+            self.send_emoji(feedback_sensor)
+            self.assertEqual(mocked_emit_event.call_count, 1)
+        self.assertEqual(metrics.snapshot()['counters']['events_total'],
+            {'action="Commented",outcome="sampled_out"': 1})
+        self.assertEqual(aggregator.votes('urn:uuid:object', 'urn:uuid:question')['total'], {'grinning face': 1})
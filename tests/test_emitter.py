@@ -0,0 +1,114 @@
+import unittest
+import threading
+import time
+
+from emoji_feedback import EmojiFeedbackSensor, BatchingEmitter
+from tests.stub_server import StubCaliperServer
+
+class TestBatchingEmitter(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def send(self, events):
+        with self.lock:
+            self.batches.append(list(events))
+
+    def event(self, i, padding=''):
+        return {'id': 'urn:uuid:%d' % i, 'type': 'FeedbackEvent', 'padding': padding}
+
+    def test_max_events(self):
+        emitter = BatchingEmitter(max_events=3, max_delay=5)
+        emitter.start(self.send)
+        for i in range(7):
+            emitter.emit(self.event(i))
+        self.assertTrue(emitter.flush(timeout=2))
+        emitter.close()
+
+        self.assertEqual([len(batch) for batch in self.batches], [3, 3, 1])
+        ids = [event['id'] for batch in self.batches for event in batch]
+        self.assertEqual(ids, ['urn:uuid:%d' % i for i in range(7)])
+
+    def test_max_bytes(self):
+        emitter = BatchingEmitter(max_events=100, max_bytes=350, max_delay=5)
+        emitter.start(self.send)
+        for i in range(4):
+            emitter.emit(self.event(i, padding='x' * 100))
+        self.assertTrue(emitter.flush(timeout=2))
+        emitter.close()
+
+        self.assertEqual([len(batch) for batch in self.batches], [2, 2])
+
+    def test_max_delay(self):
+        emitter = BatchingEmitter(max_events=100, max_delay=0.05)
+        emitter.start(self.send)
+        emitter.emit(self.event(1))
+        time.sleep(0.5)
+        self.assertEqual(len(self.batches), 1)
+        emitter.close()
+
+    def test_concurrent_flush(self):
+        emitter = BatchingEmitter(max_events=100, max_delay=5)
+        emitter.start(self.send)
+        emitter.emit(self.event(1))
+        flushers = [threading.Thread(target=emitter.flush, args=(2,)) for _ in range(4)]
+        for flusher in flushers:
+            flusher.start()
+        for flusher in flushers:
+            flusher.join()
+
+        # flushing must not change max_delay for later events
+        self.assertEqual(emitter.max_delay, 5)
+        for i in range(3):
+            emitter.emit(self.event(i))
+        time.sleep(0.2)
+        self.assertEqual(len(self.batches), 1)
+        self.assertTrue(emitter.flush(timeout=2))
+        emitter.close()
+        self.assertEqual([len(batch) for batch in self.batches], [1, 3])
+
+    def test_size_measured_by_worker(self):
+        threads = []
+
+        def size(event):
+            threads.append(threading.current_thread())
+            return 10
+
+        emitter = BatchingEmitter(max_events=100, max_bytes=25, max_delay=5)
+        emitter.start(self.send, size)
+        for i in range(3):
+            emitter.emit(self.event(i))
+        self.assertTrue(emitter.flush(timeout=2))
+        emitter.close()
+
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertEqual([len(batch) for batch in self.batches], [2, 1])
+
+    def test_closed(self):
+        emitter = BatchingEmitter()
+        emitter.start(self.send)
+        emitter.close()
+        with self.assertRaises(Exception) as cm:
+            emitter.emit(self.event(1))
+        self.assertEqual('Emoji Feedback Error: emitter is closed', str(cm.exception))
+
+    def test_sensor_batches_events(self):
+        with StubCaliperServer() as stub:
+            feedback_sensor = EmojiFeedbackSensor(
+                caliper_host=stub.url,
+                caliper_api_key='123',
+                emitter=BatchingEmitter(max_events=10, max_delay=5)
+            )
+            for i in range(10):
+                feedback_sensor.send_comment_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object',
+                    questionText='How do you feel about this graph?',
+                    commentText='Comment %d' % i
+                )
+            feedback_sensor.close(timeout=2)
+
+            envelopes = stub.envelopes()
+            self.assertEqual(len(envelopes), 1)
+            self.assertEqual(len(envelopes[0]['data']), 10)
+            self.assertEqual(envelopes[0]['data'][9]['generated']['value'], 'Comment 9')
@@ -406,4 +406,57 @@ class TestEmojiFeedback(unittest.TestCase):
                 'sensor': 'https://emojifeedback.learninganalytics.ubc.ca/',
                 'dataVersion': 'http://purl.imsglobal.org/ctx/caliper/v1p2',
                 'data': [ event ]
-            })
\ No newline at end of file
+            })
+
+    def test_generate_envelopes(self):
+        def records():
+            for i in range(5):
+                yield {
+                    'eventTime': self.eventTime,
+                    'object': self.object,
+                    'question': self.question,
+                    'selections': self.selections
+                }
+                yield {
+                    'eventTime': self.eventTime,
+                    'actor': self.actor,
+                    'object': self.object,
+                    'questionText': self.questionText,
+                    'commentText': 'Comment {}'.format(i)
+                }
+
+        envelopes = list(self.feedback_sensor.generate_envelopes(records(), max_events=4))
+        self.assertEqual([len(envelope['data']) for envelope in envelopes], [4, 4, 2])
+        actions = [event['action'] for envelope in envelopes for event in envelope['data']]
+        self.assertEqual(actions, ['Ranked', 'Commented'] * 5)
+        for envelope in envelopes:
+            self.assertEqual(envelope['sensor'], 'https://emojifeedback.learninganalytics.ubc.ca/')
+            self.assertEqual(envelope['dataVersion'], self.feedback_context)
+
+        # split by serialized size
+        max_bytes = 2048
+        envelopes = list(self.feedback_sensor.generate_envelopes(records(), max_events=100,
+            max_bytes=max_bytes))
+        self.assertGreater(len(envelopes), 1)
+        self.assertEqual(sum(len(envelope['data']) for envelope in envelopes), 10)
+        for envelope in envelopes:
+            self.assertLessEqual(len(json.dumps(envelope).encode('utf-8')), max_bytes)
+
+    def test_send_many(self):
+        self.sent_evelopes = []
+        def send_envelope_override(envelope):
+            self.sent_evelopes.append(envelope)
+
+        with patch('emoji_feedback.EmojiFeedbackSensor._send_envelope') as mocked_send_envelope:
+            mocked_send_envelope.side_effect = send_envelope_override
+
+            records = ({
+                'eventTime': self.eventTime,
+                'object': self.object,
+                'questionText': self.questionText,
+                'commentText': self.commentText
+            } for _ in range(250))
+            sent = self.feedback_sensor.send_many(records)
+
+            self.assertEqual(sent, 250)
+            self.assertEqual([len(envelope['data']) for envelope in self.sent_evelopes], [100, 100, 50])
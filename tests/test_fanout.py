@@ -0,0 +1,115 @@
+import shutil
+import tempfile
+import time
+import unittest
+
+from emoji_feedback import CircuitBreaker, Destination, EmojiFeedbackSensor, Metrics, Spool
+from tests.stub_server import StubCaliperServer
+
+
+class _Sink(object):
+    def __init__(self):
+        self.events = []
+
+    def write(self, events):
+        self.events.extend(events)
+
+
+class TestFanOut(unittest.TestCase):
+    def setUp(self):
+        self.question = {'id': 'urn:uuid:question', 'type': 'RatingScaleQuestion'}
+
+    def send(self, feedback_sensor):
+        feedback_sensor.send_emoji_feedback(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            question=self.question,
+            selections=['grinning face']
+        )
+
+    def test_same_body_to_every_destination(self):
+        with StubCaliperServer() as lrs, StubCaliperServer() as warehouse:
+            feedback_sensor = EmojiFeedbackSensor(destinations=[
+                Destination(lrs.url, 'lrs-key', name='lrs'),
+                Destination(warehouse.url, 'warehouse-key', name='warehouse')
+            ])
+            self.send(feedback_sensor)
+            self.assertTrue(feedback_sensor.flush(timeout=5))
+
+            self.assertEqual(lrs.requests[0]['body'], warehouse.requests[0]['body'])
+            self.assertEqual(lrs.requests[0]['headers']['Authorization'], 'Bearer lrs-key')
+            self.assertEqual(warehouse.requests[0]['headers']['Authorization'], 'Bearer warehouse-key')
+            self.assertEqual(feedback_sensor.destination_stats()['lrs']['sent'], 1)
+            feedback_sensor.close(timeout=5)
+
+    def test_slow_destination_does_not_stall_others(self):
+        with StubCaliperServer() as fast, StubCaliperServer(delay=0.5) as slow:
+            feedback_sensor = EmojiFeedbackSensor(destinations=[
+                Destination(slow.url, '123', name='slow'),
+                Destination(fast.url, '123', name='fast')
+            ])
+            start = time.time()
+            for _ in range(3):
+                self.send(feedback_sensor)
+            self.assertLess(time.time() - start, 0.5)
+
+            fast_destination = feedback_sensor.destinations[1]
+            self.assertTrue(fast_destination.flush(timeout=0.4))
+            self.assertEqual(len(fast.requests), 3)
+            self.assertGreater(feedback_sensor.destinations[0].queue_depth(), 0)
+            feedback_sensor.close(timeout=5)
+            self.assertEqual(len(slow.requests), 3)
+
+    def test_failure_isolation(self):
+        sink = _Sink()
+        metrics = Metrics()
+        with StubCaliperServer() as lrs, StubCaliperServer(statuses=[503, 503]) as warehouse:
+            feedback_sensor = EmojiFeedbackSensor(metrics=metrics, destinations=[
+                Destination(lrs.url, '123', name='lrs'),
+                Destination(warehouse.url, '123', name='warehouse', fallback=sink,
+                    breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+            ])
+            for _ in range(2):
+                self.send(feedback_sensor)
+            feedback_sensor.close(timeout=5)
+
+            stats = feedback_sensor.destination_stats()
+            self.assertEqual(stats['lrs']['sent'], 2)
+            self.assertEqual(stats['warehouse']['diverted'], 2)
+            self.assertEqual(len(warehouse.requests), 1)
+            self.assertEqual(len(sink.events), 2)
+            self.assertEqual(metrics.snapshot()['counters']['destination_events_total'], {
+                'destination="lrs",outcome="sent"': 2,
+                'destination="warehouse",outcome="diverted"': 2
+            })
+
+    def test_full_queue_drops_for_that_destination(self):
+        destination = Destination('http://127.0.0.1:9/', '123', max_queue=0)
+        self.assertFalse(destination.put(b'{}', [{'action': 'Ranked'}]))
+        self.assertEqual(destination.stats()['dropped'], 1)
+        destination.close(timeout=1)
+
+    def test_spool_waits_for_every_destination(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with StubCaliperServer() as lrs, StubCaliperServer(statuses=[503]) as warehouse:
+            spool = Spool(directory)
+            feedback_sensor = EmojiFeedbackSensor(spool=spool, destinations=[
+                Destination(lrs.url, '123', name='lrs'),
+                Destination(warehouse.url, '123', name='warehouse')
+            ])
+            self.send(feedback_sensor)
+            self.assertTrue(feedback_sensor.flush(timeout=5))
+            # one destination failed, so the event stays in the spool for replay
+            self.assertEqual(feedback_sensor.destination_stats()['warehouse']['failed'], 1)
+            self.assertEqual(spool.pending_count(), 1)
+
+            # the next send succeeds everywhere and replays the backlog
+            self.send(feedback_sensor)
+            deadline = time.time() + 5
+            while spool.pending_count() and time.time() < deadline:
+                feedback_sensor.flush(timeout=5)
+                time.sleep(0.01)
+            self.assertEqual(spool.pending_count(), 0)
+            self.assertEqual(len(warehouse.requests), 3)
+            feedback_sensor.close(timeout=5)
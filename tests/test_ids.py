@@ -0,0 +1,51 @@
+import unittest
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from emoji_feedback import EmojiFeedbackSensor, DeterministicIdProvider, FastIdProvider
+
+class TestIdProviders(unittest.TestCase):
+    def test_fast_new_id(self):
+        id_provider = FastIdProvider(buffer_size=4)
+        ids = [id_provider.new_id() for _ in range(10)]
+        self.assertEqual(len(set(ids)), 10)
+        for new_id in ids:
+            self.assertTrue(new_id.startswith('urn:uuid:'))
+            self.assertEqual(uuid.UUID(new_id[len('urn:uuid:'):]).version, 4)
+
+    def test_fast_new_id_after_fork(self):
+        id_provider = FastIdProvider()
+        id_provider.new_id()
+        with patch('os.getpid', return_value=-1):
+            with patch('os.urandom', return_value=b'\x00' * 16 * 256) as mocked_urandom:
+                self.assertEqual(id_provider.new_id(), 'urn:uuid:00000000-0000-4000-8000-000000000000')
+                self.assertEqual(mocked_urandom.call_count, 1)
+
+    def test_fast_send_time(self):
+        id_provider = FastIdProvider()
+        with patch('time.time', return_value=1546300800.1234):
+            self.assertEqual(id_provider.send_time(), '2019-01-01T00:00:00.123Z')
+            self.assertIs(id_provider.send_time(), id_provider.send_time())
+        self.assertRegex(id_provider.send_time(), r'^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}Z$')
+
+    def test_deterministic(self):
+        start = datetime(2019, 1, 1, tzinfo=timezone.utc)
+        first = DeterministicIdProvider(seed=42, start=start, step=0.5)
+        second = DeterministicIdProvider(seed=42, start=start, step=0.5)
+        self.assertEqual([first.new_id() for _ in range(3)], [second.new_id() for _ in range(3)])
+        self.assertEqual(first.send_time(), '2019-01-01T00:00:00.000Z')
+        self.assertEqual(first.send_time(), '2019-01-01T00:00:00.500Z')
+
+    def test_sensor_uses_id_provider(self):
+        feedback_sensor = EmojiFeedbackSensor(id_provider=DeterministicIdProvider(seed=1))
+        event = feedback_sensor.generate_comment_feedback_event(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            questionText='How do you feel about this graph?',
+            commentText='Alright'
+        )
+        expected = DeterministicIdProvider(seed=1)
+        self.assertEqual(event['generated']['id'], expected.new_id())
+        self.assertEqual(event['id'], expected.new_id())
+        self.assertEqual(feedback_sensor._build_envelope([event])['sendTime'], '2019-01-01T00:00:00.000Z')
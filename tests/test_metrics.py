@@ -0,0 +1,128 @@
+import unittest
+import asyncio
+
+from emoji_feedback import AsyncEmojiFeedbackSensor, BatchingEmitter, EmojiFeedbackSensor, Metrics
+from tests.stub_server import StubCaliperServer
+
+class TestMetrics(unittest.TestCase):
+    def test_counters_and_histograms(self):
+        metrics = Metrics(buckets=(0.1, 1.0))
+        metrics.inc('events_total', (('action', 'Ranked'), ('outcome', 'sent')))
+        metrics.inc('events_total', (('action', 'Ranked'), ('outcome', 'sent')), 2)
+        for value in (0.05, 0.5, 5):
+            metrics.observe('http_seconds', value)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['events_total'], {'action="Ranked",outcome="sent"': 3})
+        self.assertEqual(snapshot['histograms']['http_seconds'][''], {
+            'buckets': [(0.1, 1), (1.0, 2), ('+Inf', 3)],
+            'sum': 5.55,
+            'count': 3
+        })
+
+    def test_prometheus(self):
+        metrics = Metrics(buckets=(0.1,))
+        metrics.inc('events_total', (('action', 'Commented'), ('outcome', 'failed')))
+        metrics.observe('http_seconds', 0.05, (('outcome', 'success'),))
+        self.assertEqual(metrics.prometheus({'queue_depth': 2}).splitlines(), [
+            '# HELP emoji_feedback_events_total Feedback events by action and delivery outcome',
+            '# TYPE emoji_feedback_events_total counter',
+            'emoji_feedback_events_total{action="Commented",outcome="failed"} 1',
+            '# HELP emoji_feedback_http_seconds Caliper host round trip by outcome',
+            '# TYPE emoji_feedback_http_seconds histogram',
+            'emoji_feedback_http_seconds_bucket{outcome="success",le="0.1"} 1',
+            'emoji_feedback_http_seconds_bucket{outcome="success",le="+Inf"} 1',
+            'emoji_feedback_http_seconds_sum{outcome="success"} 0.05',
+            'emoji_feedback_http_seconds_count{outcome="success"} 1',
+            '# TYPE emoji_feedback_queue_depth gauge',
+            'emoji_feedback_queue_depth 2',
+        ])
+
+class TestSensorMetrics(unittest.TestCase):
+    def setUp(self):
+        self.question = {
+            'id': 'urn:uuid:question',
+            'type': 'RatingScaleQuestion',
+            'questionPosed': 'How do you feel about this graph?'
+        }
+
+    def send(self, feedback_sensor):
+        feedback_sensor.send_emoji_feedback(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            question=self.question,
+            selections=['grinning face']
+        )
+        feedback_sensor.send_comment_feedback(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            questionText='How do you feel about this graph?',
+            commentText='Alright'
+        )
+
+    def test_disabled(self):
+        self.assertEqual(EmojiFeedbackSensor().metrics(), {})
+
+    def test_sensor_metrics(self):
+        with StubCaliperServer(statuses=[200, 503]) as stub:
+            feedback_sensor = EmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123', metrics=Metrics())
+            feedback_sensor.send_emoji_feedback(
+                eventTime='2019-01-01T00:00:00.000Z',
+                object='urn:uuid:object',
+                question=self.question,
+                selections=['grinning face']
+            )
+            with self.assertRaises(Exception):
+                feedback_sensor.send_comment_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object',
+                    questionText='How do you feel about this graph?',
+                    commentText='Alright'
+                )
+
+            metrics = feedback_sensor.metrics()
+            self.assertEqual(metrics['counters']['events_total'], {
+                'action="Ranked",outcome="sent"': 1,
+                'action="Commented",outcome="failed"': 1
+            })
+            self.assertEqual(metrics['counters']['bytes_sent_total'][''],
+                sum(len(request['body']) for request in stub.requests))
+            self.assertEqual(set(metrics['histograms']['generate_seconds']),
+                {'action="Ranked"', 'action="Commented"'})
+            self.assertEqual(metrics['histograms']['serialize_seconds']['']['count'], 2)
+            self.assertEqual(metrics['histograms']['http_seconds']['outcome="success"']['count'], 1)
+            self.assertEqual(metrics['histograms']['http_seconds']['outcome="error"']['count'], 1)
+            self.assertEqual(metrics['gauges'], {'queue_depth': 0, 'spool_pending': 0})
+
+    def test_queue_wait(self):
+        with StubCaliperServer() as stub:
+            feedback_sensor = EmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                emitter=BatchingEmitter(max_events=10, max_delay=5), metrics=Metrics())
+            self.send(feedback_sensor)
+            feedback_sensor.close(timeout=2)
+
+            metrics = feedback_sensor.metrics()
+            self.assertEqual(metrics['histograms']['queue_wait_seconds']['']['count'], 2)
+            self.assertEqual(sum(metrics['counters']['events_total'].values()), 2)
+
+    def test_async_sensor_metrics(self):
+        loop = asyncio.new_event_loop()
+        with StubCaliperServer() as stub:
+            feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                metrics=Metrics())
+
+            async def send():
+                feedback_sensor.enqueue_comment_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object',
+                    questionText='How do you feel about this graph?',
+                    commentText='Alright'
+                )
+                await feedback_sensor.close(timeout=2)
+            loop.run_until_complete(send())
+            loop.close()
+
+            metrics = feedback_sensor.metrics()
+            self.assertEqual(metrics['counters']['events_total'], {'action="Commented",outcome="sent"': 1})
+            self.assertEqual(metrics['histograms']['queue_wait_seconds']['']['count'], 1)
+            self.assertEqual(len(stub.envelopes()), 1)
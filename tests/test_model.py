@@ -0,0 +1,93 @@
+import unittest
+import json
+from unittest import mock
+
+from emoji_feedback import (EmojiFeedbackSensor, BatchingEmitter, DeterministicIdProvider,
+    EventSerializer, FeedbackEvent, Rating, Comment)
+from tests.stub_server import StubCaliperServer
+
+class TestEventModel(unittest.TestCase):
+    def setUp(self):
+        self.feedback_sensor = EmojiFeedbackSensor(id_provider=DeterministicIdProvider())
+        self.question = {
+            'id': 'urn:uuid:question',
+            'type': 'RatingScaleQuestion',
+            'questionPosed': 'How do you feel about this graph?'
+        }
+
+    def build_emoji_event(self, **kwargs):
+        return self.feedback_sensor.build_emoji_feedback_event(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            question=self.question,
+            selections=['grinning face'],
+            **kwargs
+        )
+
+    def test_slots(self):
+        event = self.build_emoji_event()
+        self.assertIsInstance(event, FeedbackEvent)
+        self.assertIsInstance(event.generated, Rating)
+        for value in (event, event.generated):
+            with self.assertRaises(AttributeError):
+                value.__dict__
+
+    def test_to_dict_matches_generate(self):
+        event = self.build_emoji_event(extensions={'page': 2}, type='Overridden').to_dict()
+        self.feedback_sensor.id_provider = DeterministicIdProvider()
+        expected = self.feedback_sensor.generate_emoji_feedback_event(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            question=self.question,
+            selections=['grinning face'],
+            extensions={'page': 2},
+            type='Overridden'
+        )
+        self.assertEqual(event, expected)
+        self.assertEqual(list(event.keys()), list(expected.keys()))
+        self.assertEqual(event['type'], 'Overridden')
+
+    def test_comment(self):
+        event = self.feedback_sensor.build_comment_feedback_event(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            questionText='How do you feel about this graph?',
+            commentText='Alright'
+        )
+        self.assertIsInstance(event.generated, Comment)
+        generated = event.to_dict()['generated']
+        self.assertEqual(generated['type'], 'Comment')
+        self.assertEqual(generated['extensions'], {'question': 'How do you feel about this graph?'})
+
+    def test_to_json(self):
+        event = self.build_emoji_event(extensions={'page': 2})
+        self.assertEqual(json.loads(event.to_json().decode('utf-8')), event.to_dict())
+        self.assertEqual(event.to_json(EventSerializer()), event.to_json())
+
+    def test_to_json_skips_dicts(self):
+        event = self.build_emoji_event()
+        expected = event.to_dict()
+        with mock.patch.object(FeedbackEvent, 'to_dict', side_effect=AssertionError), \
+                mock.patch.object(Rating, 'to_dict', side_effect=AssertionError):
+            self.assertEqual(json.loads(event.to_json().decode('utf-8')), expected)
+
+    def test_sensor_sends_event_models(self):
+        with StubCaliperServer() as stub:
+            feedback_sensor = EmojiFeedbackSensor(
+                caliper_host=stub.url,
+                caliper_api_key='123',
+                emitter=BatchingEmitter(max_events=2, max_delay=5),
+                use_event_model=True
+            )
+            for _ in range(2):
+                feedback_sensor.send_emoji_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object',
+                    question=self.question,
+                    selections=['grinning face']
+                )
+            feedback_sensor.close(timeout=2)
+
+            events = stub.envelopes()[0]['data']
+            self.assertEqual(len(events), 2)
+            self.assertEqual(events[0]['generated']['question'], self.question)
@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from emoji_feedback import EmojiFeedbackSensor, FeedbackValidator, QuestionRegistry, ValidationError
+
+class TestQuestionRegistry(unittest.TestCase):
+    def setUp(self):
+        self.question = {
+            'id': 'urn:uuid:question',
+            'type': 'RatingScaleQuestion',
+            'questionPosed': 'How do you feel about this graph?',
+            'scale': {
+                'type': 'MultiselectScale',
+                'itemLabel': ['😀', '😐'],
+                'itemValues': ['grinning face', 'neutral face']
+            }
+        }
+
+    def test_resolve(self):
+        registry = QuestionRegistry([self.question])
+        question = registry.resolve('urn:uuid:question')
+        self.assertEqual(question, self.question)
+        # every request gets the same pre-built entity, whatever scale the client sent
+        self.assertIs(registry.resolve({'id': 'urn:uuid:question', 'scale': {}}), question)
+        self.assertIn('urn:uuid:question', registry)
+
+        with self.assertRaisesRegex(ValidationError, 'not a registered question'):
+            registry.resolve('urn:uuid:other')
+        with self.assertRaises(ValidationError):
+            registry.resolve(None)
+        self.assertEqual(registry.stats(), {'questions': 1, 'hits': 2, 'misses': 1})
+
+        # unknown questions are passed through as sent when not strict
+        registry.strict = False
+        self.assertEqual(registry.resolve('urn:uuid:other'), 'urn:uuid:other')
+        self.assertEqual(registry.unregister('urn:uuid:question'), self.question)
+        self.assertEqual(registry.resolve(self.question), self.question)
+        self.assertEqual(len(registry), 0)
+
+    def test_load(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'questions.json')
+        with open(path, 'w') as fh:
+            json.dump({'questions': [self.question]}, fh)
+        self.assertEqual(QuestionRegistry.from_file(path).get('urn:uuid:question'), self.question)
+
+        with open(path, 'w') as fh:
+            json.dump([self.question, {'type': 'RatingScaleQuestion'}], fh)
+        with self.assertRaises(ValidationError):
+            QuestionRegistry.from_file(path)
+
+    def test_validator(self):
+        validator = FeedbackValidator()
+        registry = QuestionRegistry([self.question], validator=validator)
+        self.assertEqual(validator.stats()['compiled'], 1)
+        with self.assertRaises(ValidationError):
+            registry.register({'id': 'urn:uuid:bad', 'scale': {'itemValues': 'grinning face'}})
+
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            validator=validator)
+        with patch('emoji_feedback.EmojiFeedbackSensor._emit_event') as mocked_emit_event:
+            feedback_sensor.send_emoji_feedback(
+                eventTime='2019-01-01T00:00:00.000Z',
+                object='urn:uuid:object',
+                question=registry.resolve('urn:uuid:question'),
+                selections=['neutral face']
+            )
+            with self.assertRaises(ValidationError):
+                feedback_sensor.send_emoji_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object',
+                    question=registry.resolve('urn:uuid:question'),
+                    selections=['crying face']
+                )
+        self.assertEqual(mocked_emit_event.call_args[0][0]['generated']['question'], self.question)
+        # the registered question was compiled once, when it was registered
+        self.assertEqual(validator.stats()['compiled'], 1)
@@ -0,0 +1,193 @@
+import unittest
+import asyncio
+
+import requests
+
+from emoji_feedback import (EmojiFeedbackSensor, AsyncEmojiFeedbackSensor, CircuitBreaker, CircuitOpenError,
+    PostTransport, RetryPolicy)
+from emoji_feedback.errors import HTTPStatusError
+from emoji_feedback.resilience import deliver_with_policy, is_retryable
+from tests.stub_server import StubCaliperServer
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class ListSink(object):
+    def __init__(self):
+        self.events = []
+
+    def write(self, events):
+        self.events.extend(events)
+
+class Response(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_backoff(self):
+        retry = RetryPolicy(base_delay=0.1, max_delay=0.5, random=lambda: 1.0)
+        self.assertEqual([retry.backoff(attempt) for attempt in range(1, 5)], [0.1, 0.2, 0.4, 0.5])
+        # full jitter draws anywhere between zero and the cap
+        self.assertEqual(RetryPolicy(random=lambda: 0.0).backoff(3), 0)
+
+    def test_retryable(self):
+        self.assertTrue(is_retryable(requests.ConnectionError()))
+        self.assertTrue(is_retryable(HTTPStatusError('', Response(503))))
+        self.assertTrue(is_retryable(HTTPStatusError('', Response(429))))
+        self.assertFalse(is_retryable(HTTPStatusError('', Response(400))))
+        self.assertFalse(is_retryable(CircuitOpenError()))
+
+    def test_budget(self):
+        retry = RetryPolicy(max_attempts=5, budget_ratio=0.5, budget_min=2)
+        error = requests.ConnectionError()
+        self.assertEqual([retry.allow_retry(1, error) for _ in range(3)], [True, True, False])
+        self.assertEqual(retry.stats()['budget_exhausted'], 1)
+        # every request sent earns part of a retry back
+        retry.record_request()
+        retry.record_request()
+        self.assertTrue(retry.allow_retry(1, error))
+        self.assertFalse(retry.allow_retry(5, error))
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_open_and_half_open(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+        # one probe is let through once the reset timeout has passed
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+        clock.now = 20
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertEqual(breaker.stats(), {'state': 'closed', 'opened': 2, 'rejected': 2})
+
+class TestDeliverWithPolicy(unittest.TestCase):
+    def test_retries_and_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        outcomes = [requests.ConnectionError(), HTTPStatusError('', Response(400)), 'ok']
+        delays = []
+
+        def post():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        # a 4xx is not retried and does not count towards opening the circuit
+        with self.assertRaises(HTTPStatusError):
+            deliver_with_policy(post, RetryPolicy(random=lambda: 1.0), breaker, sleep=delays.append)
+        self.assertEqual(delays, [0.1])
+        self.assertEqual(breaker.state, 'closed')
+        self.assertEqual(deliver_with_policy(post, breaker=breaker), 'ok')
+
+        breaker.record_failure()
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            deliver_with_policy(post, breaker=breaker)
+        self.assertEqual(deliver_with_policy(post, breaker=breaker, on_open=lambda: 'diverted'), 'diverted')
+
+class TestSensorResilience(unittest.TestCase):
+    def setUp(self):
+        self.question = {
+            'id': 'urn:uuid:question',
+            'type': 'RatingScaleQuestion',
+            'questionPosed': 'How do you feel about this graph?'
+        }
+
+    def send(self, feedback_sensor):
+        feedback_sensor.send_emoji_feedback(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            question=self.question,
+            selections=['grinning face']
+        )
+
+    def test_retry_after_5xx(self):
+        with StubCaliperServer(statuses=[503, 502]) as stub:
+            retry = RetryPolicy(max_attempts=3, base_delay=0.01)
+            feedback_sensor = EmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123', retry=retry)
+            self.send(feedback_sensor)
+            self.assertEqual(len(stub.requests), 3)
+            self.assertEqual(retry.retries, 2)
+
+    def test_no_retry_after_4xx(self):
+        with StubCaliperServer(statuses=[400]) as stub:
+            feedback_sensor = EmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                retry=RetryPolicy(base_delay=0.01))
+            with self.assertRaises(requests.HTTPError):
+                self.send(feedback_sensor)
+            self.assertEqual(len(stub.requests), 1)
+
+    def test_retry_after_timeout(self):
+        with StubCaliperServer(delay=0.3) as stub:
+            feedback_sensor = EmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                transport=PostTransport(timeout=0.05), retry=RetryPolicy(max_attempts=2, base_delay=0.01))
+            with self.assertRaises(requests.Timeout):
+                self.send(feedback_sensor)
+            self.assertEqual(len(stub.requests), 2)
+
+    def test_breaker_fails_fast(self):
+        with StubCaliperServer(statuses=[503, 503, 503]) as stub:
+            clock = FakeClock()
+            feedback_sensor = EmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                breaker=CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock))
+            for _ in range(2):
+                with self.assertRaises(requests.HTTPError):
+                    self.send(feedback_sensor)
+            with self.assertRaises(CircuitOpenError):
+                self.send(feedback_sensor)
+            self.assertEqual(len(stub.requests), 2)
+
+            # the half-open probe fails and opens the circuit again, the next probe closes it
+            clock.now = 10
+            with self.assertRaises(requests.HTTPError):
+                self.send(feedback_sensor)
+            clock.now = 20
+            self.send(feedback_sensor)
+            self.assertEqual(feedback_sensor.breaker.state, 'closed')
+            self.assertEqual(len(stub.requests), 4)
+
+    def test_breaker_fallback(self):
+        with StubCaliperServer(statuses=[503]) as stub:
+            sink = ListSink()
+            feedback_sensor = EmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60), fallback=sink)
+            with self.assertRaises(requests.HTTPError):
+                self.send(feedback_sensor)
+            self.send(feedback_sensor)
+            self.assertEqual(len(stub.requests), 1)
+            self.assertEqual(len(sink.events), 1)
+            self.assertEqual(sink.events[0]['generated']['question'], self.question)
+
+    def test_async_retry(self):
+        loop = asyncio.new_event_loop()
+        with StubCaliperServer(statuses=[503]) as stub:
+            feedback_sensor = AsyncEmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                retry=RetryPolicy(base_delay=0.01))
+
+            async def send():
+                await feedback_sensor.send_emoji_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object',
+                    question=self.question,
+                    selections=['grinning face']
+                )
+                await feedback_sensor.close()
+            loop.run_until_complete(send())
+            loop.close()
+            self.assertEqual(len(stub.requests), 2)
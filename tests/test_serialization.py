@@ -0,0 +1,139 @@
+import unittest
+import json
+from unittest.mock import patch
+
+from emoji_feedback import EmojiFeedbackSensor, EventSerializer
+from tests.stub_server import StubCaliperServer
+
+class TestEventSerializer(unittest.TestCase):
+    def setUp(self):
+        self.feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123')
+        self.question = {
+            'id': 'urn:uuid:question',
+            'type': 'RatingScaleQuestion',
+            'questionPosed': 'How do you feel about this graph? 😀',
+            'scale': {
+                'type': 'MultiselectScale',
+                'itemLabel': ['😁', '😀', '😐', '😕', '😞'],
+                'itemValues': ['beaming face with smiling eyes', 'grinning face', 'neutral face',
+                    'confused face', 'disappointed face']
+            }
+        }
+
+    def emoji_event(self):
+        return self.feedback_sensor.generate_emoji_feedback_event(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            question=self.question,
+            selections=['grinning face'],
+            extensions={'page': 2}
+        )
+
+    def comment_event(self):
+        return self.feedback_sensor.generate_comment_feedback_event(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object={'id': 'urn:uuid:object', 'type': 'DigitalResource'},
+            questionText='How do you feel about this graph?',
+            commentText='"Quoted" comment'
+        )
+
+    def test_event_matches_json(self):
+        serializer = EventSerializer()
+        for event in (self.emoji_event(), self.comment_event()):
+            encoded = serializer.event(event)
+            self.assertEqual(json.loads(encoded.decode('utf-8')), event)
+            self.assertEqual(list(json.loads(encoded.decode('utf-8')).keys()), list(event.keys()))
+
+    def test_envelope_matches_json(self):
+        serializer = EventSerializer()
+        envelope = self.feedback_sensor._build_envelope([self.emoji_event(), self.comment_event()])
+        self.assertEqual(json.loads(serializer.envelope(envelope).decode('utf-8')), envelope)
+
+    def test_entity_cache(self):
+        serializer = EventSerializer(max_entities=10)
+        serializer.event(self.emoji_event())
+        misses = serializer.misses
+        hits = serializer.hits
+        serializer.event(self.emoji_event())
+        # anonymous actor, edApp and session plus the question are all cached
+        self.assertEqual(serializer.misses, misses)
+        self.assertEqual(serializer.hits - hits, 5)
+
+        # the oldest entities are evicted
+        for i in range(20):
+            serializer.entity({'id': 'urn:uuid:{}'.format(i)})
+        self.assertEqual(len(serializer._entities), 10)
+
+    def test_entity_cache_by_id(self):
+        serializer = EventSerializer()
+        serializer.entity(self.question)
+        # an equal entity parsed from another request hits the cache
+        parsed = json.loads(json.dumps(self.question))
+        hits = serializer.hits
+        self.assertEqual(json.loads(serializer.entity(parsed).decode('utf-8')), self.question)
+        self.assertEqual(serializer.hits - hits, 1)
+
+        # an entity changed under the same id is encoded again
+        parsed['questionPosed'] = 'Changed'
+        misses = serializer.misses
+        self.assertEqual(json.loads(serializer.entity(parsed).decode('utf-8'))['questionPosed'], 'Changed')
+        self.assertEqual(serializer.misses - misses, 1)
+
+    def test_entity_changed_in_place(self):
+        serializer = EventSerializer()
+        actor = {'id': 'urn:uuid:actor', 'type': 'Person', 'name': 'A'}
+        serializer.entity(actor)
+        actor['name'] = 'B'
+        self.assertEqual(json.loads(serializer.entity(actor).decode('utf-8'))['name'], 'B')
+
+    def test_custom_event_matches_json(self):
+        serializer = EventSerializer()
+        event = self.emoji_event()
+        event['extensions'] = {'page': 3}
+        event['generated']['extensions'] = {'attempt': 1}
+        self.assertEqual(json.loads(serializer.event(event).decode('utf-8')), event)
+
+        model_event = self.feedback_sensor.build_comment_feedback_event(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            questionText='Question',
+            commentText='Comment'
+        )
+        self.assertEqual(json.loads(model_event.to_json(serializer).decode('utf-8')), model_event.to_dict())
+
+    def test_event_extensions_use_template(self):
+        serializer = EventSerializer()
+        model_event = self.feedback_sensor.build_emoji_feedback_event(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            question=self.question,
+            selections=['grinning face'],
+            extensions={'emojiFeedbackMode': 'full', 'sampleRate': 1.0}
+        )
+        with patch.object(serializer, '_object') as mocked_object:
+            for event in (self.emoji_event(), model_event):
+                encoded = serializer.event(event)
+                expected = event if event.__class__ is dict else event.to_dict()
+                self.assertEqual(encoded, json.dumps(expected, separators=(',', ':')).encode('ascii'))
+            self.assertFalse(mocked_object.called)
+
+        # a null extensions value is kept, so it goes key by key
+        event = self.comment_event()
+        event['extensions'] = None
+        self.assertEqual(json.loads(serializer.event(event).decode('utf-8')), event)
+
+    def test_sensor_sends_serialized_envelope(self):
+        with StubCaliperServer() as stub:
+            feedback_sensor = EmojiFeedbackSensor(
+                caliper_host=stub.url,
+                caliper_api_key='123',
+                serializer=EventSerializer()
+            )
+            feedback_sensor.send_emoji_feedback(
+                eventTime='2019-01-01T00:00:00.000Z',
+                object='urn:uuid:object',
+                question=self.question,
+                selections=['grinning face']
+            )
+            self.assertEqual(stub.envelopes()[0]['data'][0]['generated']['question'], self.question)
+            self.assertEqual(stub.requests[0]['headers']['Content-Type'], 'application/json')
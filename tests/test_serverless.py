@@ -0,0 +1,87 @@
+import os
+import socket
+import subprocess
+import sys
+import unittest
+
+from emoji_feedback import BufferedEmitter, ConnectionTransport, EmojiFeedbackSensor, serverless
+from tests.stub_server import StubCaliperServer
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+class TestServerless(unittest.TestCase):
+    def tearDown(self):
+        serverless._sensor = None
+
+    def send(self, feedback_sensor):
+        feedback_sensor.send_comment_feedback(
+            eventTime='2019-01-01T00:00:00.000Z',
+            object='urn:uuid:object',
+            questionText='How do you feel about this graph?',
+            commentText='Alright'
+        )
+
+    def test_lazy_imports(self):
+        code = ('import sys; sys.path.insert(0, sys.argv[1]); import emoji_feedback; '
+            'emoji_feedback.EmojiFeedbackSensor(caliper_host="http://127.0.0.1:9/", caliper_api_key="1"); '
+            'from emoji_feedback import serverless; serverless.get_sensor(); '
+            'print(" ".join(sorted(set(["requests", "asyncio", "http.client"]) & set(sys.modules))))')
+        output = subprocess.check_output([sys.executable, '-c', code, SRC]).decode('utf-8').strip()
+        self.assertEqual(output, '')
+
+    def test_eager_imports_before_python_37(self):
+        code = ('import sys; sys.version_info = (3, 6, 15); sys.path.insert(0, sys.argv[1]); '
+            'import emoji_feedback; print(sorted(set(emoji_feedback.__all__) - set(vars(emoji_feedback))))')
+        output = subprocess.check_output([sys.executable, '-c', code, SRC]).decode('utf-8').strip()
+        self.assertEqual(output, '[]')
+
+    def test_get_sensor_is_reused(self):
+        with StubCaliperServer() as stub:
+            feedback_sensor = serverless.get_sensor(caliper_host=stub.url, caliper_api_key='123')
+            self.assertIs(serverless.get_sensor(), feedback_sensor)
+            for _ in range(3):
+                self.send(feedback_sensor)
+            self.assertEqual(len(stub.requests), 0)
+
+            self.assertTrue(serverless.flush())
+            self.assertEqual([len(envelope['data']) for envelope in stub.envelopes()], [3])
+
+            # a warm invocation reuses the open connection
+            self.send(feedback_sensor)
+            serverless.flush()
+            self.assertEqual(len(set(r['client_port'] for r in stub.requests)), 1)
+
+    def test_failed_flush_keeps_events(self):
+        with StubCaliperServer(statuses=[503]) as stub:
+            feedback_sensor = EmojiFeedbackSensor(caliper_host=stub.url, caliper_api_key='123',
+                transport=ConnectionTransport(), emitter=BufferedEmitter(max_events=10))
+            self.send(feedback_sensor)
+            with self.assertRaises(Exception):
+                feedback_sensor.flush()
+            self.assertEqual(feedback_sensor.emitter.queue_depth(), 1)
+            self.assertTrue(feedback_sensor.flush())
+            self.assertEqual(len(stub.requests), 2)
+
+    def test_send_never_raises_while_host_is_down(self):
+        emitter = BufferedEmitter(max_events=2, max_buffered=3)
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://127.0.0.1:9/', caliper_api_key='123',
+            transport=ConnectionTransport(), emitter=emitter)
+        for _ in range(6):
+            self.send(feedback_sensor)
+        # the newest events are kept, up to max_buffered
+        self.assertEqual(emitter.stats(), {'queue_depth': 3, 'dropped': 3, 'failed_flushes': 3})
+        with self.assertRaises(Exception):
+            feedback_sensor.flush()
+        self.assertEqual(emitter.queue_depth(), 3)
+
+    def test_connection_transport_reconnects(self):
+        with StubCaliperServer() as stub:
+            transport = ConnectionTransport()
+            self.assertEqual(transport.post(stub.url, b'{}', {}).status_code, 200)
+            # the server side of the idle connection goes away, as it does while a function is frozen
+            for connection in transport._connections.values():
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            self.assertEqual(transport.post(stub.url, b'{}', {}).status_code, 200)
+            transport.close()
+            self.assertEqual(len(stub.requests), 2)
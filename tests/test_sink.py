@@ -0,0 +1,147 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from emoji_feedback import BatchingEmitter, EmojiFeedbackSensor, FileSink, Replayer
+from emoji_feedback.replay import main, read_events, sink_files
+from tests.stub_server import StubCaliperServer
+
+
+def event(number):
+    return {'id': 'urn:uuid:event-{}'.format(number), 'type': 'FeedbackEvent', 'action': 'Commented'}
+
+
+class TestFileSink(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_rotates_by_size(self):
+        sink = FileSink(self.directory, max_bytes=200)
+        for number in range(10):
+            sink.write([event(number)])
+        # the active file is not visible to readers until it is rotated
+        self.assertTrue(any(name.endswith('.part') for name in os.listdir(self.directory)))
+        sink.close()
+
+        files = sink_files([self.directory])
+        self.assertGreater(len(files), 1)
+        self.assertEqual(sink.stats()['files'], len(files))
+        events = [e for path in files for e in read_events(path)]
+        self.assertEqual(events, [event(number) for number in range(10)])
+
+    def test_rotates_by_age(self):
+        sink = FileSink(self.directory, max_age=60)
+        with patch('emoji_feedback.sink.time.time', return_value=1000.0):
+            sink.write([event(0)])
+        with patch('emoji_feedback.sink.time.time', return_value=1060.0):
+            sink.write([event(1)])
+        self.assertEqual(len(sink_files([self.directory])), 1)
+        sink.close()
+        self.assertEqual(len(sink_files([self.directory])), 2)
+
+    def test_compressed(self):
+        sink = FileSink(self.directory, compress=True)
+        sink.write([event(0), event(1)])
+        sink.close()
+        files = sink_files([self.directory])
+        self.assertTrue(files[0].endswith('.ndjson.gz'))
+        self.assertEqual(list(read_events(files[0])), [event(0), event(1)])
+
+    def test_recovers_files_of_dead_processes(self):
+        # a restarted container often gets the same pid as the one that left the file
+        name = 'events-20190101T000000-{}-00000000-000001.ndjson.part'.format(os.getpid())
+        with open(os.path.join(self.directory, name), 'wb') as fh:
+            fh.write(json.dumps(event(0)).encode('utf-8') + b'\n{"id": "partial')
+        FileSink(self.directory)
+        files = sink_files([self.directory])
+        self.assertEqual([os.path.basename(path) for path in files], [name[:-len('.part')]])
+        self.assertEqual(list(read_events(files[0])), [event(0)])
+
+    def test_does_not_recover_files_being_written(self):
+        sink = FileSink(self.directory)
+        sink.write([event(0)])
+        FileSink(self.directory)
+        self.assertEqual(sink_files([self.directory]), [])
+        sink.close()
+        self.assertEqual(len(sink_files([self.directory])), 1)
+
+    def test_rotates_quiet_files(self):
+        sink = FileSink(self.directory, max_age=0.1)
+        sink.write([event(0)])
+        deadline = time.time() + 5
+        while not sink_files([self.directory]) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(sink_files([self.directory])), 1)
+        sink.close()
+
+    def test_sensor_sink_mode(self):
+        sink = FileSink(self.directory)
+        feedback_sensor = EmojiFeedbackSensor(emitter=BatchingEmitter(max_events=10, max_delay=5), sink=sink)
+        for _ in range(3):
+            feedback_sensor.send_comment_feedback(
+                eventTime='2019-01-01T00:00:00.000Z',
+                object='urn:uuid:object',
+                questionText='How do you feel about this graph?',
+                commentText='Alright'
+            )
+        feedback_sensor.close(timeout=2)
+        events = list(read_events(sink_files([self.directory])[0]))
+        self.assertEqual([e['generated']['value'] for e in events], ['Alright'] * 3)
+
+
+class TestReplayer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        sink = FileSink(os.path.join(self.directory, 'events'), max_bytes=1000)
+        sink.write([event(number) for number in range(50)])
+        sink.write([event(number) for number in range(50, 120)])
+        sink.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_replay(self):
+        with StubCaliperServer() as stub:
+            replayer = Replayer(stub.url, '123', batch_size=20, workers=3)
+            self.assertEqual(replayer.replay([os.path.join(self.directory, 'events')]), 120)
+            envelopes = stub.envelopes()
+            self.assertTrue(all(len(envelope['data']) <= 20 for envelope in envelopes))
+            self.assertEqual(sorted(e['id'] for envelope in envelopes for e in envelope['data']),
+                sorted(event(number)['id'] for number in range(120)))
+            self.assertEqual(envelopes[0]['sensor'], EmojiFeedbackSensor.SENSOR_ID)
+            self.assertEqual(stub.requests[0]['headers']['Authorization'], 'Bearer 123')
+
+    def test_resumes_from_checkpoint(self):
+        with StubCaliperServer(statuses=[200, 200, 400]) as stub:
+            replayer = Replayer(stub.url, '123', checkpoint_path=self.checkpoint, batch_size=20, workers=1)
+            with self.assertRaises(Exception):
+                replayer.replay([os.path.join(self.directory, 'events')])
+            delivered = sum(len(envelope['data']) for envelope in stub.envelopes()[:2])
+            self.assertEqual(replayer.sent, delivered)
+
+            replayer = Replayer(stub.url, '123', checkpoint_path=self.checkpoint, batch_size=20, workers=1,
+                delete=True)
+            self.assertEqual(replayer.replay([os.path.join(self.directory, 'events')]), 120 - delivered)
+            envelopes = stub.envelopes()
+            # the rejected batch is sent again, batches already in flight when it failed may be too
+            del envelopes[2]
+            ids = set(e['id'] for envelope in envelopes for e in envelope['data'])
+            self.assertEqual(ids, set(event(number)['id'] for number in range(120)))
+            self.assertEqual(sink_files([os.path.join(self.directory, 'events')]), [])
+
+    def test_cli(self):
+        with StubCaliperServer() as stub:
+            main([os.path.join(self.directory, 'events'), '--caliper-host', stub.url, '--caliper-api-key', '123',
+                '--checkpoint', self.checkpoint, '--batch-size', '100'])
+            self.assertEqual(sum(len(envelope['data']) for envelope in stub.envelopes()), 120)
+            with open(self.checkpoint) as fh:
+                complete = json.load(fh)['complete']
+            self.assertEqual(len(complete), len(sink_files([os.path.join(self.directory, 'events')])))
@@ -0,0 +1,135 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from emoji_feedback import EmojiFeedbackSensor, Spool
+from tests.stub_server import StubCaliperServer
+
+class TestSpool(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def event(self, i):
+        return {'id': 'urn:uuid:{}'.format(i), 'type': 'FeedbackEvent', 'padding': 'x' * 50}
+
+    def replayed_ids(self, spool):
+        return [event['id'] for batch in spool.replay_batches(batch_size=3) for event in batch]
+
+    def test_invalid_fsync_policy(self):
+        with self.assertRaises(Exception) as cm:
+            Spool(self.directory, fsync='sometimes')
+        self.assertEqual('Emoji Feedback Error: unknown fsync policy sometimes', str(cm.exception))
+
+    def test_ack_and_replay(self):
+        spool = Spool(self.directory, fsync='always')
+        events = [self.event(i) for i in range(5)]
+        for event in events:
+            spool.append(event)
+        self.assertEqual(spool.pending_count(), 5)
+
+        # events being sent are not replayed until released
+        self.assertEqual(self.replayed_ids(spool), [])
+        spool.ack(events[:2])
+        spool.release(events[2:])
+        self.assertEqual(spool.pending_count(), 3)
+        self.assertEqual(self.replayed_ids(spool), ['urn:uuid:2', 'urn:uuid:3', 'urn:uuid:4'])
+        spool.close()
+
+    def test_reload_after_restart(self):
+        spool = Spool(self.directory, segment_max_bytes=200, fsync='never')
+        events = [self.event(i) for i in range(6)]
+        for event in events:
+            spool.append(event)
+        spool.ack([events[0], events[1], events[4]])
+        spool.close()
+
+        spool = Spool(self.directory, segment_max_bytes=200)
+        self.assertEqual(spool.pending_count(), 3)
+        batches = list(spool.replay_batches(batch_size=2))
+        self.assertEqual([[event['id'] for event in batch] for batch in batches],
+            [['urn:uuid:2', 'urn:uuid:3'], ['urn:uuid:5']])
+        for batch in batches:
+            spool.ack(batch)
+        self.assertEqual(spool.pending_count(), 0)
+        spool.close()
+
+        # fully acknowledged segments are removed
+        self.assertEqual(len([name for name in os.listdir(self.directory) if name.endswith('.log')]), 1)
+
+    def test_corrupt_record(self):
+        spool = Spool(self.directory, fsync='always')
+        for i in range(3):
+            spool.append(self.event(i))
+        spool.close()
+        path = os.path.join(self.directory, sorted(os.listdir(self.directory))[0])
+        with open(path, 'rb') as fh:
+            lines = fh.readlines()
+        with open(path, 'wb') as fh:
+            fh.write(lines[0] + b'{"id": \xff garbage\n' + lines[2])
+
+        spool = Spool(self.directory)
+        self.assertEqual(spool.corrupt, 1)
+        self.assertEqual(spool.pending_count(), 2)
+        self.assertEqual(self.replayed_ids(spool), ['urn:uuid:0', 'urn:uuid:2'])
+        spool.close()
+        with open(os.path.join(self.directory, 'quarantine.ndjson'), 'rb') as fh:
+            self.assertEqual(fh.read(), b'{"id": \xff garbage\n')
+
+        # quarantined records are acknowledged and not counted again
+        spool = Spool(self.directory)
+        self.assertEqual(spool.corrupt, 0)
+        self.assertEqual(spool.pending_count(), 2)
+        spool.close()
+
+    def test_max_total_bytes(self):
+        spool = Spool(self.directory, segment_max_bytes=200, max_total_bytes=400)
+        for i in range(12):
+            spool.append(self.event(i))
+        spool.release([self.event(i) for i in range(12)])
+
+        self.assertGreater(spool.dropped, 0)
+        self.assertEqual(spool.pending_count(), 12 - spool.dropped)
+        self.assertEqual(self.replayed_ids(spool)[-1], 'urn:uuid:11')
+        spool.close()
+
+    def test_sensor_replays_after_outage(self):
+        with StubCaliperServer(statuses=[503, 503]) as stub:
+            feedback_sensor = EmojiFeedbackSensor(
+                caliper_host=stub.url,
+                caliper_api_key='123',
+                spool=Spool(self.directory)
+            )
+            for i in range(3):
+                feedback_sensor.send_comment_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object',
+                    questionText='How do you feel about this graph?',
+                    commentText='Comment {}'.format(i)
+                )
+            feedback_sensor.close(timeout=2)
+
+            comments = [event['generated']['value'] for envelope in stub.envelopes()[2:]
+                for event in envelope['data']]
+            self.assertEqual(sorted(comments), ['Comment 0', 'Comment 1', 'Comment 2'])
+
+        spool = Spool(self.directory)
+        self.assertEqual(spool.pending_count(), 0)
+        spool.close()
+
+    def test_sensor_replays_on_startup(self):
+        spool = Spool(self.directory)
+        spool.append(self.event(1))
+        spool.close()
+
+        with StubCaliperServer() as stub:
+            feedback_sensor = EmojiFeedbackSensor(
+                caliper_host=stub.url,
+                caliper_api_key='123',
+                spool=Spool(self.directory)
+            )
+            feedback_sensor.close(timeout=2)
+            self.assertEqual(stub.envelopes()[0]['data'], [self.event(1)])
@@ -0,0 +1,50 @@
+import unittest
+
+from emoji_feedback import EmojiFeedbackSensor, PostTransport, SessionTransport
+from tests.stub_server import StubCaliperServer
+
+class TestTransport(unittest.TestCase):
+    def setUp(self):
+        self.event = {
+            'id': 'urn:uuid:3a02e4fc-24c1-11e9-ab14-d663bd873d00',
+            'type': 'FeedbackEvent',
+            'action': 'Ranked'
+        }
+
+    def test_default_transport(self):
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123')
+        self.assertIsInstance(feedback_sensor.transport, PostTransport)
+
+    def test_session_transport_reuses_connection(self):
+        with StubCaliperServer() as stub:
+            transport = SessionTransport(pool_maxsize=2, connect_timeout=1, read_timeout=2)
+            feedback_sensor = EmojiFeedbackSensor(
+                caliper_host=stub.url,
+                caliper_api_key='123',
+                transport=transport
+            )
+            for _ in range(5):
+                feedback_sensor._emit_event(self.event)
+            transport.close()
+
+            self.assertEqual(len(stub.requests), 5)
+            self.assertEqual(len(set(r['client_port'] for r in stub.requests)), 1)
+            self.assertEqual(stub.requests[0]['headers']['Authorization'], 'Bearer 123')
+            self.assertEqual(stub.envelopes()[0]['data'], [self.event])
+
+    def test_session_transport_raises_for_status(self):
+        with StubCaliperServer(statuses=[500]) as stub:
+            transport = SessionTransport()
+            feedback_sensor = EmojiFeedbackSensor(
+                caliper_host=stub.url,
+                caliper_api_key='123',
+                transport=transport
+            )
+            with self.assertRaises(Exception):
+                feedback_sensor._emit_event(self.event)
+            transport.close()
+
+    def test_shared_session_transport(self):
+        transport = SessionTransport.shared('https://caliper.example.com/a')
+        self.assertIs(transport, SessionTransport.shared('https://caliper.example.com/b'))
+        self.assertIsNot(transport, SessionTransport.shared('https://other.example.com/a'))
@@ -0,0 +1,70 @@
+import unittest
+from unittest.mock import patch
+
+from emoji_feedback import EmojiFeedbackSensor, FeedbackValidator, ValidationError
+
+class TestFeedbackValidator(unittest.TestCase):
+    def setUp(self):
+        self.validator = FeedbackValidator(max_comment_length=20, max_entity_size=400)
+        self.question = {
+            'id': 'urn:uuid:question',
+            'type': 'RatingScaleQuestion',
+            'questionPosed': 'How do you feel about this graph?',
+            'scale': {
+                'type': 'MultiselectScale',
+                'itemLabel': ['😀', '😐'],
+                'itemValues': ['grinning face', 'neutral face']
+            }
+        }
+
+    def test_emoji(self):
+        self.validator.validate_emoji('2019-01-01T00:00:00.000Z', 'urn:uuid:object', self.question,
+            ['grinning face'])
+        # an equal question parsed from another request reuses the compiled scale
+        self.validator.validate_emoji('2019-01-01T00:00:00.000Z', {'id': 'urn:uuid:object'},
+            dict(self.question), ['neutral face', 'grinning face'])
+        self.assertEqual(self.validator.compile(self.question), frozenset(['grinning face', 'neutral face']))
+        self.assertEqual(self.validator.stats(), {'questions': 1, 'compiled': 1, 'rejected': 0})
+
+        for question, selections in [
+                (self.question, ['crying face']),
+                (self.question, []),
+                (self.question, 'grinning face'),
+                (self.question, ['grinning face', 'neutral face', 'grinning face']),
+                ({'type': 'RatingScaleQuestion'}, ['grinning face']),
+                (dict(self.question, scale={'itemValues': 'grinning face'}), ['grinning face'])]:
+            with self.assertRaises(ValidationError):
+                self.validator.validate_emoji('2019-01-01T00:00:00.000Z', 'urn:uuid:object', question, selections)
+        self.assertEqual(self.validator.rejected, 6)
+
+        # a changed scale under the same id is recompiled
+        changed = dict(self.question, scale={'itemValues': ['crying face']})
+        self.validator.validate_emoji('2019-01-01T00:00:00.000Z', 'urn:uuid:object', changed, ['crying face'])
+
+    def test_comment(self):
+        self.validator.validate_comment('2019-01-01T00:00:00.000Z', 'urn:uuid:object',
+            'How do you feel about this graph?', 'Alright')
+        for object, commentText in [
+                ('urn:uuid:object', 'x' * 21),
+                ('urn:uuid:object', '   '),
+                ('urn:uuid:object', None),
+                (None, 'Alright'),
+                ({'type': 'DigitalResource'}, 'Alright'),
+                ({'id': 'urn:uuid:object', 'name': 'x' * 400}, 'Alright'),
+                ({'id': 'urn:uuid:object', 'tags': ['x'] * 200}, 'Alright')]:
+            with self.assertRaises(ValidationError):
+                self.validator.validate_comment('2019-01-01T00:00:00.000Z', object,
+                    'How do you feel about this graph?', commentText)
+
+    def test_sensor_rejects_before_generating(self):
+        feedback_sensor = EmojiFeedbackSensor(caliper_host='http://test.com', caliper_api_key='123',
+            validator=self.validator)
+        with patch('emoji_feedback.EmojiFeedbackSensor.generate_emoji_feedback_event') as mocked_generate:
+            with self.assertRaises(ValidationError):
+                feedback_sensor.send_emoji_feedback(
+                    eventTime='2019-01-01T00:00:00.000Z',
+                    object='urn:uuid:object',
+                    question=self.question,
+                    selections=['crying face']
+                )
+            self.assertFalse(mocked_generate.called)